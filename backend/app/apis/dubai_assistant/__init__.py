@@ -1,12 +1,37 @@
-from fastapi import APIRouter, HTTPException, Response
+import asyncio
+import collections
+import contextlib
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from fastapi import APIRouter, Header, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from openai import OpenAI
-import databutton as db
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, AsyncIterator, Callable, Dict, List, Literal, NamedTuple, Optional
+from app.apis.dubai_locations import LocationQueryResponse, location_flight, looks_like_location_query, resolve_location_query
+from app.libs.handle_store import HandleStore
+from app.libs.keyword_automaton import KeywordAutomaton
+from app.libs.llm_gateway import LLMGateway, LLMGatewayDep
+from app.libs.response_cache import TTLCache, normalize_query
+from app.libs.semantic_cache import SemanticCache
+from app.libs.sentence_segmenter import segment_sentences, segment_text
+from app.libs.single_flight import SingleFlight, SingleFlightStats
+from app.libs.sse import SSE_HEADERS, format_sse
+from app.libs.streaming import cancel_on_disconnect, cancel_pending_read
+from databutton_app.metrics import REGISTRY, record_error, stats_samples
+from databutton_app.structured_log import get_logger
 
 router = APIRouter(prefix="/dubai-assistant")
 
+log = get_logger(__name__)
+
+STREAM_TIME_TO_FIRST_TEXT = REGISTRY.histogram(
+    "stream_time_to_first_text_seconds", "Time from the request to the first streamed answer text, cache replays included", ["endpoint"]
+)
+
 # Define CORS headers
 def add_cors_headers(response: Response):
     response.headers["Access-Control-Allow-Origin"] = "*"
@@ -19,6 +44,8 @@ def add_cors_headers(response: Response):
 class DubaiQueryRequest(BaseModel):
     query: str = Field(..., description="The user's query about Dubai")
     language: str = Field("en", description="The language code for the response (e.g., 'en', 'ar', 'ru', 'zh')")
+    mode: Optional[Literal["structured", "two_call"]] = Field(None, description="Completion mode: one structured JSON call, or an answer call followed by a follow-up call. Defaults to DUBAI_ASSISTANT_MODE.")
+    defer_followups: bool = Field(False, description="Return the answer without waiting for follow-ups, which can be fetched later with followups_handle. Only in the two_call mode (structured completions return follow-ups with the answer); rejected with 422 otherwise.")
 
 class EtiquetteInfo(BaseModel):
     category: str = Field(..., description="The category of etiquette information")
@@ -31,6 +58,31 @@ class DubaiQueryResponse(BaseModel):
     answer: str = Field(..., description="The AI-generated answer about Dubai")
     suggested_followups: List[str] = Field(default_factory=list, description="Optional suggested follow-up questions")
     etiquette_info: Optional[EtiquetteInfo] = Field(None, description="Cultural etiquette information if the query is about cultural customs")
+    followups_handle: Optional[str] = Field(None, description="Handle for fetching follow-ups from /followups/{handle} when they were deferred")
+
+class TurnRequest(BaseModel):
+    query: str
+    language: str = "en-US"
+    mode: Optional[Literal["structured", "two_call"]] = None
+    # None: look up places only when the query mentions one, asks for directions or for places nearby
+    include_location: Optional[bool] = None
+    current_location: Optional[Dict[str, float]] = Field(None, description="The user's current location (lat/lng) if available")
+
+class TurnResponse(BaseModel):
+    answer: DubaiQueryResponse
+    location: Optional[LocationQueryResponse] = None
+
+class SessionMessage(BaseModel):
+    """Client message on the /session WebSocket"""
+    type: Literal["query", "language", "cancel", "reset"]
+    query: Optional[str] = None
+    language: Optional[str] = None
+    segment: Optional[Literal["sentence"]] = None
+    include_location: Optional[bool] = None
+
+class FollowupsResponse(BaseModel):
+    status: Literal["pending", "ready", "failed", "unknown"] = Field(..., description="Whether the deferred follow-ups are ready; unknown handles have expired or never existed")
+    suggested_followups: List[str] = Field(default_factory=list, description="Suggested follow-up questions once ready")
 
 # Etiquette categories
 ETIQUETTE_CATEGORIES = [
@@ -38,45 +90,82 @@ ETIQUETTE_CATEGORIES = [
     "public-behavior", "business", "home-visits", "gender-interactions"
 ]
 
+# Terms marking a query as being about cultural etiquette. Keywords match whole
+# words (plus common inflections); a trailing "*" marks a stem matching any ending.
+ETIQUETTE_TERMS = [
+    "etiquette", "custom", "tradition*", "dress code", "clothing",
+    "wear", "greet", "greeting", "handshake", "gesture",
+    "nod", "bow", "religious", "islam*", "mosque", "ramadan",
+    "dining", "eat", "food", "restaurant", "table manner",
+    "public", "behavior", "conduct", "appropriate", "acceptable",
+    "photo*", "picture", "business", "meeting", "professional",
+    "card", "gift", "home", "visit", "house", "gender", "male", "female",
+    "prayer", "modest*", "rude", "polite*", "offensive"
+]
+
+# Category-specific keywords, in priority order for ties
+ETIQUETTE_CATEGORY_KEYWORDS = {
+    "dress-code": ["dress", "wear", "clothes", "attire", "outfit", "modest*", "clothing"],
+    "greetings": ["greet", "handshake", "hello", "salaam", "gesture", "wave", "bow"],
+    "religious-customs": ["mosque", "islam*", "prayer", "ramadan", "religious", "faith", "holy"],
+    "dining": ["eat", "food", "dining", "restaurant", "meal", "breakfast", "lunch", "dinner", "table"],
+    "public-behavior": ["public", "behavior", "acceptable", "allowed", "illegal", "law", "rule", "pda"],
+    "business": ["business", "meeting", "professional", "office", "work", "colleague", "card"],
+    "home-visits": ["home", "house", "visit", "invitation", "invit*", "guest", "host"],
+    "gender-interactions": ["gender", "man", "woman", "male", "female", "interaction", "touch"]
+}
+
+# Label marking a keyword as one of ETIQUETTE_TERMS, next to its category labels
+ETIQUETTE_TERM = "etiquette"
+
+def build_etiquette_automaton() -> KeywordAutomaton:
+    labels: Dict[str, List[str]] = {term: [ETIQUETTE_TERM] for term in ETIQUETTE_TERMS}
+    for category, keywords in ETIQUETTE_CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            labels.setdefault(keyword, []).append(category)
+    return KeywordAutomaton(labels)
+
+# Built once at import, shared by every request
+etiquette_automaton = build_etiquette_automaton()
+ETIQUETTE_CATEGORY_PRIORITY = {category: i for i, category in enumerate(ETIQUETTE_CATEGORY_KEYWORDS)}
+
+class EtiquetteClassification(NamedTuple):
+    is_etiquette: bool
+    # (category, number of keyword hits), best first
+    categories: List[tuple[str, int]]
+
+    @property
+    def primary_category(self) -> str:
+        # Default to public-behavior if no specific match found
+        return self.categories[0][0] if self.categories else "public-behavior"
+
+NOT_ETIQUETTE = EtiquetteClassification(False, [])
+
+def classify_etiquette(query: str) -> EtiquetteClassification:
+    """Single scan over the query for etiquette terms and scored categories"""
+    hits = etiquette_automaton.find_labels(query)
+    if not hits:
+        return NOT_ETIQUETTE
+
+    scores: Dict[str, int] = {}
+    for labels in hits:
+        for label in labels:
+            scores[label] = scores.get(label, 0) + 1
+
+    is_etiquette = scores.pop(ETIQUETTE_TERM, 0) > 0
+    categories = list(scores.items())
+    if len(categories) > 1:
+        # Most hits first, ties in category priority order
+        categories.sort(key=lambda item: (-item[1], ETIQUETTE_CATEGORY_PRIORITY[item[0]]))
+    return EtiquetteClassification(is_etiquette, categories)
+
 # Function to detect if a query is about cultural etiquette
 def is_etiquette_query(query: str) -> bool:
-    etiquette_terms = [
-        "etiquette", "custom", "tradition", "dress code", "clothing", 
-        "wear", "greet", "greeting", "handshake", "gesture", 
-        "nod", "bow", "religious", "islam", "mosque", "ramadan",
-        "dining", "eat", "food", "restaurant", "table manner",
-        "public", "behavior", "conduct", "appropriate", "acceptable",
-        "photo", "picture", "business", "meeting", "professional",
-        "card", "gift", "home", "visit", "house", "gender", "male", "female",
-        "prayer", "modest", "modesty", "rude", "polite", "offensive"
-    ]
-    
-    query_lower = query.lower()
-    return any(term in query_lower for term in etiquette_terms)
+    return classify_etiquette(query).is_etiquette
 
 # Function to detect which etiquette category a query belongs to
 def detect_etiquette_category(query: str) -> str:
-    query_lower = query.lower()
-    
-    # Category-specific keywords
-    category_patterns = {
-        "dress-code": ["dress", "wear", "clothes", "attire", "outfit", "modest", "clothing"],
-        "greetings": ["greet", "handshake", "hello", "salaam", "gesture", "wave", "bow"],
-        "religious-customs": ["mosque", "islam", "prayer", "ramadan", "religious", "faith", "holy"],
-        "dining": ["eat", "food", "dining", "restaurant", "meal", "breakfast", "lunch", "dinner", "table"],
-        "public-behavior": ["public", "behavior", "acceptable", "allowed", "illegal", "law", "rule", "pda"],
-        "business": ["business", "meeting", "professional", "office", "work", "colleague", "card"],
-        "home-visits": ["home", "house", "visit", "invitation", "invit", "guest", "host"],
-        "gender-interactions": ["gender", "man", "woman", "male", "female", "interaction", "touch"]
-    }
-    
-    # Check each category for matches
-    for category, keywords in category_patterns.items():
-        if any(keyword in query_lower for keyword in keywords):
-            return category
-    
-    # Default to public-behavior if no specific match found
-    return "public-behavior"
+    return classify_etiquette(query).primary_category
 
 # Dubai tourism information system prompt
 DUBAI_SYSTEM_PROMPT = """
@@ -133,64 +222,32 @@ GUIDELINES:
 Your goal is to be the perfect tourism assistant, making visitors' experiences in Dubai smoother, more enjoyable, and more culturally rich.
 """
 
-# Initialize OpenAI client
-def get_openai_client():
-    try:
-        api_key = db.secrets.get("OPENAI_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="OpenAI API key is not configured")
-        return OpenAI(api_key=api_key)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error initializing OpenAI client: {str(e)}")
+# Completion modes for /query. "structured" gets the answer, etiquette block and
+# follow-ups from one JSON-schema completion; "two_call" is the original answer
+# call followed by a separate follow-up call, kept for side-by-side benchmarking.
+DEFAULT_COMPLETION_MODE = os.environ.get("DUBAI_ASSISTANT_MODE", "structured")
 
-@router.post("/query", response_model=DubaiQueryResponse)
-def process_dubai_query(request: DubaiQueryRequest, response: Response) -> DubaiQueryResponse:
-    # Add CORS headers
-    add_cors_headers(response)
-    """
-    Process a user query about Dubai and return relevant information
-    """
-    try:
-        client = get_openai_client()
-        
-        # Get user's preferred language
-        language_code = request.language.lower()
-        
-        # Extract primary language code (e.g., 'en' from 'en-US')
-        if '-' in language_code:
-            language = language_code.split('-')[0]
-        else:
-            language = language_code
-        
-        # Customize response language instruction based on user's preference
-        language_instruction = ""
-        if language == "en":
-            language_instruction = "Respond in English."
-        elif language == "ar":
-            language_instruction = "Respond in Arabic (العربية). Make sure all text is in proper Arabic."
-        elif language == "zh":
-            language_instruction = "Respond in simplified Chinese (简体中文). Make sure all text is in proper Chinese characters."
-        elif language == "ru":
-            language_instruction = "Respond in Russian (русский). Make sure all text is in proper Cyrillic characters."
-        elif language == "hi":
-            language_instruction = "Respond in Hindi (हिन्दी). Make sure all text is in proper Hindi using Devanagari script."
-        elif language == "es":
-            language_instruction = "Respond in Spanish (Español). Make sure all text is in proper Spanish."
-        elif language == "de":
-            language_instruction = "Respond in German (Deutsch). Make sure all text is in proper German."
-        elif language == "fr":
-            language_instruction = "Respond in French (Français). Make sure all text is in proper French."
-        else:
-            language_instruction = "Respond in English."
-        
-        # Check if this is a cultural etiquette query
-        is_etiquette = is_etiquette_query(request.query)
-        etiquette_category = detect_etiquette_category(request.query) if is_etiquette else None
-        
-        # Prepare specialized instructions for etiquette queries
-        specialized_instructions = ""
-        if is_etiquette:
-            specialized_instructions = f"""
+LANGUAGE_INSTRUCTIONS = {
+    "en": "Respond in English.",
+    "ar": "Respond in Arabic (العربية). Make sure all text is in proper Arabic.",
+    "zh": "Respond in simplified Chinese (简体中文). Make sure all text is in proper Chinese characters.",
+    "ru": "Respond in Russian (русский). Make sure all text is in proper Cyrillic characters.",
+    "hi": "Respond in Hindi (हिन्दी). Make sure all text is in proper Hindi using Devanagari script.",
+    "es": "Respond in Spanish (Español). Make sure all text is in proper Spanish.",
+    "de": "Respond in German (Deutsch). Make sure all text is in proper German.",
+    "fr": "Respond in French (Français). Make sure all text is in proper French.",
+}
+
+def get_primary_language(language_code: str) -> str:
+    """Extract primary language code (e.g., 'en' from 'en-US')"""
+    return language_code.lower().split('-')[0]
+
+def get_language_instruction(language: str) -> str:
+    return LANGUAGE_INSTRUCTIONS.get(language, LANGUAGE_INSTRUCTIONS["en"])
+
+def get_etiquette_instructions(etiquette_category: str) -> str:
+    """Instructions asking the model to append a parseable [ETIQUETTE_INFO] block"""
+    return f"""
 This is a question about CULTURAL ETIQUETTE in Dubai, specifically about {etiquette_category.replace('-', ' ')}.
 
 In addition to your regular answer, please provide the following structured information that I can extract:
@@ -213,174 +270,962 @@ Dont:
 - (etc.)
 [/ETIQUETTE_INFO]
 """
-        
-        # Generate a response using OpenAI
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",  # Using gpt-4o-mini for a good balance of quality and cost
-            messages=[
-                {"role": "system", "content": DUBAI_SYSTEM_PROMPT + "\n\n" + language_instruction + specialized_instructions},
-                {"role": "user", "content": request.query}
-            ],
+
+def parse_etiquette_block(full_response: str, etiquette_category: str) -> tuple[str, Optional[EtiquetteInfo]]:
+    """Split an [ETIQUETTE_INFO] block off the answer and parse it into EtiquetteInfo"""
+    etiquette_match = re.search(r'\[ETIQUETTE_INFO\]\s*(.+?)\s*\[\/ETIQUETTE_INFO\]', full_response, re.DOTALL)
+    if not etiquette_match:
+        return full_response, None
+
+    etiquette_text = etiquette_match.group(1)
+
+    # Remove the etiquette info block from the main answer
+    answer = full_response.replace(etiquette_match.group(0), '').strip()
+
+    # Parse etiquette information
+    category_match = re.search(r'Category:\s*(.+?)\s*(?:\n|$)', etiquette_text)
+    advice_match = re.search(r'Advice:\s*(.+?)\s*(?:\n|$)', etiquette_text)
+    additional_match = re.search(r'Additional:\s*(.+?)\s*(?:\n|$)', etiquette_text)
+
+    do_items = re.findall(r'Do:\s*(?:[-*•]\s*(.+?)\s*(?:\n|$))+', etiquette_text)
+    if not do_items:
+        do_items = re.findall(r'(?<=Do:\s*\n)\s*[-*•]\s*(.+?)\s*(?:\n|$)', etiquette_text)
+
+    dont_items = re.findall(r'Dont:\s*(?:[-*•]\s*(.+?)\s*(?:\n|$))+', etiquette_text)
+    if not dont_items:
+        dont_items = re.findall(r'(?<=Dont:\s*\n)\s*[-*•]\s*(.+?)\s*(?:\n|$)', etiquette_text)
+
+    # Create etiquette info object if basic fields are present
+    if not (category_match and advice_match):
+        return answer, None
+
+    advice = advice_match.group(1).strip()
+    additional_info = additional_match.group(1).strip() if additional_match else None
+
+    # Further process do/don't items if not properly extracted
+    if not do_items:
+        do_section = re.search(r'Do:\s*\n(.+?)(?:Dont:|\[|\/)', etiquette_text, re.DOTALL)
+        if do_section:
+            do_items = [item.strip().lstrip('-*•').strip() for item in do_section.group(1).strip().split('\n') if item.strip()]
+
+    if not dont_items:
+        dont_section = re.search(r'Dont:\s*\n(.+?)(?:\[|\/)', etiquette_text, re.DOTALL)
+        if dont_section:
+            dont_items = [item.strip().lstrip('-*•').strip() for item in dont_section.group(1).strip().split('\n') if item.strip()]
+
+    return answer, EtiquetteInfo(
+        category=etiquette_category,
+        advice=advice,
+        additional_info=additional_info,
+        do_tips=do_items if do_items else None,
+        dont_tips=dont_items if dont_items else None
+    )
+
+ETIQUETTE_OPEN_TAG = "[ETIQUETTE_INFO]"
+ETIQUETTE_CLOSE_TAG = "[/ETIQUETTE_INFO]"
+
+class EtiquetteStreamSplitter:
+    """Separates an [ETIQUETTE_INFO] block from streamed text as it arrives
+
+    Text that could be the start of the opening tag is held back until the next
+    delta decides it, so no part of the block ever reaches the spoken text.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_block = False
+
+    def feed(self, delta: str) -> tuple[str, Optional[str]]:
+        """Return (speakable text, block body if the block just closed)"""
+        self._buffer += delta
+        speakable = ""
+        completed_block = None
+        while True:
+            if self._in_block:
+                end = self._buffer.find(ETIQUETTE_CLOSE_TAG)
+                if end < 0:
+                    return speakable, completed_block
+                completed_block = self._buffer[:end]
+                self._buffer = self._buffer[end + len(ETIQUETTE_CLOSE_TAG):]
+                self._in_block = False
+                continue
+
+            start = self._buffer.find(ETIQUETTE_OPEN_TAG)
+            if start >= 0:
+                speakable += self._buffer[:start]
+                self._buffer = self._buffer[start + len(ETIQUETTE_OPEN_TAG):]
+                self._in_block = True
+                continue
+
+            # Hold back a trailing "[ETIQ..." that may complete in the next delta
+            held = self._buffer.rfind("[", max(0, len(self._buffer) - len(ETIQUETTE_OPEN_TAG) + 1))
+            if held < 0 or not ETIQUETTE_OPEN_TAG.startswith(self._buffer[held:]):
+                held = len(self._buffer)
+            speakable += self._buffer[:held]
+            self._buffer = self._buffer[held:]
+            return speakable, completed_block
+
+    def flush(self) -> tuple[str, Optional[str]]:
+        """Return what is left at the end of the stream; an unterminated block still counts as a block"""
+        remaining, self._buffer = self._buffer, ""
+        if self._in_block:
+            self._in_block = False
+            return "", remaining
+        return remaining, None
+
+def parse_followups(followup_text: str) -> List[str]:
+    """Extract numbered or bulleted follow-up questions from free text"""
+    suggested_followups = []
+
+    followup_items = re.findall(r'[\d\-\*]\s*[\"\"]?(.*?)[\"\"]?[\n\r]', followup_text + '\n')
+
+    if followup_items:
+        suggested_followups = [item.strip() for item in followup_items if item.strip()]
+    else:
+        # If regex failed, split by newlines and clean up
+        lines = [line.strip() for line in followup_text.split('\n') if line.strip()]
+        for line in lines:
+            # Remove numbering or bullets if present
+            clean_line = re.sub(r'^[\d\-\*\.]+\s*', '', line).strip()
+            # Remove quotes if present
+            clean_line = clean_line.strip('"').strip("'").strip()
+            if clean_line and len(suggested_followups) < 3:
+                suggested_followups.append(clean_line)
+
+    return suggested_followups[:3]  # Limit to 3 suggestions
+
+# JSON schema for the single-call structured mode. Strict mode requires every
+# property to be listed as required, so optional values are nullable instead.
+STRUCTURED_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string"},
+        "etiquette": {
+            "type": ["object", "null"],
+            "properties": {
+                "advice": {"type": "string"},
+                "additional_info": {"type": ["string", "null"]},
+                "do_tips": {"type": "array", "items": {"type": "string"}},
+                "dont_tips": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["advice", "additional_info", "do_tips", "dont_tips"],
+            "additionalProperties": False,
+        },
+        "suggested_followups": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["answer", "etiquette", "suggested_followups"],
+    "additionalProperties": False,
+}
+
+def get_structured_instructions(etiquette_category: Optional[str]) -> str:
+    if etiquette_category:
+        etiquette_instruction = f"""This is a question about CULTURAL ETIQUETTE in Dubai, specifically about {etiquette_category.replace('-', ' ')}.
+Fill "etiquette" with a clear, concise piece of advice about this etiquette category (1-2 sentences), any additional context, 3-5 specific things tourists SHOULD DO and 3-5 specific things tourists SHOULD NOT DO."""
+    else:
+        etiquette_instruction = 'Set "etiquette" to null.'
+
+    return f"""
+Return a JSON object. Put your full spoken answer in "answer".
+{etiquette_instruction}
+Put 2-3 brief, conversational follow-up questions the user might want to ask next in "suggested_followups".
+All text values must follow the language instruction above.
+"""
+
+# Follow-ups computed off the critical path, kept for a short while for the client to fetch.
+# /followups may land on a different worker than the /query that deferred them, so handles
+# are shared through a SQLite file on local disk (set FOLLOWUPS_HANDLE_DB to "" to keep them
+# in this process, e.g. with a single worker). Across several hosts, use sticky sessions
+followup_handles = HandleStore(
+    ttl=float(os.environ.get("FOLLOWUPS_HANDLE_TTL", "120")),
+    shared_path=os.environ.get("FOLLOWUPS_HANDLE_DB", os.path.join(tempfile.gettempdir(), "voice-guide-followups.sqlite3")) or None,
+)
+
+# Tourist questions are very repetitive, so answers are cached per normalized query and language
+response_cache = TTLCache(
+    max_size=int(os.environ.get("RESPONSE_CACHE_MAX_SIZE", "1000")),
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "3600")),
+)
+
+# Paraphrases miss the exact cache, so a similarity index can sit behind it. Off unless
+# SEMANTIC_CACHE_CAPACITY is set: the bag-of-n-grams similarity is not tuned enough yet to
+# tell a rephrasing from a different question, and a wrong hit serves the wrong answer
+semantic_cache = SemanticCache(
+    threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+    capacity_per_language=int(os.environ.get("SEMANTIC_CACHE_CAPACITY", "0")),
+    ttl=response_cache.ttl,
+)
+
+# Identical requests arriving while the first is still being answered share its
+# upstream call; only used when the client allows cached answers
+query_flight = SingleFlight()
+answer_stream_flight = SingleFlight()
+answer_events_flight = SingleFlight()
+
+class CoalescingStats(BaseModel):
+    query: SingleFlightStats
+    stream: SingleFlightStats
+    stream_events: SingleFlightStats
+    locations: SingleFlightStats
+
+def coalescing_stats() -> CoalescingStats:
+    return CoalescingStats(
+        query=query_flight.stats(),
+        stream=answer_stream_flight.stats(),
+        stream_events=answer_events_flight.stats(),
+        locations=location_flight.stats(),
+    )
+
+REGISTRY.register_collector("dubai_assistant", lambda: [
+    *stats_samples("response_cache", response_cache.stats()),
+    *stats_samples("semantic_cache", semantic_cache.stats()),
+    *(
+        sample
+        for name, stats in coalescing_stats()
+        for sample in stats_samples("single_flight", stats, {"flight": name})
+    ),
+])
+
+def wants_location(request: TurnRequest) -> bool:
+    if request.include_location is not None:
+        return request.include_location
+    return looks_like_location_query(request.query)
+
+def get_cache_key(query: str, language: str) -> tuple[str, str]:
+    return (normalize_query(query), language)
+
+def lookup_cached_response(query: str, language: str) -> tuple[str, Optional[DubaiQueryResponse]]:
+    """Look in the exact cache, then the semantic cache. Returns the X-Cache status and any hit"""
+    cached = response_cache.get(get_cache_key(query, language))
+    if cached is not None:
+        return "HIT", cached
+
+    # The raw query: the semantic cache reads negations like "isn't" from the punctuation normalize_query drops
+    cached = semantic_cache.get(query, language)
+    if cached is not None:
+        return "SEMANTIC-HIT", cached
+
+    return "MISS", None
+
+def store_cached_response(query: str, language: str, result: DubaiQueryResponse) -> None:
+    response_cache.set(get_cache_key(query, language), result)
+    semantic_cache.set(query, language, result)
+
+def is_cache_bypassed(cache_control: Optional[str], x_cache_bypass: Optional[str]) -> bool:
+    """Clients skip the cache lookup with `Cache-Control: no-cache` or `X-Cache-Bypass: 1`"""
+    if x_cache_bypass and x_cache_bypass.lower() in ("1", "true", "yes"):
+        return True
+    return bool(cache_control) and "no-cache" in cache_control.lower()
+
+# Longest time text is held back waiting for a sentence boundary in sentence-segmented streams
+SENTENCE_MAX_WAIT = float(os.environ.get("SENTENCE_MAX_WAIT", "0.8"))
+
+def split_for_replay(text: str) -> List[str]:
+    """Split cached text into word-sized chunks so replays stream like live deltas"""
+    return re.findall(r'\S+\s*|\s+', text)
+
+class CompletionUsage(BaseModel):
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def add(self, completion) -> None:
+        self.calls += 1
+        if completion.usage:
+            self.prompt_tokens += completion.usage.prompt_tokens
+            self.completion_tokens += completion.usage.completion_tokens
+
+async def generate_followups(gateway: LLMGateway, query: str, answer: str, language_instruction: str, usage: CompletionUsage) -> List[str]:
+    """Generate follow-up suggestions in a separate call"""
+    followup_completion = await gateway.chat(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": f"Based on the user's question about Dubai and the provided answer, suggest 2-3 natural follow-up questions they might want to ask next. Keep them brief and conversational. {language_instruction}"},
+            {"role": "user", "content": f"User question: {query}\n\nAnswer provided: {answer}"}
+        ],
+        temperature=0.7,
+        max_tokens=150,
+        call="followups",
+    )
+    usage.add(followup_completion)
+    return parse_followups(followup_completion.choices[0].message.content)
+
+def build_answer_messages(query: str, language_instruction: str, etiquette_category: Optional[str], history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+    """Messages for a free-text answer, asking for an [ETIQUETTE_INFO] block on etiquette queries
+
+    `history` holds earlier user/assistant turns of a conversation, oldest first.
+    """
+    specialized_instructions = get_etiquette_instructions(etiquette_category) if etiquette_category else ""
+    return [
+        {"role": "system", "content": DUBAI_SYSTEM_PROMPT + "\n\n" + language_instruction + specialized_instructions},
+        *(history or []),
+        {"role": "user", "content": query}
+    ]
+
+async def answer_two_call(gateway: LLMGateway, query: str, language_instruction: str, etiquette_category: Optional[str], usage: CompletionUsage, defer_followups: bool = False, on_followups_ready: Optional[Callable[[DubaiQueryResponse], None]] = None) -> DubaiQueryResponse:
+    """Answer with free text (parsing the etiquette block), then ask for follow-ups
+
+    With defer_followups the answer is returned straight away and the follow-up call
+    runs in the background behind a handle, taking it off the time-to-first-audio.
+    on_followups_ready then receives the completed response once the follow-ups arrive.
+    """
+    completion = await gateway.chat(
+        model="gpt-4o-mini",  # Using gpt-4o-mini for a good balance of quality and cost
+        messages=build_answer_messages(query, language_instruction, etiquette_category),
+        temperature=0.7,
+        max_tokens=1000,
+        call="answer",
+    )
+    usage.add(completion)
+
+    answer = completion.choices[0].message.content
+    etiquette_info = None
+    if etiquette_category:
+        answer, etiquette_info = parse_etiquette_block(answer, etiquette_category)
+
+    if defer_followups:
+        async def complete_followups() -> List[str]:
+            suggested_followups = await generate_followups(gateway, query, answer, language_instruction, CompletionUsage())
+            if on_followups_ready:
+                on_followups_ready(DubaiQueryResponse(
+                    answer=answer,
+                    suggested_followups=suggested_followups,
+                    etiquette_info=etiquette_info
+                ))
+            return suggested_followups
+
+        followups_handle = followup_handles.submit(complete_followups())
+        return DubaiQueryResponse(
+            answer=answer,
+            etiquette_info=etiquette_info,
+            followups_handle=followups_handle
+        )
+
+    suggested_followups = await generate_followups(gateway, query, answer, language_instruction, usage)
+
+    return DubaiQueryResponse(
+        answer=answer,
+        suggested_followups=suggested_followups,
+        etiquette_info=etiquette_info
+    )
+
+async def answer_structured(gateway: LLMGateway, query: str, language_instruction: str, etiquette_category: Optional[str], usage: CompletionUsage) -> DubaiQueryResponse:
+    """Answer, etiquette block and follow-ups from a single JSON-schema completion"""
+    completion = await gateway.chat(
+        call="structured",
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": DUBAI_SYSTEM_PROMPT + "\n\n" + language_instruction + get_structured_instructions(etiquette_category)},
+            {"role": "user", "content": query}
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "dubai_answer", "strict": True, "schema": STRUCTURED_RESPONSE_SCHEMA},
+        },
+        temperature=0.7,
+        max_tokens=1150,
+    )
+    usage.add(completion)
+
+    result = json.loads(completion.choices[0].message.content)
+
+    etiquette_info = None
+    etiquette = result.get("etiquette")
+    if etiquette_category and etiquette and etiquette.get("advice"):
+        etiquette_info = EtiquetteInfo(
+            category=etiquette_category,
+            advice=etiquette["advice"],
+            additional_info=etiquette.get("additional_info") or None,
+            do_tips=etiquette.get("do_tips") or None,
+            dont_tips=etiquette.get("dont_tips") or None
+        )
+
+    suggested_followups = [item.strip() for item in result.get("suggested_followups", []) if item.strip()]
+
+    return DubaiQueryResponse(
+        answer=result["answer"].strip(),
+        suggested_followups=suggested_followups[:3],  # Limit to 3 suggestions
+        etiquette_info=etiquette_info
+    )
+
+async def stream_answer_events(
+    gateway: LLMGateway,
+    query: str,
+    language: str,
+    use_cache: bool = True,
+    segment: bool = False,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> AsyncIterator[tuple[str, Dict[str, Any]]]:
+    """Stream an answer as typed (event, data) pairs, independent of the transport
+
+    Events: `token` deltas of the spoken answer (or complete `sentence`s when `segment`
+    is set), `etiquette` once the [ETIQUETTE_INFO] block has been parsed out of the
+    stream, `followups`, and a final `done` with timings in milliseconds. Failures end
+    the stream with an `error` event.
+
+    Answers that depend on conversation `history` are neither read from nor stored in the cache.
+    Otherwise a request identical to one already streaming joins it: it gets the events
+    sent so far, then the rest live, and its `done` event is marked `coalesced`.
+    """
+    use_cache = use_cache and not history
+    if not use_cache:
+        events, coalesced = generate_answer_events(gateway, query, language, use_cache, segment, history), False
+    else:
+        events, coalesced = answer_events_flight.stream(
+            (*get_cache_key(query, language), segment),
+            lambda: generate_answer_events(gateway, query, language, use_cache, segment),
+        )
+
+    async with contextlib.aclosing(events):
+        async for event, data in events:
+            if event == "done" and coalesced:
+                data = {**data, "coalesced": True}
+            yield event, data
+
+async def generate_answer_events(
+    gateway: LLMGateway,
+    query: str,
+    language: str,
+    use_cache: bool,
+    segment: bool,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> AsyncIterator[tuple[str, Dict[str, Any]]]:
+    """The events of `stream_answer_events` for one upstream completion"""
+    text_event = "sentence" if segment else "token"
+    started = time.perf_counter()
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    cache_status, cached = "BYPASS", None
+    if use_cache:
+        cache_status, cached = lookup_cached_response(query, language)
+
+    if cached is not None:
+        STREAM_TIME_TO_FIRST_TEXT.observe(time.perf_counter() - started, ("events",))
+        for piece in segment_text(cached.answer) if segment else split_for_replay(cached.answer):
+            yield text_event, {"text": piece}
+        if cached.etiquette_info:
+            yield "etiquette", cached.etiquette_info.model_dump()
+        yield "followups", {"suggested_followups": cached.suggested_followups}
+        yield "done", {"cache": cache_status, "ttft_ms": 0.0, "answer_ms": 0.0, "followups_ms": 0.0, "total_ms": elapsed_ms()}
+        return
+
+    try:
+        language_instruction = get_language_instruction(language)
+        classification = classify_etiquette(query)
+        etiquette_category = classification.primary_category if classification.is_etiquette else None
+
+        deltas = gateway.stream_text(
+            model="gpt-4o-mini",
+            messages=build_answer_messages(query, language_instruction, etiquette_category, history),
             temperature=0.7,
             max_tokens=1000,
+            call="answer_stream",
         )
-        
-        full_response = completion.choices[0].message.content
-        
-        # Extract etiquette info if present
+
+        splitter = EtiquetteStreamSplitter()
+        answer_parts: List[str] = []
         etiquette_info = None
-        answer = full_response
-        
-        if is_etiquette:
-            import re
-            etiquette_match = re.search(r'\[ETIQUETTE_INFO\]\s*(.+?)\s*\[\/ETIQUETTE_INFO\]', full_response, re.DOTALL)
-            
-            if etiquette_match:
-                etiquette_text = etiquette_match.group(1)
-                
-                # Remove the etiquette info block from the main answer
-                answer = full_response.replace(etiquette_match.group(0), '').strip()
-                
-                # Parse etiquette information
-                category_match = re.search(r'Category:\s*(.+?)\s*(?:\n|$)', etiquette_text)
-                advice_match = re.search(r'Advice:\s*(.+?)\s*(?:\n|$)', etiquette_text)
-                additional_match = re.search(r'Additional:\s*(.+?)\s*(?:\n|$)', etiquette_text)
-                
-                do_items = re.findall(r'Do:\s*(?:[-*•]\s*(.+?)\s*(?:\n|$))+', etiquette_text)
-                if not do_items:
-                    do_items = re.findall(r'(?<=Do:\s*\n)\s*[-*•]\s*(.+?)\s*(?:\n|$)', etiquette_text)
-                
-                dont_items = re.findall(r'Dont:\s*(?:[-*•]\s*(.+?)\s*(?:\n|$))+', etiquette_text)
-                if not dont_items:
-                    dont_items = re.findall(r'(?<=Dont:\s*\n)\s*[-*•]\s*(.+?)\s*(?:\n|$)', etiquette_text)
-                
-                # Create etiquette info object if basic fields are present
-                if category_match and advice_match:
-                    category = category_match.group(1).strip()
-                    advice = advice_match.group(1).strip()
-                    additional_info = additional_match.group(1).strip() if additional_match else None
-                    
-                    # Further process do/don't items if not properly extracted
-                    if not do_items:
-                        do_section = re.search(r'Do:\s*\n(.+?)(?:Dont:|\[|\/)', etiquette_text, re.DOTALL)
-                        if do_section:
-                            do_items = [item.strip().lstrip('-*•').strip() for item in do_section.group(1).strip().split('\n') if item.strip()]
-                    
-                    if not dont_items:
-                        dont_section = re.search(r'Dont:\s*\n(.+?)(?:\[|\/)', etiquette_text, re.DOTALL)
-                        if dont_section:
-                            dont_items = [item.strip().lstrip('-*•').strip() for item in dont_section.group(1).strip().split('\n') if item.strip()]
-                    
-                    etiquette_info = EtiquetteInfo(
-                        category=etiquette_category,
-                        advice=advice,
-                        additional_info=additional_info,
-                        do_tips=do_items if do_items else None,
-                        dont_tips=dont_items if dont_items else None
-                    )
-        
-        # Generate follow-up suggestions in a separate call
-        followup_completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": f"Based on the user's question about Dubai and the provided answer, suggest 2-3 natural follow-up questions they might want to ask next. Keep them brief and conversational. {language_instruction}"},
-                {"role": "user", "content": f"User question: {request.query}\n\nAnswer provided: {answer}"}
-            ],
-            temperature=0.7,
-            max_tokens=150,
+        etiquette_events: List[tuple[str, Dict[str, Any]]] = []
+        ttft_ms = None
+
+        def handle_block(block: Optional[str]):
+            nonlocal etiquette_info
+            if block is not None and etiquette_category and etiquette_info is None:
+                _, etiquette_info = parse_etiquette_block(ETIQUETTE_OPEN_TAG + block + ETIQUETTE_CLOSE_TAG, etiquette_category)
+                if etiquette_info:
+                    etiquette_events.append(("etiquette", etiquette_info.model_dump()))
+
+        async def speakable_text() -> AsyncIterator[str]:
+            async for delta in deltas:
+                speakable, block = splitter.feed(delta)
+                handle_block(block)
+                if speakable:
+                    answer_parts.append(speakable)
+                    yield speakable
+            speakable, block = splitter.flush()
+            handle_block(block)
+            if speakable:
+                answer_parts.append(speakable)
+                yield speakable
+
+        texts = segment_sentences(speakable_text(), max_wait=SENTENCE_MAX_WAIT) if segment else speakable_text()
+        async for text in texts:
+            if ttft_ms is None:
+                ttft_ms = elapsed_ms()
+                STREAM_TIME_TO_FIRST_TEXT.observe(ttft_ms / 1000, ("events",))
+            yield text_event, {"text": text}
+            while etiquette_events:
+                yield etiquette_events.pop(0)
+        for event in etiquette_events:
+            yield event
+        answer_ms = elapsed_ms()
+
+        answer = "".join(answer_parts).strip()
+        suggested_followups = await generate_followups(gateway, query, answer, language_instruction, CompletionUsage())
+        yield "followups", {"suggested_followups": suggested_followups}
+        followups_ms = elapsed_ms()
+
+        if not history:
+            store_cached_response(query, language, DubaiQueryResponse(
+                answer=answer,
+                suggested_followups=suggested_followups,
+                etiquette_info=etiquette_info
+            ))
+
+        yield "done", {
+            "cache": cache_status,
+            "ttft_ms": ttft_ms if ttft_ms is not None else answer_ms,
+            "answer_ms": answer_ms,
+            "followups_ms": round(followups_ms - answer_ms, 1),
+            "total_ms": elapsed_ms(),
+        }
+
+    except Exception as e:
+        record_error("dubai_assistant.stream_events", e)
+        yield "error", {"detail": f"Error processing query: {str(e)}"}
+
+class AnswerOutcome(NamedTuple):
+    result: DubaiQueryResponse
+    cache_status: str
+    mode: Optional[str] = None
+    usage: Optional[CompletionUsage] = None
+    coalesced: bool = False
+
+async def answer_query(gateway: LLMGateway, request: DubaiQueryRequest, use_cache: bool = True) -> AnswerOutcome:
+    """Answer a query from the cache or with the requested completion mode
+
+    With the cache enabled, a request identical to one still being answered waits for
+    that answer instead of making its own call. Its outcome is marked `coalesced` and
+    has no usage, since it made no call.
+    """
+    language = get_primary_language(request.language)
+
+    if not use_cache:
+        return await generate_answer(gateway, request, language, "BYPASS")
+
+    cache_status, cached = lookup_cached_response(request.query, language)
+    if cached is not None:
+        return AnswerOutcome(cached, cache_status)
+
+    mode = request.mode or DEFAULT_COMPLETION_MODE
+    key = (*get_cache_key(request.query, language), mode, request.defer_followups)
+    outcome, coalesced = await query_flight.do(key, lambda: generate_answer(gateway, request, language, cache_status))
+    return outcome._replace(usage=None, coalesced=True) if coalesced else outcome
+
+async def generate_answer(gateway: LLMGateway, request: DubaiQueryRequest, language: str, cache_status: str) -> AnswerOutcome:
+    """Answer with the requested completion mode and store the result in the cache"""
+    # Customize response language instruction based on user's preference
+    language_instruction = get_language_instruction(language)
+
+    # Check if this is a cultural etiquette query
+    classification = classify_etiquette(request.query)
+    etiquette_category = classification.primary_category if classification.is_etiquette else None
+
+    mode = request.mode or DEFAULT_COMPLETION_MODE
+    usage = CompletionUsage()
+    if mode == "two_call":
+        result = await answer_two_call(
+            gateway, request.query, language_instruction, etiquette_category, usage,
+            defer_followups=request.defer_followups,
+            on_followups_ready=lambda completed: store_cached_response(request.query, language, completed),
         )
-        
-        # Process follow-up suggestions
-        followup_text = followup_completion.choices[0].message.content
-        suggested_followups = []
-        
-        # Extract numbered or bulleted items
-        import re
-        followup_items = re.findall(r'[\d\-\*]\s*[\"\"]?(.*?)[\"\"]?[\n\r]', followup_text + '\n')
-        
-        if followup_items:
-            suggested_followups = [item.strip() for item in followup_items if item.strip()]
-        else:
-            # If regex failed, split by newlines and clean up
-            lines = [line.strip() for line in followup_text.split('\n') if line.strip()]
-            for line in lines:
-                # Remove numbering or bullets if present
-                clean_line = re.sub(r'^[\d\-\*\.]+\s*', '', line).strip()
-                # Remove quotes if present
-                clean_line = clean_line.strip('"').strip("'").strip()
-                if clean_line and len(suggested_followups) < 3:
-                    suggested_followups.append(clean_line)
-        
-        return DubaiQueryResponse(
-            answer=answer,
-            suggested_followups=suggested_followups[:3],  # Limit to 3 suggestions
-            etiquette_info=etiquette_info
+    else:
+        result = await answer_structured(gateway, request.query, language_instruction, etiquette_category, usage)
+
+    # Deferred responses are cached once their follow-ups are ready
+    if not result.followups_handle:
+        store_cached_response(request.query, language, result)
+
+    return AnswerOutcome(result, cache_status, mode, usage)
+
+@router.post("/query", response_model=DubaiQueryResponse)
+async def process_dubai_query(
+    request: DubaiQueryRequest,
+    response: Response,
+    gateway: LLMGatewayDep,
+    cache_control: Optional[str] = Header(None),
+    x_cache_bypass: Optional[str] = Header(None),
+) -> DubaiQueryResponse:
+    # Add CORS headers
+    add_cors_headers(response)
+    """
+    Process a user query about Dubai and return relevant information
+    """
+    if request.defer_followups and (request.mode or DEFAULT_COMPLETION_MODE) != "two_call":
+        raise HTTPException(
+            status_code=422,
+            detail="defer_followups requires the two_call mode; structured completions return follow-ups with the answer",
         )
-    
+    try:
+        outcome = await answer_query(gateway, request, use_cache=not is_cache_bypassed(cache_control, x_cache_bypass))
+        response.headers["X-Cache"] = outcome.cache_status
+        if outcome.coalesced:
+            response.headers["X-Coalesced"] = "1"
+
+        # Expose the mode and token usage so the two modes can be benchmarked side by side
+        if outcome.usage is not None:
+            response.headers["X-Completion-Mode"] = outcome.mode
+            response.headers["X-LLM-Calls"] = str(outcome.usage.calls)
+            response.headers["X-LLM-Prompt-Tokens"] = str(outcome.usage.prompt_tokens)
+            response.headers["X-LLM-Completion-Tokens"] = str(outcome.usage.completion_tokens)
+
+        return outcome.result
+
     except Exception as e:
+        record_error("dubai_assistant.query", e)
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+@router.get("/followups/{handle}", response_model=FollowupsResponse)
+async def get_deferred_followups(handle: str, response: Response, wait: float = 0.0) -> FollowupsResponse:
+    """
+    Fetch follow-ups deferred by /query, optionally waiting up to `wait` seconds (max 10) for them
+    """
+    # Add CORS headers
+    add_cors_headers(response)
+
+    status, suggested_followups = await followup_handles.get(handle, wait=min(max(wait, 0.0), 10.0))
+    return FollowupsResponse(status=status, suggested_followups=suggested_followups or [])
+
 @router.post("/stream", tags=["stream"])
-def stream_dubai_response(request: DubaiQueryRequest, response: Response):
+async def stream_dubai_response(
+    request: DubaiQueryRequest,
+    http_request: Request,
+    response: Response,
+    gateway: LLMGatewayDep,
+    segment: Optional[Literal["sentence"]] = None,
+    cache_control: Optional[str] = Header(None),
+    x_cache_bypass: Optional[str] = Header(None),
+):
     """
     Stream a response to a Dubai query for a more interactive experience
+
+    With `segment=sentence` the answer is streamed as newline-delimited JSON, one
+    `{"text": ...}` object per complete sentence or clause, ready for speech synthesis
     """
     from fastapi.responses import StreamingResponse
-    
+
+    started = time.perf_counter()
+
     # Add CORS headers
     add_cors_headers(response)
-    
-    def generate_response():
-        try:
-            client = get_openai_client()
-            
-            # Get user's preferred language
-            language_code = request.language.lower()
-            
-            # Extract primary language code (e.g., 'en' from 'en-US')
-            if '-' in language_code:
-                language = language_code.split('-')[0]
-            else:
-                language = language_code
-            
-            # Customize response language instruction based on user's preference
-            language_instruction = ""
-            if language == "en":
-                language_instruction = "Respond in English."
-            elif language == "ar":
-                language_instruction = "Respond in Arabic (العربية). Make sure all text is in proper Arabic."
-            elif language == "zh":
-                language_instruction = "Respond in simplified Chinese (简体中文). Make sure all text is in proper Chinese characters."
-            elif language == "ru":
-                language_instruction = "Respond in Russian (русский). Make sure all text is in proper Cyrillic characters."
-            elif language == "hi":
-                language_instruction = "Respond in Hindi (हिन्दी). Make sure all text is in proper Hindi using Devanagari script."
-            elif language == "es":
-                language_instruction = "Respond in Spanish (Español). Make sure all text is in proper Spanish."
-            elif language == "de":
-                language_instruction = "Respond in German (Deutsch). Make sure all text is in proper German."
-            elif language == "fr":
-                language_instruction = "Respond in French (Français). Make sure all text is in proper French."
+
+    media_type = "application/x-ndjson" if segment else "text/plain"
+
+    def format_segment(text: str) -> str:
+        return json.dumps({"text": text}, ensure_ascii=False) + "\n"
+
+    # Replay a cached /query answer instead of generating a new one
+    language = get_primary_language(request.language)
+    use_cache = not is_cache_bypassed(cache_control, x_cache_bypass)
+    cache_status, cached = "BYPASS", None
+    if use_cache:
+        cache_status, cached = lookup_cached_response(request.query, language)
+
+    if cached is not None:
+        async def replay_response():
+            STREAM_TIME_TO_FIRST_TEXT.observe(time.perf_counter() - started, ("stream",))
+            if segment:
+                for sentence in segment_text(cached.answer):
+                    yield format_segment(sentence)
             else:
-                language_instruction = "Respond in English."
-            
-            # Generate a streaming response
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": DUBAI_SYSTEM_PROMPT + "\n\n" + language_instruction},
-                    {"role": "user", "content": request.query}
-                ],
-                temperature=0.7,
-                max_tokens=800,
-                stream=True,
-            )
-            
-            for chunk in response:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-                    
+                for piece in split_for_replay(cached.answer):
+                    yield piece
+
+        return StreamingResponse(replay_response(), media_type=media_type, headers={"X-Cache": cache_status})
+
+    def open_deltas() -> AsyncIterator[str]:
+        # Customize response language instruction based on user's preference
+        language_instruction = get_language_instruction(language)
+
+        # Generate a streaming response, closed upstream once no client is reading it
+        return gateway.stream_text(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": DUBAI_SYSTEM_PROMPT + "\n\n" + language_instruction},
+                {"role": "user", "content": request.query}
+            ],
+            temperature=0.7,
+            max_tokens=800,
+            call="answer_stream",
+        )
+
+    # A request identical to one already streaming joins it, starting from its first delta
+    if use_cache:
+        deltas, coalesced = answer_stream_flight.stream(get_cache_key(request.query, language), open_deltas)
+    else:
+        deltas, coalesced = open_deltas(), False
+
+    async def generate_response():
+        try:
+            first = True
+            texts = segment_sentences(deltas, max_wait=SENTENCE_MAX_WAIT) if segment else deltas
+            # Closed explicitly, so a shared stream loses this subscriber right away
+            async with contextlib.aclosing(texts):
+                async for text in texts:
+                    if first:
+                        STREAM_TIME_TO_FIRST_TEXT.observe(time.perf_counter() - started, ("stream",))
+                        first = False
+                    yield format_segment(text) if segment else text
+
         except Exception as e:
-            yield f"Error: {str(e)}"
-    
-    return StreamingResponse(generate_response(), media_type="text/plain")
+            record_error("dubai_assistant.stream", e)
+            error = f"Error: {str(e)}"
+            yield json.dumps({"error": error}, ensure_ascii=False) + "\n" if segment else error
+
+    headers = {"X-Cache": cache_status}
+    if coalesced:
+        headers["X-Coalesced"] = "1"
+    return StreamingResponse(
+        cancel_on_disconnect(http_request, generate_response()),
+        media_type=media_type,
+        headers=headers,
+    )
+
+@router.post("/stream-events", tags=["stream"])
+async def stream_dubai_events(
+    request: DubaiQueryRequest,
+    http_request: Request,
+    gateway: LLMGatewayDep,
+    segment: Optional[Literal["sentence"]] = None,
+    cache_control: Optional[str] = Header(None),
+    x_cache_bypass: Optional[str] = Header(None),
+):
+    """
+    Stream a response as Server-Sent Events: `token` deltas of the spoken answer (complete
+    `sentence` events with `segment=sentence`), a typed `etiquette` event, `followups`,
+    and a final `done` event with timing data
+    """
+    from fastapi.responses import StreamingResponse
+
+    events = stream_answer_events(
+        gateway,
+        request.query,
+        get_primary_language(request.language),
+        use_cache=not is_cache_bypassed(cache_control, x_cache_bypass),
+        segment=segment == "sentence",
+    )
+
+    async def generate_events():
+        async for event, data in events:
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        cancel_on_disconnect(http_request, generate_events()),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+async def turn_events(
+    gateway: LLMGateway,
+    request: TurnRequest,
+    use_cache: bool = True,
+    segment: bool = False,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> AsyncIterator[tuple[str, Dict[str, Any]]]:
+    """Answer events from `stream_answer_events`, with a `location` event merged in as soon as the map data is ready"""
+    started = time.perf_counter()
+    location_task = asyncio.ensure_future(resolve_location_query(request.query, gateway, request.current_location)) if wants_location(request) else None
+    location_ms = None
+
+    def location_event() -> tuple[str, Dict[str, Any]]:
+        nonlocal location_ms
+        location_ms = round((time.perf_counter() - started) * 1000, 1)
+        try:
+            return "location", location_task.result().model_dump()
+        except Exception as e:
+            return "error", {"detail": f"Error querying location: {str(e)}"}
+
+    events = stream_answer_events(gateway, request.query, get_primary_language(request.language), use_cache, segment, history)
+    next_event: Optional[asyncio.Future] = None
+    try:
+        while True:
+            next_event = asyncio.ensure_future(anext(events))
+            if location_task is not None and location_ms is None:
+                await asyncio.wait([next_event, location_task], return_when=asyncio.FIRST_COMPLETED)
+                if location_task.done():
+                    yield location_event()
+            try:
+                event, data = await next_event
+            except StopAsyncIteration:
+                break
+            finally:
+                next_event = None
+
+            # The answer is complete: the map data goes out before the final timing event
+            if event == "done" and location_task is not None and location_ms is None:
+                await asyncio.wait([location_task])
+                yield location_event()
+            if event == "done":
+                data = {**data, "location_ms": location_ms}
+            yield event, data
+    finally:
+        if location_task is not None:
+            location_task.cancel()
+        await cancel_pending_read(events, next_event)
+
+@router.post("/turn", response_model=TurnResponse)
+async def process_voice_turn(
+    request: TurnRequest,
+    response: Response,
+    gateway: LLMGatewayDep,
+    cache_control: Optional[str] = Header(None),
+    x_cache_bypass: Optional[str] = Header(None),
+) -> TurnResponse:
+    """
+    Answer one voice turn: the location lookup and the assistant answer run concurrently,
+    so the turn takes about as long as the slower of the two instead of their sum
+    """
+    # Add CORS headers
+    add_cors_headers(response)
+
+    use_cache = not is_cache_bypassed(cache_control, x_cache_bypass)
+    answer_task = answer_query(gateway, DubaiQueryRequest(query=request.query, language=request.language, mode=request.mode), use_cache)
+    location_task = resolve_location_query(request.query, gateway, request.current_location) if wants_location(request) else asyncio.sleep(0)
+    # A failed location lookup only drops the map data, not the answer
+    outcome, location = await asyncio.gather(answer_task, location_task, return_exceptions=True)
+    if isinstance(outcome, BaseException):
+        record_error("dubai_assistant.turn", outcome)
+        raise HTTPException(status_code=500, detail=f"Error processing turn: {str(outcome)}")
+    if isinstance(location, BaseException):
+        record_error("dubai_assistant.turn_location", location)
+        log.warning("turn_location_failed", error=str(location))
+        location = None
+
+    response.headers["X-Cache"] = outcome.cache_status
+    return TurnResponse(answer=outcome.result, location=location)
+
+@router.post("/turn/stream", tags=["stream"])
+async def stream_voice_turn(
+    request: TurnRequest,
+    http_request: Request,
+    gateway: LLMGatewayDep,
+    segment: Optional[Literal["sentence"]] = None,
+    cache_control: Optional[str] = Header(None),
+    x_cache_bypass: Optional[str] = Header(None),
+):
+    """
+    Stream one voice turn as Server-Sent Events: the events of /stream-events plus a
+    `location` event with the map data as soon as it is ready, usually before the answer ends
+    """
+    from fastapi.responses import StreamingResponse
+
+    events = turn_events(
+        gateway,
+        request,
+        use_cache=not is_cache_bypassed(cache_control, x_cache_bypass),
+        segment=segment == "sentence",
+    )
+
+    async def generate_events():
+        async for event, data in events:
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        cancel_on_disconnect(http_request, generate_events()),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+# Earlier turns a /session WebSocket keeps as context for the next answer
+SESSION_HISTORY_TURNS = int(os.environ.get("SESSION_HISTORY_TURNS", "4"))
+
+class ConversationSession:
+    """Per-connection state of a /session WebSocket"""
+
+    def __init__(self, language: str = "en-US", history_turns: int = SESSION_HISTORY_TURNS):
+        self.id = uuid.uuid4().hex
+        self.language = language
+        self.turns = 0
+        # Alternating user/assistant messages of the most recent turns
+        self.history: collections.deque[Dict[str, str]] = collections.deque(maxlen=2 * history_turns)
+
+    def remember(self, query: str, answer: str) -> None:
+        if self.history.maxlen and answer:
+            self.history.append({"role": "user", "content": query})
+            self.history.append({"role": "assistant", "content": answer})
+
+def select_subprotocol(websocket: WebSocket) -> Optional[str]:
+    """The first offered protocol that is not the bearer token, which is never echoed back.
+
+    Browsers drop the connection unless one offered protocol is echoed, so browser clients
+    offer a plain protocol (e.g. "voice") alongside `Authorization.Bearer.<jwt>`.
+    """
+    protocols = websocket.scope.get("subprotocols") or []
+    return next((p for p in protocols if not p.startswith("Authorization.Bearer.")), None)
+
+@router.websocket("/session")
+async def voice_session(websocket: WebSocket, gateway: LLMGatewayDep):
+    """
+    Persistent voice session, authenticated once at connect time via Sec-WebSocket-Protocol.
+
+    Client messages (JSON): `{"type": "query", "query": ..., "language"?, "segment"?: "sentence",
+    "include_location"?}`, `{"type": "language", "language": ...}`, `{"type": "cancel"}` and
+    `{"type": "reset"}`. The session keeps its language and the last few turns as context.
+
+    Server messages: `ready`, then per turn the /turn/stream events as `{"type": <event>,
+    "turn": n, ...data}` (`token` or `sentence`, `etiquette`, `location`, `followups`,
+    `done`, `error`), and `cancelled` when a turn is interrupted. A new query interrupts
+    the turn in progress, so the user can barge in.
+    """
+    await websocket.accept(subprotocol=select_subprotocol(websocket))
+    session = ConversationSession()
+    send_lock = asyncio.Lock()
+    turn_task: Optional[asyncio.Task] = None
+
+    async def send(message: Dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def run_turn(turn: int, request: TurnRequest, segment: bool) -> None:
+        parts: List[str] = []
+        try:
+            async for event, data in turn_events(gateway, request, segment=segment, history=list(session.history)):
+                if event in ("token", "sentence"):
+                    parts.append(data["text"])
+                await send({"type": event, "turn": turn, **data})
+        except (WebSocketDisconnect, RuntimeError):
+            # The socket closed mid-turn, the receive loop cleans up
+            return
+        session.remember(request.query, (" " if segment else "").join(parts).strip())
+
+    async def cancel_turn() -> None:
+        if turn_task is not None and not turn_task.done():
+            turn_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await turn_task
+            await send({"type": "cancelled", "turn": session.turns})
+
+    await send({"type": "ready", "session_id": session.id, "language": session.language})
+    try:
+        while True:
+            try:
+                message = SessionMessage.model_validate(await websocket.receive_json())
+            except (ValidationError, ValueError) as e:
+                await send({"type": "error", "detail": f"Invalid message: {str(e)}"})
+                continue
+
+            if message.language:
+                session.language = message.language
+
+            if message.type == "cancel":
+                await cancel_turn()
+            elif message.type == "reset":
+                await cancel_turn()
+                session.history.clear()
+            elif message.type == "query":
+                if not message.query:
+                    await send({"type": "error", "detail": "Missing query"})
+                    continue
+                await cancel_turn()
+                session.turns += 1
+                request = TurnRequest(query=message.query, language=session.language, include_location=message.include_location)
+                turn_task = asyncio.create_task(run_turn(session.turns, request, message.segment == "sentence"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Cancelling the turn also cancels its upstream LLM streams
+        if turn_task is not None and not turn_task.done():
+            turn_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await turn_task
@@ -1,11 +1,28 @@
 from fastapi import APIRouter, HTTPException, Response
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Dict, Optional, Any
-import databutton as db
+from app.libs.distance_matrix import DistanceMatrix
+from app.libs.llm_gateway import LLMGateway, LLMGatewayDep
+from app.libs.location_catalog import BaseLocationCatalog, LocationCatalog
+from app.libs.location_resolver import LocationResolver, normalize_text
+from app.libs.location_store import LocationStore
+from app.libs.road_router import RoadRouter
+from app.libs.single_flight import SingleFlight
+from app.libs.spatial_index import SpatialIndex, haversine_km
+from databutton_app.metrics import REGISTRY, record_error, stats_samples
+from databutton_app.structured_log import get_logger
+from pathlib import Path
+import asyncio
+import itertools
 import json
+import numpy as np
+import os
+import threading
 
 router = APIRouter(prefix="/dubai-locations")
 
+log = get_logger(__name__)
+
 # Define CORS headers
 def add_cors_headers(response: Response):
     response.headers["Access-Control-Allow-Origin"] = "*"
@@ -20,6 +37,9 @@ class LocationQueryRequest(BaseModel):
     current_location: Optional[Dict[str, float]] = Field(None, description="The user's current location (lat/lng) if available")
 
 class Location(BaseModel):
+    # Catalog instances are shared by all requests, so they must not be modified
+    model_config = ConfigDict(frozen=True)
+
     id: str
     name: str
     category: str
@@ -34,6 +54,18 @@ class DirectionsInfo(BaseModel):
     duration_text: str
     steps: List[str]
 
+class DistanceMatrixRequest(BaseModel):
+    origins: List[str] = Field(..., min_length=1, description="Location ids to measure from; a single id for one-to-many")
+    destinations: Optional[List[str]] = Field(None, description="Location ids to measure to; every location when omitted")
+
+class DistanceMatrixResponse(BaseModel):
+    origins: List[str]
+    destinations: List[str]
+    # One row per origin, one column per destination. Straight-line, not along roads:
+    # directions from /query use road distances and times when a road graph is loaded
+    distances_km: List[List[float]] = Field(..., description="Great-circle distances in km")
+    durations_min: List[List[int]] = Field(..., description="Straight-line distance at the average speed, in whole minutes")
+
 class LocationQueryResponse(BaseModel):
     locations: List[Location] = Field(default_factory=list)
     primary_location: Optional[str] = None
@@ -125,24 +157,172 @@ DUBAI_LOCATIONS = [
     }
 ]
 
+# Alternative names for the locations above: local names in the app's languages,
+# and common speech-to-text misspellings. Names and ids are always matched.
+LOCATION_ALIASES = {
+    "burj-khalifa": [
+        "burj khalifah", "burj kalifa", "berj khalifa", "burj califa", "burge khalifa",
+        "برج خليفة", "哈利法塔", "迪拜塔", "Бурдж-Халифа", "Бурдж Халифа", "बुर्ज खलीफा", "बुर्ज ख़लीफ़ा",
+    ],
+    "dubai-mall": [
+        "dubai mall", "dubai maul", "dubai mol", "dubai moll",
+        "دبي مول", "迪拜购物中心", "迪拜商场", "Дубай Молл", "दुबई मॉल", "Dubái Mall",
+    ],
+    "palm-jumeirah": [
+        "the palm", "palm jumeira", "palm jumera", "palm jumeriah", "palm jumairah",
+        "نخلة جميرا", "朱美拉棕榈岛", "棕榈岛", "Пальма Джумейра", "पाम जुमेराह",
+    ],
+    "dubai-marina": [
+        "marina", "dubai marena", "dubai marine",
+        "مرسى دبي", "迪拜码头", "Дубай Марина", "दुबई मरीना",
+    ],
+    "dubai-frame": [
+        "the frame", "dubai fram",
+        "برواز دبي", "迪拜相框", "Дубайская рамка", "दुबई फ्रेम", "Marco de Dubái", "Cadre de Dubaï",
+    ],
+    "al-fahidi": [
+        "al fahidi", "al fahedi", "al fahidi district", "bastakiya", "al bastakiya",
+        "حي الفهيدي التاريخي", "الفهيدي", "法希迪历史区", "Аль-Фахиди", "अल फहीदी",
+    ],
+    "jbr-beach": [
+        "jbr", "the beach jbr", "jumeirah beach residence", "j b r beach", "jay bee are beach",
+        "شاطئ جي بي آر", "JBR海滩", "пляж JBR", "जेबीआर बीच", "Playa JBR", "Plage JBR",
+    ],
+    "dubai-museum": [
+        "al fahidi fort", "dubai musuem",
+        "متحف دبي", "迪拜博物馆", "Музей Дубая", "दुबई संग्रहालय", "Museo de Dubái", "Musée de Dubaï",
+    ],
+    "miracle-garden": [
+        "miracle garden", "dubai miracle garden", "miricle garden",
+        "حديقة دبي المعجزة", "迪拜奇迹花园", "Дубайский сад чудес", "दुबई मिरेकल गार्डन",
+    ],
+    "mall-of-emirates": [
+        "mall of emirates", "moe", "ski dubai", "mall of the emirate",
+        "مول الإمارات", "阿联酋购物中心", "Молл Эмирейтс", "मॉल ऑफ द एमिरेट्स", "Mall de los Emiratos",
+    ],
+}
+
+# Words for the catalog categories in the app's languages, so "nearest beach" or
+# "museums near me" are answered from the spatial index. Category names always match.
+CATEGORY_KEYWORDS = {
+    "beach": [
+        "beach", "beaches", "شاطئ", "شواطئ", "海滩", "沙滩", "пляж", "пляжи", "समुद्र तट", "बीच",
+        "playa", "playas", "strand", "strände", "plage", "plages",
+    ],
+    "shopping": [
+        "mall", "malls", "shop", "shops", "souk", "souks", "market", "markets", "مول", "سوق", "تسوق",
+        "商场", "购物", "торговый центр", "рынок", "шопинг", "मॉल", "बाजार", "शॉपिंग",
+        "centro comercial", "compras", "einkaufszentrum", "einkaufen", "centre commercial",
+    ],
+    "historical": [
+        "museum", "museums", "historic", "history", "heritage", "متحف", "تاريخي", "تراث", "博物馆", "历史",
+        "музей", "музеи", "исторический", "संग्रहालय", "ऐतिहासिक", "museo", "histórico", "historisch",
+        "musée", "historique",
+    ],
+    "attraction": [
+        "attractions", "sights", "sightseeing", "landmark", "landmarks", "معالم", "معلم", "景点",
+        "достопримечательности", "पर्यटन स्थल", "atracción", "atracciones", "sehenswürdigkeiten",
+        "monument", "monuments",
+    ],
+}
+
+# Set LOCATIONS_DB to serve the catalog from a file built with `python -m app.libs.location_store`
+# instead of DUBAI_LOCATIONS: it is shared by all workers and reloaded when replaced
+LOCATIONS_DB = os.environ.get("LOCATIONS_DB")
+
+# Validated once; requests look locations up by id and reuse their encoded JSON
+location_catalog: BaseLocationCatalog[Location] = (
+    LocationStore(LOCATIONS_DB, Location, check_interval=float(os.environ.get("LOCATIONS_DB_CHECK_INTERVAL", "5")))
+    if LOCATIONS_DB
+    else LocationCatalog(DUBAI_LOCATIONS, Location)
+)
+
+# Large catalogs cannot all go into the LLM prompt; the local resolver still knows every name
+LOCATIONS_PROMPT_LIMIT = int(os.environ.get("LOCATIONS_PROMPT_LIMIT", "500"))
+
+def build_locations_prompt(catalog: BaseLocationCatalog) -> str:
+    """The catalog part of the LLM location parse prompt, which only changes with the catalog"""
+    return "Available Dubai locations:\n" + "".join(
+        f"- {name} (ID: {location_id}, Category: {category})\n"
+        for location_id, name, category in itertools.islice(catalog.summaries(), LOCATIONS_PROMPT_LIMIT)
+    )
+
+def build_location_resolver(catalog: BaseLocationCatalog) -> LocationResolver:
+    """Resolves obvious place names locally so only ambiguous queries need the LLM"""
+    return LocationResolver(
+        [{"id": location_id, "name": name} for location_id, name, _ in catalog.summaries()],
+        LOCATION_ALIASES,
+        min_confidence=float(os.environ.get("LOCATION_RESOLVER_MIN_CONFIDENCE", "0.8")),
+        category_keywords={
+            category: [category, *CATEGORY_KEYWORDS.get(category, [])] for category in catalog.categories
+        },
+    )
+
+LOCATIONS_PROMPT = build_locations_prompt(location_catalog)
+location_resolver: LocationResolver | None = None
+spatial_index: SpatialIndex | None = None
+distance_matrix: DistanceMatrix | None = None
+
+# Assume average speed of 35 km/h in Dubai traffic
+AVERAGE_SPEED_KMH = 35
+
+def reindex_locations() -> None:
+    """Rebuild the prompt, the resolver, the spatial index and the distance matrix, at startup and after the catalog file was replaced"""
+    global LOCATIONS_PROMPT, location_resolver, spatial_index, distance_matrix
+    LOCATIONS_PROMPT = build_locations_prompt(location_catalog)
+    points = list(location_catalog.points())
+    spatial_index = SpatialIndex(points)
+    distance_matrix = DistanceMatrix(points, speed_kmh=AVERAGE_SPEED_KMH)
+    location_resolver = build_location_resolver(location_catalog)
+    log.info("locations_reindexed", locations=len(location_catalog), version=location_catalog.version)
+
+location_catalog.on_reload(reindex_locations)
+
+if isinstance(location_catalog, LocationStore):
+    # Indexing a large catalog takes seconds, so it does not hold up startup;
+    # until it is done, every location query is parsed by the LLM and nothing is "nearby"
+    threading.Thread(target=reindex_locations, name="locations-index", daemon=True).start()
+    REGISTRY.register_collector("location_store", lambda: stats_samples("location_store", location_catalog.stats()))
+else:
+    reindex_locations()
+
+# Road graph built with `python -m app.libs.road_router` from an OSM extract of Dubai; without one
+# (or while it loads), directions are straight-line estimates at the average speed
+ROAD_GRAPH = os.environ.get("ROAD_GRAPH", str(Path(__file__).parent / "dubai_roads.npz"))
+road_router: RoadRouter | None = None
+
+def load_road_router() -> None:
+    global road_router
+    try:
+        router = RoadRouter.load(ROAD_GRAPH, cache_size=int(os.environ.get("ROUTE_CACHE_SIZE", "10000")))
+    except Exception as e:
+        record_error("dubai_locations.road_graph", e)
+        log.error("road_graph_load_failed", path=ROAD_GRAPH, error=str(e))
+        return
+    road_router = router
+    REGISTRY.register_collector("road_router", lambda: stats_samples("road_router", router.stats()))
+    log.info("road_graph_loaded", path=ROAD_GRAPH, vertices=router.vertices, landmarks=router.landmarks)
+
+if os.path.exists(ROAD_GRAPH):
+    threading.Thread(target=load_road_router, name="road-graph-load", daemon=True).start()
+else:
+    # See the backend README for building the graph from an OpenStreetMap extract
+    log.warning("road_graph_missing", path=ROAD_GRAPH, fallback="straight_line")
+
+# The parse is on the critical path of every map update, so a stalled call falls back quickly
+LOCATION_PARSE_TIMEOUT = float(os.environ.get("LOCATION_PARSE_TIMEOUT", "10"))
+
 # Function to process location queries using OpenAI
-def process_location_query(query: str) -> dict:
+async def process_location_query(query: str, gateway: LLMGateway) -> dict:
     """Process a location query to identify places and directions requests"""
+    resolved = location_resolver.resolve(query) if location_resolver is not None else None
+    if resolved is not None:
+        return resolved
+
     try:
-        from openai import OpenAI
-        
-        # Initialize OpenAI client
-        api_key = db.secrets.get("OPENAI_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="OpenAI API key is not configured")
-        
-        client = OpenAI(api_key=api_key)
-        
         # Prepare the system prompt with all possible locations
-        locations_info = "Available Dubai locations:\n"
-        for loc in DUBAI_LOCATIONS:
-            locations_info += f"- {loc['name']} (ID: {loc['id']}, Category: {loc['category']})\n"
-        
+        locations_info = LOCATIONS_PROMPT
+
         system_prompt = f"""
         You are a location search system for a Dubai tourism app. 
         Your task is to parse user queries about places in Dubai and identify which locations they're asking about.
@@ -177,20 +357,23 @@ def process_location_query(query: str) -> dict:
         If a location isn't in the list, don't include it in the results.
         """
         
-        response = client.chat.completions.create(
+        response = await gateway.chat(
+            call="location_parse",
             model="gpt-4o-mini",
             response_format={"type": "json_object"},
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": query}
-            ]
+            ],
+            timeout=LOCATION_PARSE_TIMEOUT,
         )
         
         result = json.loads(response.choices[0].message.content)
         return result
         
     except Exception as e:
-        print(f"Error processing location query: {str(e)}")
+        record_error("dubai_locations.parse", e)
+        log.warning("location_query_failed", error=str(e), fallback="burj-khalifa")
         # If there's an error, return a fallback with Burj Khalifa
         return {
             "location_ids": ["burj-khalifa"],
@@ -200,94 +383,232 @@ def process_location_query(query: str) -> dict:
             "destination_id": None
         }
 
-# Mock directions generator (in a real app, this would use Google Maps Directions API)
+# Turn-by-turn directions on the road graph, or a straight-line estimate without one
 def generate_directions(origin_id: str, destination_id: str) -> DirectionsInfo:
-    """Generate directions between two locations"""
+    """Generate directions between two locations, on the road graph when there is one"""
     # Find the origin and destination locations
-    origin = next((loc for loc in DUBAI_LOCATIONS if loc["id"] == origin_id), None)
-    destination = next((loc for loc in DUBAI_LOCATIONS if loc["id"] == destination_id), None)
+    origin = location_catalog.get(origin_id)
+    destination = location_catalog.get(destination_id)
     
     if not origin or not destination:
         raise HTTPException(status_code=404, detail="Location not found")
     
-    # Calculate a very simple distance (straight-line)
-    import math
-    
-    lat1, lng1 = origin["location"]["lat"], origin["location"]["lng"]
-    lat2, lng2 = destination["location"]["lat"], destination["location"]["lng"]
+    # Fastest route on the road graph; routes are cached by their snapped end points
+    router = road_router
+    route = router.route(
+        origin.location["lat"], origin.location["lng"], destination.location["lat"], destination.location["lng"]
+    ) if router is not None else None
+    if route is not None:
+        return DirectionsInfo(
+            origin=origin,
+            destination=destination,
+            distance_text=f"{route.distance_m / 1000:.1f} km",
+            duration_text=f"{int(route.duration_s // 60)} mins",
+            steps=[f"Start from {origin.name}", *route.steps, f"Arrive at {destination.name}"]
+        )
     
-    # Calculate distance in kilometers using Haversine formula
-    R = 6371  # Earth radius in kilometers
-    dlat = math.radians(lat2 - lat1)
-    dlng = math.radians(lng2 - lng1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    distance = R * c
+    # No road graph, or a location off the network: straight-line distance, precomputed for the catalog; computed here while it is being rebuilt
+    matrix = distance_matrix
+    distance = matrix.distance_km(origin_id, destination_id) if matrix is not None else None
+    if distance is None:
+        distance = haversine_km(
+            origin.location["lat"], origin.location["lng"], destination.location["lat"], destination.location["lng"]
+        )
     
-    # Assume average speed of 35 km/h in Dubai traffic
-    duration_hours = distance / 35
+    duration_hours = distance / AVERAGE_SPEED_KMH
     duration_minutes = int(duration_hours * 60)
     
     # Generate mock directions
     steps = [
-        f"Start from {origin['name']}",
+        f"Start from {origin.name}",
         "Head to the main road",
-        f"Continue towards {destination['name']}",
-        f"Arrive at {destination['name']}"
+        f"Continue towards {destination.name}",
+        f"Arrive at {destination.name}"
     ]
     
     return DirectionsInfo(
-        origin=Location(**origin),
-        destination=Location(**destination),
+        origin=origin,
+        destination=destination,
         distance_text=f"{distance:.1f} km",
         duration_text=f"{duration_minutes} mins",
         steps=steps
     )
 
+def looks_like_location_query(query: str) -> bool:
+    """Cheap local check for a place name, a directions or a "near me" phrase, without calling the LLM"""
+    resolver = location_resolver
+    if resolver is None:
+        return False
+    tokens = normalize_text(query).split()
+    return bool(resolver.find_mentions(tokens)) or resolver.is_directions_query(tokens) or resolver.is_nearby_query(tokens)
+
+# Places returned for a "near me" query
+NEARBY_RESULTS = int(os.environ.get("NEARBY_RESULTS", "5"))
+
+def user_position(current_location: Optional[Dict[str, float]]) -> tuple[float, float] | None:
+    """(lat, lng) of the user's current location, if a valid one was sent"""
+    try:
+        lat, lng = float(current_location["lat"]), float(current_location["lng"])
+    except (TypeError, KeyError, ValueError):
+        return None
+    return (lat, lng) if -90 <= lat <= 90 and -180 <= lng <= 180 else None
+
+def zoom_for_radius(radius_km: float) -> int:
+    """Map zoom level that keeps places up to `radius_km` from the center in view"""
+    for zoom, max_km in ((15, 1), (14, 2.5), (13, 5), (12, 10)):
+        if radius_km <= max_km:
+            return zoom
+    return 11
+
+def resolve_nearby_query(query: str, position: tuple[float, float] | None) -> LocationQueryResponse | None:
+    """Answer "nearest beach" or "museums near me" from the spatial index, without calling the LLM
+
+    Places are ranked by distance from the place named in the query ("beaches near
+    Burj Khalifa"), or else from the user's position. Returns None for any other query.
+    """
+    resolver, index = location_resolver, spatial_index
+    if resolver is None or index is None:
+        return None
+    tokens = normalize_text(query).split()
+    if not resolver.is_nearby_query(tokens) or resolver.is_directions_query(tokens):
+        return None
+
+    mentions = [mention for mention in resolver.find_mentions(tokens) if mention[3] >= resolver.min_confidence]
+    anchor = location_catalog.get(mentions[0][2]) if mentions else None
+    if anchor is not None:
+        center = (anchor.location["lat"], anchor.location["lng"])
+    elif position is not None:
+        center = position
+    else:
+        return None
+
+    # Place names are not category keywords ("Dubai Mall" is not a request for malls)
+    covered = {i for start, end, _, _ in mentions for i in range(start, end)}
+    category = resolver.find_category(["" if i in covered else token for i, token in enumerate(tokens)])
+    hits = [
+        (distance, location_id)
+        for distance, location_id in index.nearest(*center, k=NEARBY_RESULTS + 1, category=category)
+        if anchor is None or location_id != anchor.id
+    ][:NEARBY_RESULTS]
+    locations = [location for _, location_id in hits if (location := location_catalog.get(location_id)) is not None]
+    if not locations:
+        return None
+
+    return LocationQueryResponse(
+        locations=locations,
+        primary_location=locations[0].id,
+        map_center={"lat": center[0], "lng": center[1]},
+        zoom_level=zoom_for_radius(hits[-1][0]),
+    )
+
+# Identical location queries arriving together share one parse
+location_flight = SingleFlight()
+
+async def resolve_location_query(
+    query: str, gateway: LLMGateway, current_location: Optional[Dict[str, float]] = None
+) -> LocationQueryResponse:
+    """Identify the places in a query and build the map payload for them
+
+    "Near me" queries are answered locally. Concurrent identical queries (after
+    normalization, and from about the same position) are coalesced into one call.
+    """
+    position = user_position(current_location)
+    nearby = resolve_nearby_query(query, position)
+    if nearby is not None:
+        return nearby
+
+    key = normalize_text(query)
+    if position is not None:
+        # Positions within ~10 m rank places the same
+        key = (key, round(position[0], 4), round(position[1], 4))
+    result, _ = await location_flight.do(key, lambda: build_location_response(query, gateway, position))
+    return result
+
+async def build_location_response(
+    query: str, gateway: LLMGateway, position: tuple[float, float] | None = None
+) -> LocationQueryResponse:
+    # Process the query to identify locations
+    result = await process_location_query(query, gateway)
+    
+    # Get the identified locations
+    location_ids = result.get("location_ids", [])
+    primary_location_id = result.get("primary_location_id")
+    is_directions_request = result.get("is_directions_request", False)
+    origin_id = result.get("origin_id")
+    destination_id = result.get("destination_id")
+    
+    # Retrieve the location information
+    locations = location_catalog.by_ids(location_ids)
+    if position is not None:
+        # Nearby first
+        locations.sort(key=lambda loc: haversine_km(*position, loc.location["lat"], loc.location["lng"]))
+    
+    # Default map center
+    map_center = {"lat": 25.2048, "lng": 55.2708}  # Dubai center
+    zoom_level = 11
+    
+    # Set the map center to the primary location if available
+    if primary_location_id:
+        primary_loc = location_catalog.get(primary_location_id)
+        if primary_loc:
+            map_center = primary_loc.location
+            zoom_level = 14
+    
+    # Generate directions if requested
+    directions = None
+    if is_directions_request and origin_id and destination_id:
+        # A route search that misses the cache takes tens of milliseconds, so it runs off the event loop
+        directions = await asyncio.to_thread(generate_directions, origin_id, destination_id)
+        # Adjust zoom to fit the route
+        zoom_level = 12
+    
+    return LocationQueryResponse(
+        locations=locations,
+        primary_location=primary_location_id,
+        directions=directions,
+        map_center=map_center,
+        zoom_level=zoom_level
+    )
+
 @router.post("/query", response_model=LocationQueryResponse)
-async def query_location(request: LocationQueryRequest, response: Response) -> LocationQueryResponse:
+async def query_location(request: LocationQueryRequest, response: Response, gateway: LLMGatewayDep) -> LocationQueryResponse:
     # Add CORS headers
     add_cors_headers(response)
     """Process a location query and return relevant information"""
     try:
-        # Process the query to identify locations
-        result = process_location_query(request.query)
-        
-        # Get the identified locations
-        location_ids = result.get("location_ids", [])
-        primary_location_id = result.get("primary_location_id")
-        is_directions_request = result.get("is_directions_request", False)
-        origin_id = result.get("origin_id")
-        destination_id = result.get("destination_id")
-        
-        # Retrieve the location information
-        locations = [Location(**loc) for loc in DUBAI_LOCATIONS if loc["id"] in location_ids]
-        
-        # Default map center
-        map_center = {"lat": 25.2048, "lng": 55.2708}  # Dubai center
-        zoom_level = 11
-        
-        # Set the map center to the primary location if available
-        if primary_location_id:
-            primary_loc = next((loc for loc in DUBAI_LOCATIONS if loc["id"] == primary_location_id), None)
-            if primary_loc:
-                map_center = primary_loc["location"]
-                zoom_level = 14
-        
-        # Generate directions if requested
-        directions = None
-        if is_directions_request and origin_id and destination_id:
-            directions = generate_directions(origin_id, destination_id)
-            # Adjust zoom to fit the route
-            zoom_level = 12
-        
-        return LocationQueryResponse(
-            locations=locations,
-            primary_location=primary_location_id,
-            directions=directions,
-            map_center=map_center,
-            zoom_level=zoom_level
-        )
-        
+        result = await resolve_location_query(request.query, gateway, request.current_location)
+        # Catalog locations are written from their pre-encoded JSON
+        return add_cors_headers(Response(location_catalog.encode(result), media_type="application/json"))
+
     except Exception as e:
+        record_error("dubai_locations.query", e)
         raise HTTPException(status_code=500, detail=f"Error querying location: {str(e)}")
+
+# Bounds the work and response size of one /distances call
+MAX_MATRIX_PAIRS = int(os.environ.get("MAX_MATRIX_PAIRS", "250000"))
+
+@router.post("/distances", response_model=DistanceMatrixResponse)
+def location_distances(request: DistanceMatrixRequest) -> Response:
+    """Straight-line distances and travel times from one or more origins to many destinations, in one call.
+
+    Unlike /query directions, these never use the road graph: a road time for every pair would
+    take a route search each, while this is one vectorized computation.
+    """
+    matrix = distance_matrix
+    if matrix is None:
+        raise HTTPException(status_code=503, detail="Locations are still being indexed")
+    destinations = request.destinations if request.destinations is not None else matrix.ids
+    if len(request.origins) * len(destinations) > MAX_MATRIX_PAIRS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MATRIX_PAIRS} origin/destination pairs per request")
+    try:
+        distances = matrix.matrix(request.origins, request.destinations)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Location not found: {', '.join(e.args[0])}")
+
+    result = DistanceMatrixResponse.model_construct(
+        origins=request.origins,
+        destinations=destinations,
+        distances_km=np.round(distances, 3).tolist(),
+        durations_min=matrix.durations_minutes(distances).tolist(),
+    )
+    return add_cors_headers(Response(result.model_dump_json(), media_type="application/json"))
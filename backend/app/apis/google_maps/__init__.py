@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Response
-import databutton as db
+from app.libs.secrets_provider import SecretsDep
 
 router = APIRouter()
 
@@ -15,11 +15,11 @@ class MapSettings:
     api_key: str
 
 @router.get("/api-key")
-def get_google_maps_api_key(response: Response):
+def get_google_maps_api_key(response: Response, secrets: SecretsDep):
     # Add CORS headers
     add_cors_headers(response)
     """Get the Google Maps API key. This endpoint should only be called from the frontend."""
-    api_key = db.secrets.get("GOOGLE_MAPS_API_KEY")
+    api_key = secrets.get("GOOGLE_MAPS_API_KEY")
     
     if not api_key:
         return {"api_key": "", "error": "Google Maps API key not found"}
@@ -0,0 +1,125 @@
+"""Vectorized great-circle distances and travel times between catalog locations.
+
+Distances are computed with NumPy for whole rows or blocks of origin/destination
+pairs at once, instead of one `math` haversine per pair:
+
+- catalogs of up to `precompute_limit` locations get their full all-pairs matrix
+  computed up front, so every lookup is an array index
+- larger catalogs (where the matrix would not fit in memory) compute the
+  requested block on demand, and keep the most recent full rows (one origin to
+  every location) in a small LRU
+
+Travel times assume a constant average speed, as the mock directions do.
+
+Usage:
+
+    from app.libs.distance_matrix import DistanceMatrix
+
+    matrix = DistanceMatrix(catalog.points())
+    distances = matrix.matrix(["burj-khalifa"])  # 1 x n, km
+    minutes = matrix.durations_minutes(distances)
+"""
+
+import collections
+import math
+import threading
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from app.libs.spatial_index import EARTH_RADIUS_KM
+
+
+class DistanceMatrix:
+    """All-pairs distances (km) and travel times (minutes) over (id, category, lat, lng) points."""
+
+    def __init__(
+        self,
+        points: Iterable[tuple[str, str, float, float]],
+        speed_kmh: float = 35.0,
+        precompute_limit: int = 1_000,
+        cached_rows: int = 64,
+    ):
+        points = list(points)
+        self.ids = [location_id for location_id, _, _, _ in points]
+        self._index = {location_id: i for i, location_id in enumerate(self.ids)}
+        self.speed_kmh = speed_kmh
+        self._lat = np.radians(np.array([lat for _, _, lat, _ in points], dtype=np.float64))
+        self._lng = np.radians(np.array([lng for _, _, _, lng in points], dtype=np.float64))
+        self._cos_lat = np.cos(self._lat)
+
+        # n x n float64: 8 MB at the default limit
+        self._matrix = self._distances(np.arange(len(self.ids))) if len(self.ids) <= precompute_limit else None
+        if self._matrix is not None:
+            # Shared by every request
+            self._matrix.flags.writeable = False
+        self.cached_rows = cached_rows
+        self._rows: collections.OrderedDict[int, np.ndarray] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def precomputed(self) -> bool:
+        return self._matrix is not None
+
+    def _distances(self, origins: np.ndarray, destinations: np.ndarray | None = None) -> np.ndarray:
+        """len(origins) x len(destinations) haversine distances; every location when `destinations` is None."""
+        lat1, lng1, cos1 = (a[origins, None] for a in (self._lat, self._lng, self._cos_lat))
+        if destinations is None:
+            lat2, lng2, cos2 = self._lat, self._lng, self._cos_lat
+        else:
+            lat2, lng2, cos2 = self._lat[destinations], self._lng[destinations], self._cos_lat[destinations]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * np.sin((lng2 - lng1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def indices(self, location_ids: Sequence[str]) -> np.ndarray:
+        """Positions of `location_ids`; raises KeyError listing the unknown ones."""
+        unknown = [location_id for location_id in location_ids if location_id not in self._index]
+        if unknown:
+            raise KeyError(unknown)
+        return np.fromiter((self._index[location_id] for location_id in location_ids), dtype=np.intp, count=len(location_ids))
+
+    def _row(self, origin: int) -> np.ndarray:
+        with self._lock:
+            row = self._rows.get(origin)
+            if row is not None:
+                self._rows.move_to_end(origin)
+                return row
+        row = self._distances(np.array([origin]))[0]
+        row.flags.writeable = False
+        with self._lock:
+            self._rows[origin] = row
+            while len(self._rows) > self.cached_rows:
+                self._rows.popitem(last=False)
+        return row
+
+    def matrix(self, origin_ids: Sequence[str], destination_ids: Sequence[str] | None = None) -> np.ndarray:
+        """Distances in km, one row per origin and one column per destination (every location if None)."""
+        origins = self.indices(origin_ids)
+        destinations = self.indices(destination_ids) if destination_ids is not None else None
+        if self._matrix is not None:
+            rows = self._matrix[origins]
+            return rows if destinations is None else rows[:, destinations]
+        if destinations is None:
+            # Whole rows are the ones worth keeping: the same origin is often asked for everything nearby
+            return np.stack([self._row(origin) for origin in origins]) if len(origins) else np.empty((0, len(self)))
+        return self._distances(origins, destinations)
+
+    def distance_km(self, origin_id: str, destination_id: str) -> float | None:
+        """Distance of one pair, or None when either id is unknown."""
+        origin, destination = self._index.get(origin_id), self._index.get(destination_id)
+        if origin is None or destination is None:
+            return None
+        if self._matrix is not None:
+            return float(self._matrix[origin, destination])
+        # Scalar math: NumPy's per-call overhead outweighs vectorizing a single pair
+        lat1, lat2 = self._lat[origin].item(), self._lat[destination].item()
+        dlng = self._lng[destination].item() - self._lng[origin].item()
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+    def durations_minutes(self, distances_km: np.ndarray) -> np.ndarray:
+        """Whole minutes at the average speed, truncated like the single-pair directions."""
+        return (distances_km / self.speed_kmh * 60).astype(np.int64)
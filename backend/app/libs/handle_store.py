@@ -0,0 +1,158 @@
+"""Short-lived handles to results that are still being computed in the background.
+
+A handle is only known to the process that submitted it, unless the store is
+given a `shared_path`: the status and (JSON-encoded) result of every handle are
+then also written to that SQLite file, and a process that does not know a handle
+looks it up there. Every uvicorn worker on a host can thus answer for handles
+issued by any of them. The file must be on local disk (SQLite locking does not
+work on network file systems), so deployments spread over several hosts need
+sticky sessions instead.
+
+Usage:
+
+    from app.libs.handle_store import HandleStore
+
+    store = HandleStore(ttl=120, shared_path="/tmp/handles.sqlite3")
+    handle = store.submit(some_coroutine())
+    ...
+    status, result = await store.get(handle, wait=2.0)
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Coroutine, Literal
+
+from databutton_app.structured_log import get_logger
+
+log = get_logger(__name__)
+
+HandleStatus = Literal["pending", "ready", "failed", "unknown"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS handles (
+    handle TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    result TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS handles_expiry ON handles (expires_at);
+"""
+
+# How often a process polls the shared file for a handle another process is computing
+SHARED_POLL_INTERVAL = 0.1
+# Expired rows are deleted at most this often
+SHARED_PRUNE_INTERVAL = 10.0
+
+
+class HandleStore:
+    """Runs coroutines as tasks and keeps their results addressable for `ttl` seconds."""
+
+    def __init__(self, ttl: float = 120.0, max_size: int = 10_000, shared_path: str | os.PathLike | None = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        # Insertion ordered, so the oldest handles are always first
+        self._tasks: dict[str, tuple[float, asyncio.Task]] = {}
+        self._db = _open_shared(shared_path) if shared_path else None
+        self._next_shared_prune = 0.0
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> str:
+        """Start `coro` in the background and return a handle to its result."""
+        self._prune()
+        handle = uuid.uuid4().hex
+        task = asyncio.create_task(coro)
+        task.add_done_callback(_report_failure)
+        self._tasks[handle] = (time.monotonic() + self.ttl, task)
+        if self._db is not None:
+            self._publish(handle, "pending", None)
+            task.add_done_callback(lambda task: self._publish_outcome(handle, task))
+        return handle
+
+    async def get(self, handle: str, wait: float = 0.0) -> tuple[HandleStatus, Any]:
+        """Return (status, result), waiting up to `wait` seconds for a pending task."""
+        self._prune()
+        entry = self._tasks.get(handle)
+        if entry is None:
+            return await self._get_shared(handle, wait) if self._db is not None else ("unknown", None)
+
+        _, task = entry
+        if not task.done() and wait > 0:
+            # asyncio.wait never cancels the task when the timeout expires
+            await asyncio.wait([task], timeout=wait)
+
+        if not task.done():
+            return "pending", None
+        if task.cancelled() or task.exception() is not None:
+            return "failed", None
+        return "ready", task.result()
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        while self._tasks:
+            handle, (expires_at, task) = next(iter(self._tasks.items()))
+            if expires_at > now and len(self._tasks) < self.max_size:
+                break
+            del self._tasks[handle]
+            if not task.done():
+                task.cancel()
+
+        if self._db is not None and now >= self._next_shared_prune:
+            self._next_shared_prune = now + SHARED_PRUNE_INTERVAL
+            try:
+                self._db.execute("DELETE FROM handles WHERE expires_at <= ?", (time.time(),))
+            except sqlite3.Error as e:
+                log.warning("shared_handles_prune_failed", error=str(e))
+
+    # The shared file is written from the event loop: a WAL-mode write without fsync
+    # takes tens of microseconds, less than handing it to a thread would
+    def _publish(self, handle: str, status: HandleStatus, result: Any) -> None:
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO handles (handle, status, result, expires_at) VALUES (?, ?, ?, ?)",
+                (handle, status, None if result is None else json.dumps(result), time.time() + self.ttl),
+            )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            # Other workers then see the handle as pending until it expires; this one still answers for it
+            log.warning("shared_handle_write_failed", status=status, error=str(e))
+
+    def _publish_outcome(self, handle: str, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is not None:
+            self._publish(handle, "failed", None)
+        else:
+            self._publish(handle, "ready", task.result())
+
+    async def _get_shared(self, handle: str, wait: float) -> tuple[HandleStatus, Any]:
+        """Look a handle from another process up in the shared file, polling while it is pending."""
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                row = self._db.execute(
+                    "SELECT status, result FROM handles WHERE handle = ? AND expires_at > ?", (handle, time.time())
+                ).fetchone()
+            except sqlite3.Error as e:
+                log.warning("shared_handle_read_failed", error=str(e))
+                return "unknown", None
+            if row is None:
+                return "unknown", None
+            status, result = row
+            remaining = deadline - time.monotonic()
+            if status != "pending" or remaining <= 0:
+                return status, None if result is None else json.loads(result)
+            await asyncio.sleep(min(SHARED_POLL_INTERVAL, remaining))
+
+
+def _open_shared(path: str | os.PathLike) -> sqlite3.Connection:
+    # Autocommit; every process opens the same file, so writers wait for each other's locks
+    db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def _report_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("background_task_failed", error=str(task.exception()))
@@ -0,0 +1,99 @@
+"""Single-pass multi-keyword matcher with word-boundary awareness.
+
+The keywords are merged into a trie, and the trie is compiled into one regular
+expression whose alternations share their prefixes. Matching is a single
+left-to-right scan in the C regex engine, and a failed attempt costs at most
+one trie walk, however many keywords there are.
+
+A match only counts when it starts at a word boundary and ends at one, optionally
+after a common English inflection: "greet" matches "greeting" and "greets", but
+"eat" does not match "great" and "card" does not match "discarded". Keywords
+ending in "*" are stems and match any word ending.
+
+The scan reports the longest keyword at each position, so a keyword that contains
+shorter keywords ("dress code" contains "dress") inherits their labels at build time.
+
+Usage:
+
+    from app.libs.keyword_automaton import KeywordAutomaton
+
+    automaton = KeywordAutomaton({"dress": ["dress-code"], "invit*": ["home-visits"]})
+    for keyword, labels in automaton.find("we were invited"):
+        ...
+"""
+
+import re
+from typing import Hashable, Iterable, Iterator
+
+# Word endings allowed after a keyword that is not a stem
+INFLECTIONS = ("s", "es", "ed", "d", "ing", "ings", "er", "ers", "al", "ly")
+
+_END = ""  # Trie key marking the end of a keyword
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for a trie node, with alternations factored by shared prefix."""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != _END]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # Keywords ending here are optional continuations of longer ones; greedy, so the longest wins
+    return f"(?:{body})?" if _END in node else body
+
+
+def _build_trie(words: Iterable[str]) -> dict:
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[_END] = {}
+    return trie
+
+
+class KeywordAutomaton:
+    """Keyword trie compiled to a regex, built once and shared read-only."""
+
+    def __init__(self, keywords: dict[str, Iterable[Hashable]]):
+        labels_by_keyword: dict[str, tuple[Hashable, ...]] = {}
+        words, stems = [], []
+        for keyword, labels in keywords.items():
+            pattern = keyword.rstrip("*").lower()
+            (stems if keyword.endswith("*") else words).append(pattern)
+            labels_by_keyword[pattern] = tuple(labels)
+
+        inflection = "(?:" + "|".join(sorted(INFLECTIONS, key=len, reverse=True)) + ")?"
+        alternatives = []
+        # Exactly two groups, so findall() always returns (word, stem) pairs; (?!) never matches
+        word_pattern = _trie_pattern(_build_trie(words)) if words else "(?!)"
+        stem_pattern = _trie_pattern(_build_trie(stems)) if stems else "(?!)"
+        self._regex = re.compile(
+            f"(?<!\\w)(?:(?P<word>{word_pattern}){inflection}(?!\\w)|(?P<stem>{stem_pattern}))"
+        )
+
+        # Only the longest keyword at a position is reported, so fold in the labels
+        # of every shorter keyword found inside it
+        self.labels: dict[str, tuple[Hashable, ...]] = {}
+        for keyword, labels in labels_by_keyword.items():
+            inner = [
+                label
+                for other, other_labels in labels_by_keyword.items()
+                if other != keyword
+                and re.search(
+                    f"(?<!\\w){re.escape(other)}" + ("" if other in stems else f"{inflection}(?!\\w)"),
+                    keyword,
+                )
+                for label in other_labels
+            ]
+            self.labels[keyword] = tuple(dict.fromkeys((*labels, *inner)))
+
+    def find(self, text: str) -> Iterator[tuple[str, tuple[Hashable, ...]]]:
+        """Yield (keyword, labels) for every whole-word keyword occurrence in `text`."""
+        for word, stem in self._regex.findall(text.lower()):
+            keyword = word or stem
+            yield keyword, self.labels[keyword]
+
+    def find_labels(self, text: str) -> list[tuple[Hashable, ...]]:
+        """Labels of every keyword occurrence in `text`; the fast path when keywords aren't needed."""
+        labels = self.labels
+        return [labels[word or stem] for word, stem in self._regex.findall(text.lower())]
@@ -0,0 +1,211 @@
+"""App-scoped async gateway to the OpenAI API.
+
+The gateway is created once in `create_app()` and stored on `app.state`, so every
+router shares one keep-alive connection pool instead of building a new client
+(and doing a new TLS handshake) per request.
+
+Usage:
+
+    from app.libs.llm_gateway import LLMGatewayDep
+
+    @router.post("/example")
+    async def example(gateway: LLMGatewayDep):
+        completion = await gateway.chat(model="gpt-4o-mini", messages=[...])
+"""
+
+import asyncio
+import os
+import time
+from typing import Annotated, Any, AsyncIterator, Callable
+
+import anyio
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.requests import HTTPConnection
+from openai import AsyncOpenAI, AuthenticationError
+from pydantic import BaseModel
+
+from app.libs.secrets_provider import load_secret
+from databutton_app.metrics import REGISTRY, record_error
+
+LLM_REQUEST_DURATION = REGISTRY.histogram(
+    "llm_request_duration_seconds", "LLM call latency; streamed calls until the last chunk", ["call"]
+)
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram("llm_time_to_first_token_seconds", "Time to the first streamed content chunk", ["call"])
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens reported in OpenAI `usage`", ["call", "kind"])
+
+
+def record_usage(call: str, usage: Any) -> None:
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, (call, "prompt"))
+        LLM_TOKENS.inc(usage.completion_tokens or 0, (call, "completion"))
+
+
+class LLMGatewayConfig(BaseModel):
+    # Connection pool limits shared by all routers in this worker
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+
+    # Default per-call timeouts in seconds, can be overridden per call
+    connect_timeout: float = 5.0
+    request_timeout: float = 60.0
+
+    max_retries: int = 2
+    base_url: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "LLMGatewayConfig":
+        """Read overrides from LLM_* environment variables."""
+        env_fields = {
+            "max_connections": "LLM_MAX_CONNECTIONS",
+            "max_keepalive_connections": "LLM_MAX_KEEPALIVE_CONNECTIONS",
+            "keepalive_expiry": "LLM_KEEPALIVE_EXPIRY",
+            "connect_timeout": "LLM_CONNECT_TIMEOUT",
+            "request_timeout": "LLM_REQUEST_TIMEOUT",
+            "max_retries": "LLM_MAX_RETRIES",
+            "base_url": "LLM_BASE_URL",
+        }
+        overrides = {
+            field: os.environ[var] for field, var in env_fields.items() if os.environ.get(var)
+        }
+        return cls.model_validate(overrides)
+
+
+class StreamStats(BaseModel):
+    started: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    # Streamed chunks; OpenAI sends about one token per content chunk
+    tokens_streamed: int = 0
+    # Unused max_tokens budget of cancelled streams, an upper bound on tokens not paid for
+    tokens_saved: int = 0
+
+
+def get_openai_api_key() -> str | None:
+    """Reads the secret store on every call; the app passes its `SecretsProvider` instead."""
+    return load_secret("OPENAI_API_KEY")
+
+
+class LLMGateway:
+    """Shared AsyncOpenAI client with a bounded keep-alive connection pool."""
+
+    def __init__(
+        self,
+        config: LLMGatewayConfig,
+        api_key_provider: Callable[[], str | None] = get_openai_api_key,
+        on_authentication_error: Callable[[], None] | None = None,
+    ):
+        self.config = config
+        self._api_key_provider = api_key_provider
+        self._on_authentication_error = on_authentication_error
+        self._api_key: str | None = None
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(config.request_timeout, connect=config.connect_timeout),
+        )
+        self._client: AsyncOpenAI | None = None
+        self.stream_stats = StreamStats()
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The OpenAI client, rebuilt on the shared connection pool when the API key changes."""
+        api_key = self._api_key_provider()
+        if self._client is None or api_key != self._api_key:
+            if not api_key:
+                raise HTTPException(status_code=500, detail="OpenAI API key is not configured")
+            self._api_key = api_key
+            self._client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=self.config.base_url,
+                max_retries=self.config.max_retries,
+                http_client=self._http_client,
+            )
+        return self._client
+
+    async def chat(self, *, call: str = "other", timeout: float | None = None, **kwargs: Any):
+        """Non-blocking `chat.completions.create`, with an optional per-call timeout.
+
+        `call` names the call site in metrics ("answer", "followups", ...). Streamed
+        calls are measured by `stream_text`.
+        """
+        started = time.perf_counter()
+        try:
+            completion = await self.client.chat.completions.create(
+                timeout=timeout if timeout is not None else self.config.request_timeout,
+                **kwargs,
+            )
+        except Exception as e:
+            record_error(f"llm.{call}", e)
+            if isinstance(e, AuthenticationError) and self._on_authentication_error is not None:
+                # The key was probably rotated: reload it for the next calls
+                self._on_authentication_error()
+            raise
+        if not kwargs.get("stream"):
+            LLM_REQUEST_DURATION.observe(time.perf_counter() - started, (call,))
+            record_usage(call, completion.usage)
+        return completion
+
+    async def stream_text(
+        self, *, max_tokens: int, call: str = "other", timeout: float | None = None, **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """Stream content deltas of a chat completion.
+
+        Chunks are only read from upstream when the consumer asks for the next one, so a
+        slow client applies backpressure. If the consumer is cancelled or closes the
+        iterator early, the upstream HTTP response is closed right away, which stops
+        the generation instead of letting it run on to `max_tokens`.
+        """
+        started = time.perf_counter()
+        stream = await self.chat(
+            call=call,
+            stream=True,
+            # The last chunk then carries the token usage
+            stream_options={"include_usage": True},
+            max_tokens=max_tokens,
+            timeout=timeout,
+            **kwargs,
+        )
+        self.stream_stats.started += 1
+        tokens = 0
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if tokens == 0:
+                        LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, (call,))
+                    tokens += 1
+                    yield chunk.choices[0].delta.content
+                if chunk.usage is not None:
+                    record_usage(call, chunk.usage)
+            self.stream_stats.completed += 1
+            LLM_REQUEST_DURATION.observe(time.perf_counter() - started, (call,))
+        except Exception as e:
+            record_error(f"llm.{call}", e)
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            self.stream_stats.cancelled += 1
+            self.stream_stats.tokens_saved += max(0, max_tokens - tokens)
+            raise
+        finally:
+            self.stream_stats.tokens_streamed += tokens
+            # Shielded, so closing still happens while the surrounding task is being cancelled
+            with anyio.CancelScope(shield=True):
+                await stream.close()
+
+    async def aclose(self) -> None:
+        await self._http_client.aclose()
+
+
+def get_llm_gateway(request: HTTPConnection) -> LLMGateway:
+    gateway: LLMGateway | None = getattr(request.app.state, "llm_gateway", None)
+
+    if gateway is None:
+        raise HTTPException(status_code=500, detail="LLM gateway is not configured")
+    return gateway
+
+
+LLMGatewayDep = Annotated[LLMGateway, Depends(get_llm_gateway)]
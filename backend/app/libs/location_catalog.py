@@ -0,0 +1,163 @@
+"""Indexed, pre-validated catalog of static location records.
+
+The catalog is built once at startup. It validates every record into an
+immutable (frozen) model and precomputes:
+
+- an id -> model hash index, and the position of every id for catalog ordering
+- per-category tuples of models
+- the JSON encoding of every model
+
+Request handlers then look locations up in O(1) and share the same model
+instances instead of re-validating dicts. `encode()` writes a response model to
+JSON, splicing in the pre-encoded fragments for catalog entries instead of
+encoding static data again.
+
+`LocationCatalog` holds every location in memory and suits the built-in list.
+Larger catalogs are served from a file by `app.libs.location_store.LocationStore`,
+which has the same interface.
+
+Usage:
+
+    from app.libs.location_catalog import LocationCatalog
+
+    catalog = LocationCatalog(DUBAI_LOCATIONS, Location)
+    origin = catalog.get("burj-khalifa")
+    body = catalog.encode(LocationQueryResponse(locations=catalog.by_ids(ids)))
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Generic, Iterable, Iterator, TypeVar
+
+import pydantic_core
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class BaseLocationCatalog(ABC, Generic[M]):
+    """Lookup interface shared by the in-memory catalog and the on-disk `LocationStore`."""
+
+    model: type[M]
+    # Incremented whenever the catalog contents are replaced
+    version: int = 0
+
+    @abstractmethod
+    def get(self, location_id: str | None) -> M | None:
+        ...
+
+    @abstractmethod
+    def by_ids(self, location_ids: Iterable[str]) -> list[M]:
+        ...
+
+    @abstractmethod
+    def in_category(self, category: str) -> tuple[M, ...]:
+        ...
+
+    @property
+    @abstractmethod
+    def categories(self) -> list[str]:
+        ...
+
+    @abstractmethod
+    def summaries(self) -> Iterator[tuple[str, str, str]]:
+        """(id, name, category) of every location, in catalog order, without building models."""
+
+    @abstractmethod
+    def points(self) -> Iterator[tuple[str, str, float, float]]:
+        """(id, category, lat, lng) of every location, in catalog order, for spatial indexing."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def json_fragment(self, location: M) -> bytes:
+        ...
+
+    def on_reload(self, callback: Callable[[], None]) -> None:
+        """Call `callback` after the contents change; static catalogs never do."""
+
+    def __contains__(self, location_id: object) -> bool:
+        return isinstance(location_id, str) and self.get(location_id) is not None
+
+    def encode(self, value: Any) -> bytes:
+        """JSON of a (response) model, reusing the pre-encoded fragments of catalog locations.
+
+        Produces the same document as `model_dump_json()`, with fields in declaration order.
+        """
+        if isinstance(value, self.model):
+            return self.json_fragment(value)
+        if isinstance(value, BaseModel):
+            fields = (
+                b'"' + name.encode() + b'":' + self.encode(getattr(value, name))
+                for name in type(value).model_fields
+            )
+            return b"{" + b",".join(fields) + b"}"
+        if isinstance(value, (list, tuple)) and any(isinstance(item, BaseModel) for item in value):
+            return b"[" + b",".join(self.encode(item) for item in value) + b"]"
+        return pydantic_core.to_json(value)
+
+
+def require_frozen(model: type[BaseModel]) -> None:
+    if not model.model_config.get("frozen"):
+        raise TypeError(f"{model.__name__} must be frozen to be shared between requests")
+
+
+class LocationCatalog(BaseLocationCatalog[M]):
+    """Immutable catalog of `model` instances indexed by id and category."""
+
+    def __init__(self, records: Iterable[dict[str, Any]], model: type[M]):
+        require_frozen(model)
+        self.model = model
+        self.locations: tuple[M, ...] = tuple(model.model_validate(record) for record in records)
+
+        self._by_id: dict[str, M] = {}
+        self._position: dict[str, int] = {}
+        by_category: dict[str, list[M]] = {}
+        for position, location in enumerate(self.locations):
+            if location.id in self._by_id:
+                raise ValueError(f"Duplicate location id: {location.id}")
+            self._by_id[location.id] = location
+            self._position[location.id] = position
+            by_category.setdefault(location.category, []).append(location)
+        self._by_category = {category: tuple(locations) for category, locations in by_category.items()}
+        self._json = {location.id: location.model_dump_json().encode() for location in self.locations}
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __iter__(self) -> Iterator[M]:
+        return iter(self.locations)
+
+    def __contains__(self, location_id: object) -> bool:
+        return location_id in self._by_id
+
+    def get(self, location_id: str | None) -> M | None:
+        return self._by_id.get(location_id) if location_id is not None else None
+
+    def by_ids(self, location_ids: Iterable[str]) -> list[M]:
+        """The known locations among `location_ids`, once each and in catalog order."""
+        positions = {self._position[i] for i in location_ids if i in self._position}
+        return [self.locations[position] for position in sorted(positions)]
+
+    def in_category(self, category: str) -> tuple[M, ...]:
+        return self._by_category.get(category, ())
+
+    @property
+    def categories(self) -> list[str]:
+        return list(self._by_category)
+
+    def summaries(self) -> Iterator[tuple[str, str, str]]:
+        return ((location.id, location.name, location.category) for location in self.locations)
+
+    def points(self) -> Iterator[tuple[str, str, float, float]]:
+        return (
+            (location.id, location.category, location.location["lat"], location.location["lng"])
+            for location in self.locations
+        )
+
+    def json_fragment(self, location: M) -> bytes:
+        """Pre-encoded JSON of a catalog location; other instances are encoded now."""
+        if self._by_id.get(location.id) is location:
+            return self._json[location.id]
+        return location.model_dump_json().encode()
@@ -0,0 +1,251 @@
+"""Local resolver for place names in location queries.
+
+Resolves the obvious cases ("where is Burj Khalifa", "from Dubai Mall to JBR") from a
+precomputed index over catalog names and aliases, so the LLM parse is only needed
+when the local match is not confident.
+
+Matching works on normalized token n-grams: exact alias phrases are dictionary
+lookups, and near misses (typos, speech-to-text misspellings) are scored by
+character-trigram overlap against candidate aliases from an inverted trigram index.
+Chinese characters are tokenized one per token, so CJK aliases match without spaces.
+
+It also recognizes "near me" phrases and category keywords ("nearest beach",
+"museums near me"), which the caller answers from a spatial index.
+
+Usage:
+
+    from app.libs.location_resolver import LocationResolver
+
+    resolver = LocationResolver(locations, aliases)
+    result = resolver.resolve("how do i get from palm jumeira to the dubai mall")
+    if result is None:
+        ...  # low confidence, fall back to the LLM
+"""
+
+import unicodedata
+from collections import defaultdict
+from typing import Any
+
+# Phrases that mark a request for directions, per supported language
+DIRECTION_PHRASES = [
+    # English
+    "directions", "direction to", "how do i get", "how to get", "how can i get", "how do i go",
+    "how to go", "route", "way to", "take me", "navigate", "how far",
+    # Arabic
+    "كيف أصل", "كيف اصل", "كيف أذهب", "كيف اذهب", "الطريق", "اتجاهات",
+    # Chinese
+    "怎么去", "怎么走", "怎么到", "如何去", "如何到", "路线",
+    # Russian
+    "как добраться", "как доехать", "как пройти", "маршрут",
+    # Hindi
+    "कैसे जाएं", "कैसे जाऊं", "कैसे पहुंचे", "कैसे पहुँचें", "रास्ता",
+    # Spanish
+    "cómo llegar", "cómo voy", "ruta", "direcciones",
+    # German
+    "wie komme ich", "wie gelange ich", "wegbeschreibung",
+    # French
+    "comment aller", "comment se rendre", "itinéraire",
+]
+
+# Phrases that ask for places close to the user (or to a named place), per supported language
+NEARBY_PHRASES = [
+    # English
+    "near me", "near", "nearby", "nearest", "closest", "close to me", "close by", "around me", "around here",
+    # Arabic
+    "بالقرب", "قريب", "قريبة", "أقرب", "اقرب",
+    # Chinese
+    "附近", "最近的", "离我最近",
+    # Russian
+    "рядом", "поблизости", "ближайший", "ближайшая", "ближайшее", "ближайшие",
+    # Hindi
+    "पास", "नज़दीक", "नजदीक", "आसपास",
+    # Spanish
+    "cerca", "cercano", "cercana", "más cercano", "más cercana",
+    # German
+    "in der nähe", "nächste", "nächster", "nächstes", "nächstgelegene",
+    # French
+    "près", "proche", "à proximité", "le plus proche", "la plus proche",
+]
+
+# Words that mark the origin of a route when they directly precede a place name
+FROM_MARKERS = {"from", "desde", "depuis", "von", "от", "из", "من", "从"}
+# Hindi marks the origin with a postposition after the place name
+FROM_POSTPOSITIONS = {"से"}
+# Articles allowed between a marker and the place name ("from the", "desde la", "von der")
+ARTICLES = {"the", "el", "la", "los", "las", "le", "les", "l", "der", "die", "das", "dem", "den"}
+
+
+def normalize_text(text: str) -> str:
+    """Casefold, strip accents/diacritics and punctuation, and split CJK ideographs."""
+    decomposed = unicodedata.normalize("NFKD", text).casefold()
+    chars = []
+    for ch in decomposed:
+        category = unicodedata.category(ch)
+        if category == "Mn":
+            continue
+        if category[0] in "PS":
+            chars.append(" ")
+        elif "一" <= ch <= "鿿" or "㐀" <= ch <= "䶿":
+            chars.append(f" {ch} ")
+        else:
+            chars.append(ch)
+    return " ".join("".join(chars).split())
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f" {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationResolver:
+    """Precomputed alias and trigram index over a location catalog."""
+
+    def __init__(
+        self,
+        locations: list[dict[str, Any]],
+        aliases: dict[str, list[str]] | None = None,
+        min_confidence: float = 0.8,
+        category_keywords: dict[str, list[str]] | None = None,
+    ):
+        self.min_confidence = min_confidence
+
+        # Normalized alias phrase -> location id, including names and ids
+        self.phrases: dict[str, str] = {}
+        for loc in locations:
+            for alias in [loc["name"], loc["id"].replace("-", " "), *(aliases or {}).get(loc["id"], [])]:
+                phrase = normalize_text(alias)
+                if phrase:
+                    self.phrases.setdefault(phrase, loc["id"])
+        self.phrase_token_counts = {phrase: len(phrase.split()) for phrase in self.phrases}
+        self.max_phrase_tokens = max(self.phrase_token_counts.values(), default=1)
+
+        # Trigram -> phrases containing it, for fuzzy candidates
+        self.phrase_trigrams = {phrase: trigrams(phrase) for phrase in self.phrases}
+        self.trigram_index: dict[str, set[str]] = defaultdict(set)
+        for phrase, grams in self.phrase_trigrams.items():
+            for gram in grams:
+                self.trigram_index[gram].add(phrase)
+
+        self.direction_phrases = {normalize_text(p) for p in DIRECTION_PHRASES}
+        self.max_direction_tokens = max(len(p.split()) for p in self.direction_phrases)
+        self.nearby_phrases = {normalize_text(p) for p in NEARBY_PHRASES}
+        self.max_nearby_tokens = max(len(p.split()) for p in self.nearby_phrases)
+
+        # Normalized keyword ("beaches", "museum", "playa") -> category
+        self.category_keywords: dict[str, str] = {}
+        for category, keywords in (category_keywords or {}).items():
+            for keyword in keywords:
+                phrase = normalize_text(keyword)
+                if phrase:
+                    self.category_keywords.setdefault(phrase, category)
+        self.max_keyword_tokens = max((len(k.split()) for k in self.category_keywords), default=1)
+
+    def _fuzzy_match(self, window: str) -> tuple[str | None, float]:
+        """Best alias with the same number of tokens as `window`, by trigram Dice similarity.
+
+        Requiring equal token counts keeps a bare "dubai" from matching "dubai mall".
+        """
+        grams = trigrams(window)
+        token_count = window.count(" ") + 1
+        shared: dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for phrase in self.trigram_index.get(gram, ()):
+                if self.phrase_token_counts[phrase] == token_count:
+                    shared[phrase] += 1
+
+        best_phrase, best_score = None, 0.0
+        for phrase, count in shared.items():
+            score = 2 * count / (len(grams) + len(self.phrase_trigrams[phrase]))
+            if score > best_score:
+                best_phrase, best_score = phrase, score
+        return best_phrase, best_score
+
+    def find_mentions(self, tokens: list[str]) -> list[tuple[int, int, str, float]]:
+        """Non-overlapping (start, end, location_id, confidence) spans, in query order."""
+        candidates = []
+        for n in range(min(self.max_phrase_tokens, len(tokens)), 0, -1):
+            for start in range(len(tokens) - n + 1):
+                window = " ".join(tokens[start : start + n])
+                location_id = self.phrases.get(window)
+                if location_id:
+                    candidates.append((start, start + n, location_id, 1.0))
+                    continue
+
+                # Skip fuzzy matching for short fragments, which match too easily
+                if len(window) < 5:
+                    continue
+                phrase, score = self._fuzzy_match(window)
+                if phrase and score >= self.min_confidence * 0.75:
+                    candidates.append((start, start + n, self.phrases[phrase], score))
+
+        # Prefer confident and longer spans, then drop anything overlapping a chosen span
+        candidates.sort(key=lambda c: (-c[3], -(c[1] - c[0]), c[0]))
+        chosen: list[tuple[int, int, str, float]] = []
+        taken: set[int] = set()
+        for start, end, location_id, score in candidates:
+            if taken.isdisjoint(range(start, end)):
+                chosen.append((start, end, location_id, score))
+                taken.update(range(start, end))
+        return sorted(chosen)
+
+    @staticmethod
+    def _find_phrase(tokens: list[str], phrases: set[str] | dict[str, str], max_tokens: int) -> str | None:
+        """The first of `phrases` in the query, preferring longer phrases at the same position."""
+        for start in range(len(tokens)):
+            for n in range(min(max_tokens, len(tokens) - start), 0, -1):
+                window = " ".join(tokens[start : start + n])
+                if window in phrases:
+                    return window
+        return None
+
+    def is_directions_query(self, tokens: list[str]) -> bool:
+        return self._find_phrase(tokens, self.direction_phrases, self.max_direction_tokens) is not None
+
+    def is_nearby_query(self, tokens: list[str]) -> bool:
+        """Whether the query asks for places near the user or near a named place."""
+        return self._find_phrase(tokens, self.nearby_phrases, self.max_nearby_tokens) is not None
+
+    def find_category(self, tokens: list[str]) -> str | None:
+        """The category of the first category keyword in the query ("museums near me" -> its category)."""
+        keyword = self._find_phrase(tokens, self.category_keywords, self.max_keyword_tokens)
+        return self.category_keywords[keyword] if keyword is not None else None
+
+    def resolve(self, query: str) -> dict[str, Any] | None:
+        """Resolve `query` to the LLM parse shape, or None when not confident enough."""
+        tokens = normalize_text(query).split()
+        mentions = self.find_mentions(tokens)
+        if not mentions or min(score for *_, score in mentions) < self.min_confidence:
+            return None
+
+        location_ids = list(dict.fromkeys(location_id for _, _, location_id, _ in mentions))
+
+        def is_origin(start: int, end: int) -> bool:
+            if start > 0 and tokens[start - 1] in ARTICLES:
+                start -= 1
+            return (start > 0 and tokens[start - 1] in FROM_MARKERS) or (
+                end < len(tokens) and tokens[end] in FROM_POSTPOSITIONS
+            )
+
+        has_origin_marker = any(is_origin(start, end) for start, end, _, _ in mentions)
+        is_directions = self.is_directions_query(tokens) or (has_origin_marker and len(location_ids) >= 2)
+
+        origin_id = destination_id = None
+        if is_directions:
+            if len(location_ids) >= 2:
+                # "from X to Y" and "to Y from X": the marked place is the origin, otherwise the first one
+                origin_id = next(
+                    (location_id for start, end, location_id, _ in mentions if is_origin(start, end)),
+                    location_ids[0],
+                )
+                destination_id = next(location_id for location_id in location_ids if location_id != origin_id)
+            else:
+                destination_id = location_ids[0]
+
+        return {
+            "location_ids": location_ids,
+            "primary_location_id": destination_id or location_ids[0],
+            "is_directions_request": is_directions,
+            "origin_id": origin_id,
+            "destination_id": destination_id,
+            "confidence": min(score for *_, score in mentions),
+        }
@@ -0,0 +1,338 @@
+"""Location catalog served from a read-only SQLite file shared by all workers.
+
+The in-memory `LocationCatalog` suits the built-in list. It costs import time and
+memory in every uvicorn worker, though, and growing it takes a code deploy.
+`LocationStore` instead serves the catalog from a SQLite file:
+
+- one row per location holds the id, name, category and coordinates, plus the
+  location's JSON, which is both the source of its model and its pre-encoded
+  response fragment
+- lookups by id are primary-key seeks, and lookups by category use an index
+- the file is memory-mapped (`PRAGMA mmap_size`), so its pages live once in the
+  OS page cache and are shared by every worker, instead of being copied onto
+  each worker's heap
+- each worker keeps only a bounded LRU of the models it has recently served
+
+A background thread watches the file and reloads the catalog when it changes. To
+publish a new catalog, build it next to the old one and rename it into place,
+which `build_location_db()` does. Requests in flight keep reading the old file
+until the swap.
+
+Build a file from a JSON list of records, or from the built-in list:
+
+    python -m app.libs.location_store locations.db --source locations.json
+    python -m app.libs.location_store locations.db
+
+Usage:
+
+    from app.libs.location_store import LocationStore
+
+    catalog = LocationStore("locations.db", Location)
+    origin = catalog.get("burj-khalifa")
+"""
+
+import argparse
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from pydantic import BaseModel
+
+from app.libs.location_catalog import BaseLocationCatalog, M, require_frozen
+from databutton_app.structured_log import get_logger
+
+log = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE locations (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lng REAL NOT NULL,
+    json BLOB NOT NULL
+);
+CREATE INDEX locations_category ON locations (category, position);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# Upper bound of the memory-mapped part of the file; pages are only mapped as they are read
+MMAP_SIZE = 1 << 30
+# Stay below SQLite's limit on bound parameters per statement
+MAX_QUERY_IDS = 500
+
+
+class LocationStoreStats(BaseModel):
+    locations: int
+    version: int
+    reloads: int
+    reload_failures: int
+    cached: int
+    cache_hits: int
+    cache_misses: int
+
+
+def build_location_db(records: Iterable[dict[str, Any]], path: str | os.PathLike, model: type[BaseModel]) -> int:
+    """Validate `records` and atomically replace the catalog file at `path`.
+
+    Returns the number of locations written.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(SCHEMA)
+        rows = (
+            (position, location.id, location.name, location.category,
+             location.location["lat"], location.location["lng"], location.model_dump_json().encode())
+            for position, location in enumerate(model.model_validate(record) for record in records)
+        )
+        try:
+            conn.executemany("INSERT INTO locations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Duplicate location id: {e}") from e
+        count = conn.execute("SELECT count(*) FROM locations").fetchone()[0]
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [("built_at", str(time.time())), ("locations", str(count))])
+        conn.commit()
+    except BaseException:
+        conn.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    conn.close()
+    os.replace(tmp, path)
+    return count
+
+
+def _file_key(path: Path) -> tuple[int, int, int]:
+    stat = path.stat()
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class _Snapshot:
+    """An open connection to one version of the catalog file."""
+
+    def __init__(self, path: Path, model: type[BaseModel]):
+        self.key = _file_key(path)
+        self.conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            self.conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            self.count = self.conn.execute("SELECT count(*) FROM locations").fetchone()[0]
+            self.categories = [
+                row[0] for row in self.conn.execute(
+                    "SELECT category FROM locations GROUP BY category ORDER BY min(position)"
+                )
+            ]
+            # Fail now, rather than on a request, when the file does not match the model
+            first = self.conn.execute("SELECT json FROM locations ORDER BY position LIMIT 1").fetchone()
+            if first is not None:
+                model.model_validate_json(first[0])
+        except BaseException:
+            self.conn.close()
+            raise
+
+
+class LocationStore(BaseLocationCatalog[M]):
+    """Catalog of `model` instances read from a SQLite file and reloaded when it changes."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        model: type[M],
+        cache_size: int = 10_000,
+        check_interval: float = 5.0,
+    ):
+        require_frozen(model)
+        self.path = Path(path)
+        self.model = model
+        self.cache_size = cache_size
+        self.check_interval = check_interval
+        self._snapshot = _Snapshot(self.path, model)
+        # id -> (position, model, JSON) of recently served locations
+        self._cache: collections.OrderedDict[str, tuple[int, M, bytes]] = collections.OrderedDict()
+        # Guards the connection (which a reload closes) and the cache
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self.version = 0
+        self.reloads = 0
+        self.reload_failures = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        if check_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="location-store-watch", daemon=True)
+            self._thread.start()
+        log.info("location_store_opened", path=str(self.path), locations=self._snapshot.count)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self) -> None:
+        failed_key = None
+        while not self._stop.wait(self.check_interval):
+            try:
+                key = _file_key(self.path)
+            except OSError:
+                # Missing for a moment while being replaced; keep serving the open file
+                continue
+            # A file that failed to load is retried once it changes again
+            if key not in (self._snapshot.key, failed_key):
+                failed_key = None if self.reload() else key
+
+    def reload(self) -> bool:
+        """Switch to the current contents of the file; on failure the old catalog stays in use."""
+        try:
+            snapshot = _Snapshot(self.path, self.model)
+        except Exception as e:
+            self.reload_failures += 1
+            log.warning("location_store_reload_failed", path=str(self.path), error=str(e))
+            return False
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+            self._cache.clear()
+            self.version += 1
+            previous.conn.close()
+        self.reloads += 1
+        log.info("location_store_reloaded", path=str(self.path), locations=snapshot.count, version=self.version)
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception as e:
+                log.error("location_store_reload_callback_failed", error=str(e))
+        return True
+
+    def on_reload(self, callback: Callable[[], None]) -> None:
+        self._callbacks.append(callback)
+
+    # The cache helpers are called with the lock held
+
+    def _cached(self, location_id: str) -> tuple[int, M, bytes] | None:
+        entry = self._cache.get(location_id)
+        if entry is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(location_id)
+        return entry
+
+    def _remember(self, location_id: str, position: int, data: bytes) -> tuple[int, M, bytes]:
+        entry = self._cached(location_id)
+        if entry is None:
+            self.cache_misses += 1
+            entry = self._cache[location_id] = (position, self.model.model_validate_json(data), bytes(data))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def get(self, location_id: str | None) -> M | None:
+        if not isinstance(location_id, str):
+            return None
+        with self._lock:
+            entry = self._cached(location_id)
+            if entry is None:
+                row = self._snapshot.conn.execute(
+                    "SELECT position, json FROM locations WHERE id = ?", (location_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                entry = self._remember(location_id, *row)
+            return entry[1]
+
+    def by_ids(self, location_ids: Iterable[str]) -> list[M]:
+        """The known locations among `location_ids`, once each and in catalog order."""
+        entries = []
+        missing = []
+        with self._lock:
+            for location_id in {i for i in location_ids if isinstance(i, str)}:
+                entry = self._cached(location_id)
+                if entry is not None:
+                    entries.append(entry)
+                else:
+                    missing.append(location_id)
+            for start in range(0, len(missing), MAX_QUERY_IDS):
+                chunk = missing[start : start + MAX_QUERY_IDS]
+                rows = self._snapshot.conn.execute(
+                    f"SELECT id, position, json FROM locations WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                )
+                entries.extend(self._remember(*row) for row in rows)
+        entries.sort(key=lambda entry: entry[0])
+        return [entry[1] for entry in entries]
+
+    def in_category(self, category: str) -> tuple[M, ...]:
+        """Every location in `category`; those not already cached are built without caching them."""
+        with self._lock:
+            rows = self._snapshot.conn.execute(
+                "SELECT id, json FROM locations WHERE category = ? ORDER BY position", (category,)
+            ).fetchall()
+            cached = [self._cache.get(location_id) for location_id, _ in rows]
+        return tuple(
+            entry[1] if entry is not None else self.model.model_validate_json(data)
+            for entry, (_, data) in zip(cached, rows)
+        )
+
+    @property
+    def categories(self) -> list[str]:
+        return list(self._snapshot.categories)
+
+    def summaries(self) -> Iterator[tuple[str, str, str]]:
+        with self._lock:
+            rows = self._snapshot.conn.execute("SELECT id, name, category FROM locations ORDER BY position").fetchall()
+        return iter(rows)
+
+    def points(self) -> Iterator[tuple[str, str, float, float]]:
+        with self._lock:
+            rows = self._snapshot.conn.execute("SELECT id, category, lat, lng FROM locations ORDER BY position").fetchall()
+        return iter(rows)
+
+    def json_fragment(self, location: M) -> bytes:
+        """Stored JSON of a location served by this store; other instances are encoded now."""
+        with self._lock:
+            entry = self._cache.get(location.id)
+        if entry is not None and entry[1] is location:
+            return entry[2]
+        return location.model_dump_json().encode()
+
+    def __len__(self) -> int:
+        return self._snapshot.count
+
+    def __iter__(self) -> Iterator[M]:
+        """Every location in catalog order, built as it is read and not cached."""
+        with self._lock:
+            rows = self._snapshot.conn.execute("SELECT json FROM locations ORDER BY position").fetchall()
+        return (self.model.model_validate_json(row[0]) for row in rows)
+
+    def stats(self) -> LocationStoreStats:
+        return LocationStoreStats(
+            locations=self._snapshot.count,
+            version=self.version,
+            reloads=self.reloads,
+            reload_failures=self.reload_failures,
+            cached=len(self._cache),
+            cache_hits=self.cache_hits,
+            cache_misses=self.cache_misses,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a location catalog file for LOCATIONS_DB.")
+    parser.add_argument("output", type=Path, help="Catalog file to write (replaced atomically)")
+    parser.add_argument("--source", type=Path, help="JSON list of location records; defaults to DUBAI_LOCATIONS")
+    args = parser.parse_args()
+
+    from app.apis.dubai_locations import DUBAI_LOCATIONS, Location
+
+    records = json.loads(args.source.read_text()) if args.source else DUBAI_LOCATIONS
+    count = build_location_db(records, args.output, Location)
+    print(f"Wrote {count} locations to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Event-loop lag monitor that reports what is blocking the loop.
+
+A watchdog thread schedules a no-op on the event loop every `interval` seconds.
+If the loop does not run it within `threshold` seconds, something is blocking
+the loop (a synchronous HTTP call, heavy CPU work in an `async def` handler), and
+the watchdog samples the loop thread's stack at that moment. Each stall is logged
+with the blocking code location and the requests in flight, and recorded for
+`stats()`.
+
+The monitor costs one thread wake-up per interval and adds nothing to the
+request path except the in-flight bookkeeping of `InFlightRequestsMiddleware`.
+
+Usage:
+
+    monitor = LoopLagMonitor(threshold=0.1)
+    app.add_middleware(InFlightRequestsMiddleware, monitor=monitor)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        monitor.start()
+        yield
+        monitor.stop()
+"""
+
+import asyncio
+import collections
+import itertools
+import os
+import sys
+import threading
+import time
+import traceback
+
+from pydantic import BaseModel
+
+from databutton_app.structured_log import get_logger
+
+log = get_logger(__name__)
+
+# Frames under this directory are reported as the blocking application code
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LoopStall(BaseModel):
+    lag_ms: float
+    # Innermost application frame when the stall was detected, e.g. "app/apis/x/__init__.py:42 in handler"
+    location: str | None
+    stack: list[str]
+    requests: list[str]
+
+
+class LoopLagStats(BaseModel):
+    threshold_ms: float
+    checks: int
+    stalls: int
+    max_lag_ms: float
+    recent_stalls: list[LoopStall]
+
+
+def _format_frame(frame: traceback.FrameSummary) -> str:
+    filename = frame.filename
+    if filename.startswith(APP_ROOT + os.sep):
+        filename = os.path.relpath(filename, APP_ROOT)
+    return f"{filename}:{frame.lineno} in {frame.name}"
+
+
+class LoopLagMonitor:
+    """Watchdog thread that detects and attributes event-loop stalls."""
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.5, history: int = 20):
+        self.threshold = threshold
+        self.interval = interval
+        self.in_flight: dict[int, str] = {}
+        self._request_ids = itertools.count()
+        self._recent: collections.deque[LoopStall] = collections.deque(maxlen=history)
+        self._checks = 0
+        self._stalls = 0
+        self._max_lag = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start watching the running loop; call from a coroutine on that loop."""
+        if self.threshold <= 0 or self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.threshold + self.interval)
+            self._thread = None
+
+    def request_started(self, description: str) -> int:
+        request_id = next(self._request_ids)
+        self.in_flight[request_id] = description
+        return request_id
+
+    def request_finished(self, request_id: int) -> None:
+        self.in_flight.pop(request_id, None)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            ran = threading.Event()
+            sent = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(ran.set)
+            except RuntimeError:
+                # Loop closed
+                return
+            self._checks += 1
+            if ran.wait(self.threshold):
+                self._max_lag = max(self._max_lag, time.monotonic() - sent)
+                continue
+
+            # Blocked: sample what the loop thread is executing right now
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.extract_stack(frame)[-12:] if frame is not None else []
+            requests = list(self.in_flight.values())
+            while not ran.wait(self.interval):
+                if self._stop.is_set():
+                    return
+            self._record(time.monotonic() - sent, stack, requests)
+
+    def _record(self, lag: float, stack: list[traceback.FrameSummary], requests: list[str]) -> None:
+        app_frames = [frame for frame in stack if frame.filename.startswith(APP_ROOT + os.sep)]
+        stall = LoopStall(
+            lag_ms=round(lag * 1000, 1),
+            location=_format_frame(app_frames[-1]) if app_frames else None,
+            stack=[_format_frame(frame) for frame in stack],
+            requests=requests,
+        )
+        self._stalls += 1
+        self._max_lag = max(self._max_lag, lag)
+        self._recent.append(stall)
+        log.warning(
+            "event_loop_blocked",
+            lag_ms=stall.lag_ms,
+            location=stall.location or (stall.stack[-1:] or [None])[0],
+            requests=requests,
+        )
+
+    def stats(self) -> LoopLagStats:
+        return LoopLagStats(
+            threshold_ms=round(self.threshold * 1000, 1),
+            checks=self._checks,
+            stalls=self._stalls,
+            max_lag_ms=round(self._max_lag * 1000, 1),
+            recent_stalls=list(self._recent),
+        )
+
+
+class InFlightRequestsMiddleware:
+    """ASGI middleware that tells the monitor which requests are in flight."""
+
+    def __init__(self, app, monitor: LoopLagMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        request_id = self.monitor.request_started(f"{scope.get('method', 'WS')} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.request_finished(request_id)
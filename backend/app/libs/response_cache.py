@@ -0,0 +1,103 @@
+"""Bounded in-process LRU cache with per-entry TTL and hit/miss counters.
+
+Usage:
+
+    from app.libs.response_cache import TTLCache, normalize_query
+
+    cache = TTLCache(max_size=1000, ttl=3600)
+    key = (normalize_query(query), language)
+    cached = cache.get(key)
+    if cached is None:
+        cached = compute()
+        cache.set(key, cached)
+"""
+
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from pydantic import BaseModel
+
+
+def normalize_query(query: str) -> str:
+    """Fold case, punctuation and whitespace so trivially different phrasings share a key."""
+    folded = unicodedata.normalize("NFKC", query).casefold()
+    # Drop punctuation in any script (e.g. "?", "؟", "。") and collapse whitespace
+    without_punctuation = "".join(
+        " " if unicodedata.category(ch).startswith("P") else ch for ch in folded
+    )
+    return " ".join(without_punctuation.split())
+
+
+class CacheStats(BaseModel):
+    size: int
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    hit_ratio: float
+
+
+class TTLCache:
+    """Thread-safe LRU cache where entries also expire `ttl` seconds after being set."""
+
+    def __init__(self, max_size: int = 1000, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return CacheStats(
+                size=len(self._entries),
+                max_size=self.max_size,
+                ttl=self.ttl,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                expirations=self.expirations,
+                hit_ratio=self.hits / lookups if lookups else 0.0,
+            )
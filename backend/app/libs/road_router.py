@@ -0,0 +1,461 @@
+"""Offline road routing over a compact road-graph file, with A* and landmarks (ALT).
+
+The graph is built once from an OpenStreetMap extract, and queries need no
+network access:
+
+- `read_osm()` reads the drivable ways of an OSM XML extract: the road name,
+  speed (from `maxspeed` or the road class) and direction of travel
+- `build_road_graph()` turns the ways into a directed graph whose vertices are
+  junctions and dead ends. The shape points between two junctions collapse into
+  one edge that keeps its length, travel time, road name and the bearings it
+  starts and ends with. The graph is written as CSR arrays in a compressed
+  `.npz` file, together with the travel times from and to a few "landmark"
+  vertices, chosen far apart
+- `RoadRouter` loads the file, snaps coordinates to the nearest vertex, and runs
+  A* on travel time. The triangle inequality over the landmark times (ALT) gives
+  a lower bound on the remaining time, so the search settles only a sliver of
+  the nodes a Dijkstra search would. Routes are cached by (origin, destination)
+  vertex, and are described as turn-by-turn steps
+
+Build a graph file from an OSM extract (e.g. cut from a Geofabrik GCC download
+with osmium):
+
+    python -m app.libs.road_router dubai.osm app/apis/dubai_locations/dubai_roads.npz
+
+Usage:
+
+    from app.libs.road_router import RoadRouter
+
+    router = RoadRouter.load("dubai_roads.npz")
+    route = router.route(25.1972, 55.2744, 25.1181, 55.1389)
+    if route is not None:
+        print(route.distance_m, route.duration_s, route.steps)
+"""
+
+import argparse
+import collections
+import heapq
+import math
+import os
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.libs.spatial_index import SpatialIndex, haversine_km
+
+FORMAT_VERSION = 1
+
+# Default speeds of the drivable OSM road classes, used when a way has no maxspeed
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 100, "motorway_link": 60, "trunk": 80, "trunk_link": 50,
+    "primary": 60, "primary_link": 40, "secondary": 50, "secondary_link": 40,
+    "tertiary": 40, "tertiary_link": 30, "unclassified": 30, "residential": 30,
+    "living_street": 10, "service": 20, "road": 30,
+}
+
+# Road classes that are one-way unless tagged otherwise
+IMPLIED_ONEWAY = {"motorway", "motorway_link"}
+
+
+class Way(NamedTuple):
+    nodes: list[int]
+    name: str
+    speed_kmh: float
+    # 1: only in the direction of `nodes`, -1: only against it, 0: both
+    oneway: int
+
+
+class Route(NamedTuple):
+    distance_m: float
+    duration_s: float
+    steps: list[str]
+
+
+class RoadRouterStats(BaseModel):
+    vertices: int
+    edges: int
+    landmarks: int
+    routes: int
+    cache_hits: int
+    unroutable: int
+    cached: int
+
+
+def parse_maxspeed(value: str | None) -> float | None:
+    """km/h from OSM maxspeed values like "60", "60 km/h" or "40 mph"."""
+    if not value:
+        return None
+    number, _, unit = value.strip().partition(" ")
+    try:
+        speed = float(number)
+    except ValueError:
+        return None
+    return speed * 1.609344 if unit.strip() == "mph" else speed
+
+
+def read_osm(path: str | os.PathLike) -> tuple[dict[int, tuple[float, float]], list[Way]]:
+    """Node coordinates and drivable ways of an OSM XML extract."""
+    nodes: dict[int, tuple[float, float]] = {}
+    ways: list[Way] = []
+    for _, element in ElementTree.iterparse(path, events=("end",)):
+        if element.tag == "node":
+            nodes[int(element.get("id"))] = (float(element.get("lat")), float(element.get("lon")))
+            element.clear()
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            highway = tags.get("highway")
+            if highway in HIGHWAY_SPEEDS_KMH and tags.get("access") not in ("no", "private"):
+                oneway = tags.get("oneway")
+                if oneway in ("yes", "true", "1"):
+                    direction = 1
+                elif oneway in ("-1", "reverse"):
+                    direction = -1
+                elif oneway in ("no", "false", "0"):
+                    direction = 0
+                else:
+                    direction = 1 if highway in IMPLIED_ONEWAY or tags.get("junction") in ("roundabout", "circular") else 0
+                ways.append(Way(
+                    nodes=[int(nd.get("ref")) for nd in element.iter("nd")],
+                    name=tags.get("name:en") or tags.get("name") or tags.get("ref") or "",
+                    speed_kmh=parse_maxspeed(tags.get("maxspeed")) or HIGHWAY_SPEEDS_KMH[highway],
+                    oneway=direction,
+                ))
+            element.clear()
+    return nodes, ways
+
+
+def bearing(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Initial compass bearing in degrees from the first point to the second."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dlng = math.radians(lng2 - lng1)
+    x = math.sin(dlng) * math.cos(phi2)
+    y = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlng)
+    return math.degrees(math.atan2(x, y)) % 360
+
+
+def _csr(count: int, sources: list[int], *columns: list) -> tuple[list[int], list[int], list[list]]:
+    """Offsets and edge order grouping edges by source vertex."""
+    order = sorted(range(len(sources)), key=sources.__getitem__)
+    offsets = [0] * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    return offsets, order, [[column[e] for e in order] for column in columns]
+
+
+def _dijkstra(offsets: list[int], targets: list[int], weights: list[float], source: int) -> list[float]:
+    """Travel time from `source` to every vertex (inf when unreachable)."""
+    dist = [math.inf] * (len(offsets) - 1)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        for e in range(offsets[v], offsets[v + 1]):
+            w = targets[e]
+            nd = d + weights[e]
+            if nd < dist[w]:
+                dist[w] = nd
+                heapq.heappush(heap, (nd, w))
+    return dist
+
+
+def build_road_graph(
+    nodes: dict[int, tuple[float, float]],
+    ways: Iterable[Way],
+    path: str | os.PathLike,
+    landmarks: int = 8,
+) -> dict[str, int]:
+    """Write the routing graph of `ways` to `path` (replaced atomically); returns its size."""
+    ways = [way._replace(nodes=[n for n in way.nodes if n in nodes]) for way in ways]
+    ways = [way for way in ways if len(way.nodes) >= 2]
+
+    # Vertices: the ends of every way, and nodes shared by several ways (or met twice by one)
+    uses = collections.Counter(n for way in ways for n in way.nodes)
+    vertex_ids: dict[int, int] = {}
+    for way in ways:
+        for i, n in enumerate(way.nodes):
+            if (i == 0 or i == len(way.nodes) - 1 or uses[n] > 1) and n not in vertex_ids:
+                vertex_ids[n] = len(vertex_ids)
+
+    names: dict[str, int] = {}
+    sources, targets, lengths, times, name_ids, bearings_out, bearings_in = [], [], [], [], [], [], []
+
+    def add_edge(points: list[tuple[float, float]], source: int, target: int, length_m: float, way: Way) -> None:
+        sources.append(source)
+        targets.append(target)
+        lengths.append(length_m)
+        times.append(length_m / (way.speed_kmh / 3.6))
+        name_ids.append(names.setdefault(way.name, len(names)))
+        bearings_out.append(bearing(*points[0], *points[1]))
+        bearings_in.append(bearing(*points[-2], *points[-1]))
+
+    for way in ways:
+        start = 0
+        for i in range(1, len(way.nodes)):
+            if way.nodes[i] not in vertex_ids:
+                continue
+            points = [nodes[n] for n in way.nodes[start : i + 1]]
+            length_m = sum(haversine_km(*a, *b) for a, b in zip(points, points[1:])) * 1000
+            source, target = vertex_ids[way.nodes[start]], vertex_ids[way.nodes[i]]
+            if source != target and length_m > 0:
+                if way.oneway >= 0:
+                    add_edge(points, source, target, length_m, way)
+                if way.oneway <= 0:
+                    add_edge(points[::-1], target, source, length_m, way)
+            start = i
+
+    count = len(vertex_ids)
+    offsets, _, (targets_out, times_out, lengths_out, names_out, b_out, b_in) = _csr(
+        count, sources, targets, times, lengths, name_ids, bearings_out, bearings_in
+    )
+    # Reversed graph, for times *to* the landmarks
+    r_offsets, _, (r_targets, r_times) = _csr(count, targets, sources, times)
+
+    # Landmarks far apart: each one is the vertex farthest from those chosen so far
+    chosen: list[int] = []
+    forward: list[list[float]] = []
+    backward: list[list[float]] = []
+    nearest_landmark = [math.inf] * count
+    candidate = 0
+    for _ in range(min(landmarks, count)):
+        chosen.append(candidate)
+        forward.append(_dijkstra(offsets, targets_out, times_out, candidate))
+        backward.append(_dijkstra(r_offsets, r_targets, r_times, candidate))
+        nearest_landmark = [min(a, b) for a, b in zip(nearest_landmark, forward[-1])]
+        reachable = [(d, v) for v, d in enumerate(nearest_landmark) if d != math.inf]
+        candidate = max(reachable)[1] if reachable else 0
+
+    coordinates = [None] * count
+    for n, v in vertex_ids.items():
+        coordinates[v] = nodes[n]
+
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp.npz")
+    np.savez_compressed(
+        tmp,
+        format_version=np.array([FORMAT_VERSION]),
+        lat=np.array([c[0] for c in coordinates], dtype=np.float32),
+        lng=np.array([c[1] for c in coordinates], dtype=np.float32),
+        offsets=np.array(offsets, dtype=np.int32),
+        targets=np.array(targets_out, dtype=np.int32),
+        times=np.array(times_out, dtype=np.float32),
+        lengths=np.array(lengths_out, dtype=np.float32),
+        name_ids=np.array(names_out, dtype=np.int32),
+        bearings_out=np.array(b_out, dtype=np.float32),
+        bearings_in=np.array(b_in, dtype=np.float32),
+        names=np.array(list(names), dtype=str),
+        landmarks=np.array(chosen, dtype=np.int32),
+        landmark_forward=np.array(forward, dtype=np.float32).reshape(len(chosen), count),
+        landmark_backward=np.array(backward, dtype=np.float32).reshape(len(chosen), count),
+    )
+    os.replace(tmp, path)
+    return {"vertices": count, "edges": len(targets_out), "landmarks": len(chosen)}
+
+
+def format_distance(meters: float) -> str:
+    return f"{meters / 1000:.1f} km" if meters >= 1000 else f"{max(10, round(meters, -1)):.0f} m"
+
+
+def compass(degrees: float) -> str:
+    return ["north", "northeast", "east", "southeast", "south", "southwest", "west", "northwest"][round(degrees / 45) % 8]
+
+
+def maneuver(turn: float) -> str:
+    """Instruction for a change of heading in degrees (positive: clockwise, i.e. to the right)."""
+    side = "right" if turn > 0 else "left"
+    magnitude = abs(turn)
+    if magnitude < 20:
+        return "Continue"
+    if magnitude < 60:
+        return f"Turn slightly {side}"
+    if magnitude < 135:
+        return f"Turn {side}"
+    if magnitude < 170:
+        return f"Turn sharply {side}"
+    return "Make a U-turn"
+
+
+class RoadRouter:
+    """A* (ALT) routing on a road graph built by `build_road_graph()`."""
+
+    def __init__(self, arrays: dict[str, np.ndarray], cache_size: int = 10_000, max_snap_km: float = 2.0):
+        if int(arrays["format_version"][0]) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported road graph format {int(arrays['format_version'][0])}")
+        # Python lists: the search reads them element by element, which NumPy makes slow
+        self._offsets = arrays["offsets"].tolist()
+        self._targets = arrays["targets"].tolist()
+        self._times = arrays["times"].tolist()
+        self._lengths = arrays["lengths"].tolist()
+        self._name_ids = arrays["name_ids"].tolist()
+        self._bearings_out = arrays["bearings_out"].tolist()
+        self._bearings_in = arrays["bearings_in"].tolist()
+        self._names = arrays["names"].tolist()
+        self._landmark_forward = arrays["landmark_forward"].astype(np.float64)
+        self._landmark_backward = arrays["landmark_backward"].astype(np.float64)
+        self.vertices = len(self._offsets) - 1
+        self.landmarks = len(arrays["landmarks"])
+        self.max_snap_km = max_snap_km
+
+        # Only vertices a route can both leave and reach are snapping targets
+        out_degree = np.diff(arrays["offsets"])
+        in_degree = np.bincount(arrays["targets"], minlength=self.vertices)
+        routable = np.flatnonzero((out_degree > 0) & (in_degree > 0))
+        lat, lng = arrays["lat"].astype(np.float64), arrays["lng"].astype(np.float64)
+        self._snap_index = SpatialIndex((str(v), "", lat[v], lng[v]) for v in routable.tolist())
+
+        self.cache_size = cache_size
+        self._cache: collections.OrderedDict[tuple[int, int], Route | None] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.routes = 0
+        self.cache_hits = 0
+        self.unroutable = 0
+
+    @classmethod
+    def load(cls, path: str | os.PathLike, **kwargs) -> "RoadRouter":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files}, **kwargs)
+
+    def nearest_vertex(self, lat: float, lng: float) -> int | None:
+        hits = self._snap_index.nearest(lat, lng, k=1, max_distance_km=self.max_snap_km)
+        return int(hits[0][1]) if hits else None
+
+    def _heuristic(self, target: int) -> list[float]:
+        """Lower bound of the travel time from every vertex to `target`, from the landmark times."""
+        forward, backward = self._landmark_forward, self._landmark_backward
+        if not self.landmarks:
+            return [0.0] * self.vertices
+        with np.errstate(invalid="ignore"):
+            # d(v, t) >= d(l, t) - d(l, v) and d(v, t) >= d(v, l) - d(t, l)
+            bound = np.maximum(
+                (forward[:, target, None] - forward).max(axis=0),
+                (backward - backward[:, target, None]).max(axis=0),
+            )
+        # inf - inf (both unreachable from a landmark) says nothing; +inf means unreachable.
+        # Scaled down slightly so float32 rounding never overestimates
+        return (np.maximum(np.nan_to_num(bound, nan=0.0, posinf=np.inf, neginf=0.0), 0.0) * 0.999).tolist()
+
+    def shortest_path(self, source: int, target: int, use_landmarks: bool = True) -> tuple[float, list[int]] | None:
+        """Fastest path as (travel time in seconds, edge indices), or None when unreachable."""
+        h = self._heuristic(target) if use_landmarks else None
+        if h is not None and h[source] == math.inf:
+            return None
+        offsets, targets, times = self._offsets, self._targets, self._times
+        dist = {source: 0.0}
+        via: dict[int, tuple[int, int]] = {}
+        heap = [(h[source] if h else 0.0, 0.0, source)]
+        while heap:
+            _, g, v = heapq.heappop(heap)
+            if v == target:
+                break
+            if g > dist[v]:
+                continue
+            for e in range(offsets[v], offsets[v + 1]):
+                w = targets[e]
+                ng = g + times[e]
+                if ng < dist.get(w, math.inf):
+                    estimate = h[w] if h else 0.0
+                    if estimate == math.inf:
+                        continue
+                    dist[w] = ng
+                    via[w] = (v, e)
+                    heapq.heappush(heap, (ng + estimate, ng, w))
+        if target not in dist:
+            return None
+
+        edges = []
+        v = target
+        while v != source:
+            v, e = via[v]
+            edges.append(e)
+        edges.reverse()
+        return dist[target], edges
+
+    def describe(self, edges: list[int]) -> list[str]:
+        """Turn-by-turn steps: consecutive edges on the same road make one step."""
+        legs: list[list[int]] = []
+        for e in edges:
+            if legs and self._name_ids[e] == self._name_ids[legs[-1][-1]]:
+                legs[-1].append(e)
+            else:
+                legs.append([e])
+
+        steps = []
+        for i, leg in enumerate(legs):
+            road = self._names[self._name_ids[leg[0]]] or "the road"
+            length = format_distance(sum(self._lengths[e] for e in leg))
+            if i == 0:
+                steps.append(f"Head {compass(self._bearings_out[leg[0]])} on {road} for {length}")
+            else:
+                turn = (self._bearings_out[leg[0]] - self._bearings_in[legs[i - 1][-1]] + 540) % 360 - 180
+                steps.append(f"{maneuver(turn)} onto {road} for {length}")
+        return steps
+
+    def route(self, origin_lat: float, origin_lng: float, destination_lat: float, destination_lng: float) -> Route | None:
+        """Fastest route between two points, or None when either is off the network or unreachable."""
+        source = self.nearest_vertex(origin_lat, origin_lng)
+        target = self.nearest_vertex(destination_lat, destination_lng)
+        if source is None or target is None:
+            self.unroutable += 1
+            return None
+
+        key = (source, target)
+        with self._lock:
+            if key in self._cache:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        found = self.shortest_path(source, target)
+        if found is None:
+            route = None
+            self.unroutable += 1
+        else:
+            duration_s, edges = found
+            route = Route(
+                distance_m=sum(self._lengths[e] for e in edges),
+                duration_s=duration_s,
+                steps=self.describe(edges),
+            )
+        self.routes += 1
+        with self._lock:
+            self._cache[key] = route
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return route
+
+    def stats(self) -> RoadRouterStats:
+        return RoadRouterStats(
+            vertices=self.vertices,
+            edges=len(self._targets),
+            landmarks=self.landmarks,
+            routes=self.routes,
+            cache_hits=self.cache_hits,
+            unroutable=self.unroutable,
+            cached=len(self._cache),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a road graph file for RoadRouter from an OSM XML extract.")
+    parser.add_argument("osm", type=Path, help="OSM XML extract (.osm)")
+    parser.add_argument("output", type=Path, help="Road graph file to write (.npz)")
+    parser.add_argument("--landmarks", type=int, default=8)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    nodes, ways = read_osm(args.osm)
+    size = build_road_graph(nodes, ways, args.output, landmarks=args.landmarks)
+    print(f"Wrote {size['vertices']} vertices, {size['edges']} edges and {size['landmarks']} landmarks "
+          f"to {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""App-scoped cache of Databutton secrets, refreshed in the background.
+
+`db.secrets.get()` may be a remote lookup, so it is kept off the request path:
+secrets are loaded once at startup and then re-read by a background thread every
+`ttl` seconds. Request handlers only read a dictionary. An entry older than `ttl`
+(e.g. while refreshes fail) is still served, and wakes the refresher.
+
+For key rotation, `invalidate()` makes the refresher reload right away. Until
+the new value arrives, the old one keeps being served.
+
+Usage:
+
+    from app.libs.secrets_provider import SecretsDep
+
+    @router.get("/example")
+    def example(secrets: SecretsDep):
+        api_key = secrets.get("GOOGLE_MAPS_API_KEY")
+"""
+
+import os
+import threading
+import time
+from typing import Annotated, Callable, Iterable
+
+import databutton as db
+from fastapi import Depends, HTTPException
+from fastapi.requests import HTTPConnection
+from pydantic import BaseModel
+
+from databutton_app.structured_log import get_logger
+
+log = get_logger(__name__)
+
+# Loaded at startup; other names are loaded on first use and refreshed from then on
+SECRET_NAMES = ("OPENAI_API_KEY", "GOOGLE_MAPS_API_KEY")
+
+
+class SecretsStats(BaseModel):
+    cached: int
+    refreshes: int
+    refresh_failures: int
+    # Lookups that had to load a secret on the request path
+    inline_loads: int
+    oldest_age_seconds: float
+
+
+def load_secret(name: str) -> str | None:
+    """Databutton secret, falling back to the environment for local runs."""
+    return db.secrets.get(name) or os.environ.get(name)
+
+
+class SecretsProvider:
+    """Secret values cached in memory and re-read by a background thread."""
+
+    def __init__(
+        self,
+        names: Iterable[str] = SECRET_NAMES,
+        ttl: float = 300.0,
+        min_refresh_interval: float = 5.0,
+        loader: Callable[[str], str | None] = load_secret,
+    ):
+        self.names = set(names)
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._loader = loader
+        # name -> (value, monotonic time it was loaded)
+        self._values: dict[str, tuple[str | None, float]] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.inline_loads = 0
+
+    def start(self) -> None:
+        """Load every known secret, then keep them fresh in the background."""
+        self.refresh()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="secrets-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _load(self, name: str) -> bool:
+        try:
+            value = self._loader(name)
+        except Exception as e:
+            self.refresh_failures += 1
+            log.warning("secret_refresh_failed", name=name, error=str(e))
+            return False
+        previous = self._values.get(name)
+        if previous is not None and previous[0] != value:
+            log.info("secret_changed", name=name)
+        self._values[name] = (value, time.monotonic())
+        return True
+
+    def refresh(self, names: Iterable[str] | None = None) -> None:
+        with self._lock:
+            for name in list(names if names is not None else self.names):
+                self._load(name)
+            self.refreshes += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.ttl)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.refresh()
+            # Invalidation storms reload at most once per interval
+            self._stop.wait(self.min_refresh_interval)
+
+    def get(self, name: str) -> str | None:
+        entry = self._values.get(name)
+        if entry is None:
+            # Not preloaded: the only case that reads the secret store inline
+            with self._lock:
+                self.names.add(name)
+                if name not in self._values:
+                    self.inline_loads += 1
+                    self._load(name)
+            entry = self._values.get(name, (None, 0.0))
+        elif time.monotonic() - entry[1] > self.ttl:
+            self._wake.set()
+        return entry[0]
+
+    def invalidate(self, name: str | None = None) -> None:
+        """Reload the secrets now rather than at the next refresh, e.g. after `name` was rotated."""
+        log.info("secrets_invalidated", name=name)
+        if name is not None:
+            self.names.add(name)
+        self._wake.set()
+        if self._thread is None:
+            self.refresh([name] if name is not None else None)
+
+    def stats(self) -> SecretsStats:
+        now = time.monotonic()
+        ages = [now - loaded for _, loaded in list(self._values.values())]
+        return SecretsStats(
+            cached=len(self._values),
+            refreshes=self.refreshes,
+            refresh_failures=self.refresh_failures,
+            inline_loads=self.inline_loads,
+            oldest_age_seconds=round(max(ages), 1) if ages else 0.0,
+        )
+
+
+def get_secrets_provider(request: HTTPConnection) -> SecretsProvider:
+    secrets: SecretsProvider | None = getattr(request.app.state, "secrets", None)
+
+    if secrets is None:
+        raise HTTPException(status_code=500, detail="Secrets provider is not configured")
+    return secrets
+
+
+SecretsDep = Annotated[SecretsProvider, Depends(get_secrets_provider)]
@@ -0,0 +1,246 @@
+"""Near-duplicate query cache backed by a NumPy similarity index.
+
+Queries are embedded locally with a hashed word + character n-gram vectorizer
+(no model download, CPU only), and looked up by cosine similarity against the
+cached queries of the same language. A lookup returns the cached value of the
+most similar query when the similarity reaches `threshold`.
+
+Negation and direction words change what a question asks while barely moving its
+embedding ("taxi from / to the airport", "is alcohol (not) allowed"). A cached
+query therefore only matches when both use the same ones, each applied to the
+same word. Only languages with a list of such words (`GUARD_WORDS`, English so
+far) are cached; lookups in any other language miss.
+
+Usage:
+
+    from app.libs.semantic_cache import SemanticCache
+
+    cache = SemanticCache(threshold=0.9)
+    hit = cache.get("what should i wear to the mosque", "en")
+    if hit is None:
+        cache.set("what should i wear to the mosque", "en", compute())
+"""
+
+import re
+import threading
+import time
+import zlib
+from typing import Any
+
+import numpy as np
+from pydantic import BaseModel
+
+# Very common English function words carry no meaning for matching tourist questions
+STOPWORDS = frozenset(
+    "a an and are at be can do does for how i in is it me my of on or should "
+    "the there what when where which who why will with you your".split()
+)
+
+# Never stopwords: a near-duplicate must use the same ones, see `guard_words()`
+NEGATION_WORDS = frozenset("not no never without nor cannot none nothing neither".split())
+DIRECTION_WORDS = frozenset("from to into onto toward towards before after".split())
+
+# Negation and direction words per language. A language without a list is not cached,
+# since a near-duplicate there could be asking the opposite
+GUARD_WORDS: dict[str, frozenset[str]] = {"en": NEGATION_WORDS | DIRECTION_WORDS}
+
+WORD_PATTERN = re.compile(r"\w+")
+# "isn't", "don’t": the negation would otherwise be a lone "t". Also matches
+# "isn t", the same query after `normalize_query()` replaced the apostrophe
+CONTRACTION_PATTERN = re.compile(r"n(?:['’]| )t\b")
+
+
+def content_words(text: str) -> list[str]:
+    words = WORD_PATTERN.findall(CONTRACTION_PATTERN.sub(" not", text.casefold()))
+    return [w for w in words if w not in STOPWORDS]
+
+
+def guard_words(text: str, language: str = "en") -> tuple[tuple[str, str], ...]:
+    """Each negation or direction word with the next content word it applies to."""
+    guards = GUARD_WORDS.get(language, frozenset())
+    words = content_words(text)
+    return tuple(
+        (w, next((x for x in words[i + 1 :] if x not in guards), ""))
+        for i, w in enumerate(words)
+        if w in guards
+    )
+
+
+class HashedNgramEmbedder:
+    """Feature-hashed bag of words and character trigrams, L2 normalized."""
+
+    def __init__(self, dim: int = 256, word_weight: float = 2.0):
+        self.dim = dim
+        self.word_weight = word_weight
+
+    def _features(self, text: str) -> list[tuple[str, float]]:
+        words = content_words(text)
+        features = [("w:" + w, self.word_weight) for w in words]
+        for w in words:
+            padded = f" {w} "
+            features.extend(("c:" + padded[i : i + 3], 1.0) for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            # crc32 is stable across processes, unlike hash() on str
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * weight
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class _Partition:
+    """Fixed-capacity vector store for one language, evicting the least recently used slot."""
+
+    def __init__(self, capacity: int, dim: int):
+        self.capacity = capacity
+        self.size = 0
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.keys: list[str | None] = [None] * capacity
+        self.guards: list[tuple[tuple[str, str], ...]] = [()] * capacity
+        self.values: list[Any] = [None] * capacity
+        self.slots: dict[str, int] = {}
+
+    def search(self, vector: np.ndarray, guards: tuple, threshold: float, now: float) -> tuple[int, float, bool]:
+        """Most similar live slot at or above `threshold` with the same guard words (-1 if none),
+        its similarity (the best one when there is no slot), and whether guard words ruled out a match."""
+        if self.size == 0:
+            return -1, 0.0, False
+        similarities = self.vectors[: self.size] @ vector
+        similarities[self.expires_at[: self.size] <= now] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < threshold or self.guards[best] == guards:
+            return best, float(similarities[best]), False
+
+        candidates = np.flatnonzero(similarities >= threshold)
+        for slot in candidates[np.argsort(-similarities[candidates], kind="stable")].tolist():
+            if self.guards[slot] == guards:
+                return slot, float(similarities[slot]), False
+        return -1, float(similarities[best]), True
+
+    def free_slot(self, now: float) -> tuple[int, bool]:
+        """Return a slot to write to and whether a live entry had to be evicted."""
+        if self.size < self.capacity:
+            self.size += 1
+            return self.size - 1, False
+
+        expired = np.flatnonzero(self.expires_at <= now)
+        if len(expired):
+            return int(expired[0]), False
+        return int(np.argmin(self.last_used)), True
+
+    def put(self, slot: int, key: str, vector: np.ndarray, guards: tuple, value: Any, expires_at: float, now: float) -> None:
+        old_key = self.keys[slot]
+        if old_key is not None and self.slots.get(old_key) == slot:
+            del self.slots[old_key]
+
+        self.vectors[slot] = vector
+        self.expires_at[slot] = expires_at
+        self.last_used[slot] = now
+        self.keys[slot] = key
+        self.guards[slot] = guards
+        self.values[slot] = value
+        self.slots[key] = slot
+
+
+class SemanticCacheStats(BaseModel):
+    entries: dict[str, int]
+    capacity_per_language: int
+    threshold: float
+    hits: int
+    misses: int
+    guard_misses: int
+    evictions: int
+    hit_ratio: float
+
+
+class SemanticCache:
+    """Thread-safe similarity cache, partitioned by language code."""
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        capacity_per_language: int = 10_000,
+        ttl: float = 3600.0,
+        embedder: HashedNgramEmbedder | None = None,
+    ):
+        self.threshold = threshold
+        self.capacity_per_language = capacity_per_language
+        self.ttl = ttl
+        self.embedder = embedder or HashedNgramEmbedder()
+        self._partitions: dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Similar enough, but asking the opposite (a negation or direction word differs)
+        self.guard_misses = 0
+        self.evictions = 0
+
+    def get(self, query: str, language: str) -> Any | None:
+        value, _ = self.get_with_similarity(query, language)
+        return value
+
+    def get_with_similarity(self, query: str, language: str) -> tuple[Any | None, float]:
+        if self.capacity_per_language <= 0 or language not in GUARD_WORDS:
+            return None, 0.0
+
+        vector = self.embedder.embed(query)
+        guards = guard_words(query, language)
+        now = time.monotonic()
+        with self._lock:
+            partition = self._partitions.get(language)
+            slot, similarity, guarded = (
+                partition.search(vector, guards, self.threshold, now) if partition else (-1, 0.0, False)
+            )
+            if slot < 0 or similarity < self.threshold:
+                self.misses += 1
+                self.guard_misses += guarded
+                return None, similarity
+
+            partition.last_used[slot] = now
+            self.hits += 1
+            return partition.values[slot], similarity
+
+    def set(self, query: str, language: str, value: Any) -> None:
+        if self.capacity_per_language <= 0 or language not in GUARD_WORDS:
+            return
+
+        vector = self.embedder.embed(query)
+        now = time.monotonic()
+        with self._lock:
+            partition = self._partitions.get(language)
+            if partition is None:
+                partition = _Partition(self.capacity_per_language, self.embedder.dim)
+                self._partitions[language] = partition
+
+            slot = partition.slots.get(query)
+            if slot is None:
+                slot, evicted = partition.free_slot(now)
+                self.evictions += evicted
+            partition.put(slot, query, vector, guard_words(query, language), value, now + self.ttl, now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+
+    def stats(self) -> SemanticCacheStats:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return SemanticCacheStats(
+                entries={language: p.size for language, p in self._partitions.items()},
+                capacity_per_language=self.capacity_per_language,
+                threshold=self.threshold,
+                hits=self.hits,
+                misses=self.misses,
+                guard_misses=self.guard_misses,
+                evictions=self.evictions,
+                hit_ratio=self.hits / lookups if lookups else 0.0,
+            )
@@ -0,0 +1,191 @@
+"""Group streamed text into sentences or clauses for speech synthesis.
+
+Speech synthesis can only start on a complete sentence, so raw token deltas are
+regrouped here at sentence boundaries in all supported languages:
+
+- `. ! ? …` followed by whitespace (English, Spanish, German, French, Russian),
+  skipping common abbreviations and list numbers
+- `؟ ۔` (Arabic), `। ॥` (Hindi/Devanagari) and `。！？` (Chinese)
+- line breaks
+
+Sentences longer than `max_chars` are split at clause punctuation (`, ; :` and
+`، ؛ ， ； 、 ：`), or else at a word break, or else at `max_chars` itself.
+`segment_sentences()` adds a maximum-wait flush on top: text
+that has waited `max_wait` seconds without a boundary is emitted at the last
+clause or word break, so time-to-first-speech stays bounded on slow streams.
+
+Usage:
+
+    from app.libs.sentence_segmenter import segment_sentences
+
+    async for sentence in segment_sentences(gateway.stream_text(...), max_wait=0.8):
+        ...
+"""
+
+import asyncio
+import re
+from typing import AsyncIterator
+
+from app.libs.streaming import cancel_pending_read
+
+# Closing quotes and brackets that belong to the sentence they end
+CLOSERS = "\"'”’»」』）)]"
+_CLOSER = f"[{re.escape(CLOSERS)}]"
+
+# Latin and Cyrillic terminals need a following space ("3.5", "dubai.com" are not
+# boundaries); Arabic, Devanagari and CJK terminals are unambiguous
+SENTENCE_END = re.compile(
+    rf"\n+|[.!?…]+{_CLOSER}*(?=\s)|[؟۔।॥。！？]+{_CLOSER}*(?=[\s\S])"
+)
+CLAUSE_END = re.compile(rf"[,;:—،؛，；、：]{_CLOSER}*(?=\s|[^\x00-ɏ])")
+
+# Lowercased words that end in a period without ending the sentence
+ABBREVIATIONS = {
+    # English
+    "mr", "mrs", "ms", "dr", "st", "ave", "etc", "e.g", "i.e", "vs", "approx", "min", "max",
+    # Spanish
+    "sr", "sra", "srta", "ud", "uds", "av", "aprox",
+    # German
+    "z.b", "bzw", "usw", "ca", "nr", "str", "u.a", "d.h",
+    # French
+    "m", "mme", "mlle", "env",
+    # Russian
+    "т.е", "т.д", "т.п", "г", "ул", "им", "др",
+}
+
+
+class SentenceSegmenter:
+    """Incremental sentence splitter; feed it deltas, get back complete segments."""
+
+    def __init__(self, max_chars: int = 200):
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def _is_false_boundary(self, match: re.Match) -> bool:
+        if not match.group().startswith("."):
+            return False
+        words = self.buffer[: match.start()].rsplit(None, 1)
+        word = words[-1].lower() if words else ""
+        # "Dr." and "e.g."; "1." and "2." at the start of a line are list numbers
+        if word.lstrip("(\"'«“¿¡") in ABBREVIATIONS:
+            return True
+        line_start = self.buffer[: match.start() - len(word)].rstrip(" \t")
+        return word.isdigit() and (not line_start or line_start.endswith("\n"))
+
+    def _take(self, end: int) -> str:
+        segment, self.buffer = self.buffer[:end].strip(), self.buffer[end:]
+        return segment
+
+    def feed(self, text: str) -> list[str]:
+        """Add a delta and return the segments it completed."""
+        self.buffer += text
+        segments = []
+        while True:
+            match = next(
+                (m for m in SENTENCE_END.finditer(self.buffer) if not self._is_false_boundary(m)),
+                None,
+            )
+            if match is None:
+                break
+            segment = self._take(match.end())
+            if segment:
+                segments.append(segment)
+
+        while len(self.buffer) > self.max_chars:
+            segment = self.flush_partial(self.max_chars)
+            if not segment:
+                break
+            segments.append(segment)
+        return segments
+
+    def flush_partial(self, limit: int | None = None) -> str | None:
+        """Emit the buffered text up to the last clause break, or else the last word break.
+
+        Only the first `limit` characters are considered. The trailing partial word
+        stays buffered, so a word is never cut in half, unless the first `limit`
+        characters have no break at all (Chinese and Japanese need no spaces): they
+        are then cut at `limit`, so the buffer cannot grow without bound.
+        """
+        text = self.buffer if limit is None else self.buffer[:limit]
+        clause_ends = list(CLAUSE_END.finditer(text))
+        if clause_ends:
+            end = clause_ends[-1].end()
+        else:
+            end = max(text.rfind(" "), text.rfind("\n"))
+            if end <= 0:
+                if limit is None or len(self.buffer) <= limit:
+                    return None
+                end = limit
+        return self._take(end) or None
+
+    def flush(self) -> str | None:
+        """Emit whatever is left at the end of the stream."""
+        return self._take(len(self.buffer)) or None
+
+
+def segment_text(text: str, max_chars: int = 200) -> list[str]:
+    """Segment a complete text, e.g. a cached answer being replayed."""
+    segmenter = SentenceSegmenter(max_chars)
+    segments = segmenter.feed(text)
+    tail = segmenter.flush()
+    return segments + [tail] if tail else segments
+
+
+async def segment_sentences(
+    deltas: AsyncIterator[str],
+    max_wait: float = 0.8,
+    segmenter: SentenceSegmenter | None = None,
+) -> AsyncIterator[str]:
+    """Regroup streamed deltas into sentences, never holding text back longer than `max_wait`."""
+    segmenter = segmenter or SentenceSegmenter()
+    loop = asyncio.get_running_loop()
+    # When the oldest text still in the buffer arrived
+    pending_since: float | None = None
+    next_delta: asyncio.Future | None = None
+
+    def flush_stale() -> str | None:
+        nonlocal pending_since
+        segment = segmenter.flush_partial()
+        # Whatever could not be flushed (a partial word) starts a fresh wait
+        pending_since = loop.time() if segmenter.buffer.strip() else None
+        return segment
+
+    try:
+        while True:
+            if next_delta is None:
+                next_delta = asyncio.ensure_future(anext(deltas))
+            timeout = None if pending_since is None else max(0.0, pending_since + max_wait - loop.time())
+            await asyncio.wait([next_delta], timeout=timeout)
+
+            if not next_delta.done():
+                # Upstream is slow: speak what we have instead of waiting for the boundary
+                segment = flush_stale()
+                if segment:
+                    yield segment
+                continue
+
+            try:
+                delta = next_delta.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                next_delta = None
+
+            segments = segmenter.feed(delta)
+            for segment in segments:
+                yield segment
+            if not segmenter.buffer.strip():
+                pending_since = None
+            elif pending_since is None or segments:
+                pending_since = loop.time()
+            elif loop.time() - pending_since >= max_wait:
+                # Deltas keep coming, but none of them ends a sentence
+                segment = flush_stale()
+                if segment:
+                    yield segment
+
+        tail = segmenter.flush()
+        if tail:
+            yield tail
+    finally:
+        await cancel_pending_read(deltas, next_delta)
@@ -0,0 +1,164 @@
+"""Coalescing of identical in-flight requests ("single flight").
+
+When several requests for the same key arrive while the first is still being
+computed, only the first one calls upstream. The others wait for its result
+instead of issuing their own OpenAI completion:
+
+- `SingleFlight.do()` shares the result (or exception) of a coroutine
+- `SingleFlight.stream()` shares an async iterator; a follower that attaches
+  mid-stream first receives everything buffered so far, then the live items
+
+The upstream call is cancelled only when every caller waiting on it has gone
+away, so one client disconnecting never cuts off the others. A key is forgotten
+as soon as its call finishes; later requests are served by the response cache or
+start a new call.
+
+Usage:
+
+    from app.libs.single_flight import SingleFlight
+
+    answers = SingleFlight()
+
+    result, coalesced = await answers.do(key, lambda: answer(query))
+    deltas, coalesced = answers.stream(key, lambda: gateway.stream_text(...))
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Hashable, TypeVar
+
+from pydantic import BaseModel
+
+from app.libs.streaming import cancel_pending_read
+
+T = TypeVar("T")
+
+
+class SingleFlightStats(BaseModel):
+    # Upstream calls started, and requests that shared one instead
+    calls: int
+    coalesced: int
+    in_flight: int
+
+
+class _Call:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class _SharedStream(Generic[T]):
+    """Reads a source iterator once, in its own task, and replays it to every subscriber."""
+
+    def __init__(self, source: AsyncIterator[T]):
+        self.items: list[T] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[T]) -> None:
+        try:
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = RuntimeError("Shared stream was cancelled")
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+            await cancel_pending_read(source, None)
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def subscribe(self) -> AsyncIterator[T]:
+        # Counted right away, so the source is not cancelled between two subscribers
+        self.subscribers += 1
+        return self._read()
+
+    async def _read(self) -> AsyncIterator[T]:
+        index = 0
+        try:
+            while True:
+                if index < len(self.items):
+                    index += 1
+                    yield self.items[index - 1]
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                # Last subscriber gone: stop the upstream generation
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Shares one in-flight call per key between concurrent callers."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._streams: dict[Hashable, _SharedStream] = {}
+        self._started = 0
+        self._coalesced = 0
+
+    def _forget_when_done(self, registry: dict, key: Hashable, entry: Any, task: asyncio.Future) -> None:
+        def forget(_: asyncio.Future) -> None:
+            if registry.get(key) is entry:
+                del registry[key]
+
+        task.add_done_callback(forget)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Return `fn()`'s result and whether it was shared with an earlier caller."""
+        call = self._calls.get(key)
+        coalesced = call is not None
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            self._forget_when_done(self._calls, key, call, call.task)
+            self._started += 1
+        else:
+            self._coalesced += 1
+
+        call.waiters += 1
+        try:
+            # Shielded, so a caller being cancelled does not cancel the shared call
+            return await asyncio.shield(call.task), coalesced
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Only reached when the last caller was cancelled
+                call.task.cancel()
+
+    def stream(self, key: Hashable, source: Callable[[], AsyncIterator[T]]) -> tuple[AsyncIterator[T], bool]:
+        """Subscribe to the stream for `key`, starting `source()` if none is in flight.
+
+        Returns the items from the start of the stream and whether it was already
+        in flight.
+        """
+        shared = self._streams.get(key)
+        if shared is not None and shared.done and shared.error is not None:
+            # Failed or cancelled, and still closing its source: start over
+            shared = None
+        coalesced = shared is not None
+        if shared is None:
+            shared = self._streams[key] = _SharedStream(source())
+            self._forget_when_done(self._streams, key, shared, shared.task)
+            self._started += 1
+        else:
+            self._coalesced += 1
+        return shared.subscribe(), coalesced
+
+    def stats(self) -> SingleFlightStats:
+        return SingleFlightStats(
+            calls=self._started,
+            coalesced=self._coalesced,
+            in_flight=len(self._calls) + len(self._streams),
+        )
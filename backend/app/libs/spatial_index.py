@@ -0,0 +1,183 @@
+"""Grid index over location coordinates for nearest-neighbour and radius queries.
+
+Points are bucketed into square lat/lng cells sized so an average cell holds a
+handful of points, with a separate grid per category:
+
+- `nearest()` scans rings of cells outward from the query point, and stops once
+  the next ring cannot hold anything closer than the k-th match so far
+- `within()` scans the cells overlapping the radius' bounding box
+
+Distances are great-circle (haversine) kilometres. The grid does not wrap around
+the antimeridian or the poles, which is fine for a city catalog.
+
+Usage:
+
+    from app.libs.spatial_index import SpatialIndex
+
+    index = SpatialIndex(catalog.points())
+    for distance_km, location_id in index.nearest(25.2, 55.27, k=5, category="beach"):
+        ...
+"""
+
+import math
+from typing import Iterable, Iterator
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# (latitude and longitude in radians, cosine of the latitude, id)
+_Point = tuple[float, float, float, str]
+_Cell = tuple[int, int]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in kilometres between two points given in degrees."""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class _Grid:
+    def __init__(self):
+        self.cells: dict[_Cell, list[_Point]] = {}
+        self.size = 0
+
+    def add(self, cell: _Cell, point: _Point) -> None:
+        self.cells.setdefault(cell, []).append(point)
+        self.size += 1
+
+    def freeze(self) -> None:
+        rows = [i for i, _ in self.cells]
+        columns = [j for _, j in self.cells]
+        self.bounds = (min(rows), max(rows), min(columns), max(columns))
+
+
+class SpatialIndex:
+    """Nearest-neighbour and radius search over (id, category, lat, lng) points."""
+
+    def __init__(self, points: Iterable[tuple[str, str, float, float]], points_per_cell: int = 4):
+        points = list(points)
+        self.size = len(points)
+        lats = [lat for _, _, lat, _ in points] or [0.0]
+        lngs = [lng for _, _, _, lng in points] or [0.0]
+        # Square cells (in degrees) that hold `points_per_cell` points on average over the bounding box
+        area = max((max(lats) - min(lats)) * (max(lngs) - min(lngs)), 1e-6)
+        self.cell_degrees = max(math.sqrt(area * points_per_cell / max(self.size, 1)), 1e-4)
+        # A cell is narrowest (east-west) at the latitude farthest from the equator
+        self._max_abs_lat = min(max(abs(min(lats)), abs(max(lats))), 89.0)
+
+        self._grids: dict[str | None, _Grid] = {None: _Grid()}
+        for location_id, category, lat, lng in points:
+            cell = self._cell(lat, lng)
+            point = (math.radians(lat), math.radians(lng), math.cos(math.radians(lat)), location_id)
+            self._grids[None].add(cell, point)
+            self._grids.setdefault(category, _Grid()).add(cell, point)
+        for grid in self._grids.values():
+            if grid.size:
+                grid.freeze()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def categories(self) -> list[str]:
+        return [category for category in self._grids if category is not None]
+
+    def _cell(self, lat: float, lng: float) -> _Cell:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def _cell_km(self, lat: float) -> float:
+        """Lower bound of a cell's width in km, around the data and the query point."""
+        max_abs_lat = min(max(self._max_abs_lat, abs(lat)), 89.0)
+        # Slightly below the parallel arc, as great circles between two points are shorter
+        return 0.99 * self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(max_abs_lat))
+
+    @staticmethod
+    def _ring(grid: _Grid, ci: int, cj: int, r: int) -> Iterator[list[_Point]]:
+        """Non-empty cells at Chebyshev distance `r` from (ci, cj), clipped to the grid."""
+        min_i, max_i, min_j, max_j = grid.bounds
+        cells = grid.cells
+        if r == 0:
+            if (ci, cj) in cells:
+                yield cells[(ci, cj)]
+            return
+        j_from, j_to = max(cj - r, min_j), min(cj + r, max_j)
+        for i in (ci - r, ci + r):
+            if min_i <= i <= max_i:
+                for j in range(j_from, j_to + 1):
+                    if (i, j) in cells:
+                        yield cells[(i, j)]
+        for i in range(max(ci - r + 1, min_i), min(ci + r - 1, max_i) + 1):
+            for j in (cj - r, cj + r):
+                if min_j <= j <= max_j and (i, j) in cells:
+                    yield cells[(i, j)]
+
+    @staticmethod
+    def _distances(points: list[_Point], lat: float, lng: float, cos_lat: float) -> Iterator[tuple[float, str]]:
+        for plat, plng, pcos, location_id in points:
+            a = math.sin((plat - lat) / 2) ** 2 + cos_lat * pcos * math.sin((plng - lng) / 2) ** 2
+            yield 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a))), location_id
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int = 5,
+        category: str | None = None,
+        max_distance_km: float | None = None,
+    ) -> list[tuple[float, str]]:
+        """Up to `k` (distance_km, id) pairs closest to the point, nearest first."""
+        grid = self._grids.get(category)
+        if grid is None or not grid.size or k <= 0:
+            return []
+        min_i, max_i, min_j, max_j = grid.bounds
+        ci, cj = self._cell(lat, lng)
+        cell_km = self._cell_km(lat)
+        lat_rad, lng_rad, cos_lat = math.radians(lat), math.radians(lng), math.cos(math.radians(lat))
+
+        best: list[tuple[float, str]] = []
+        first_ring = max(0, min_i - ci, ci - max_i, min_j - cj, cj - max_j)
+        last_ring = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj)
+        for r in range(first_ring, last_ring + 1):
+            # Every point in ring r is more than r - 1 cells away
+            bound = (r - 1) * cell_km
+            if (len(best) >= k and best[-1][0] <= bound) or (max_distance_km is not None and bound > max_distance_km):
+                break
+            for points in self._ring(grid, ci, cj, r):
+                best.extend(self._distances(points, lat_rad, lng_rad, cos_lat))
+            if len(best) >= k:
+                best.sort()
+                del best[k:]
+        best.sort()
+        if max_distance_km is not None:
+            best = [hit for hit in best if hit[0] <= max_distance_km]
+        return best[:k]
+
+    def within(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        category: str | None = None,
+        limit: int | None = None,
+    ) -> list[tuple[float, str]]:
+        """(distance_km, id) pairs within `radius_km` of the point, nearest first."""
+        grid = self._grids.get(category)
+        if grid is None or not grid.size or radius_km < 0:
+            return []
+        min_i, max_i, min_j, max_j = grid.bounds
+        dlat = radius_km / KM_PER_DEGREE
+        dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + dlat, 89.0))), 1e-6))
+        i_from, j_from = self._cell(lat - dlat, lng - dlng)
+        i_to, j_to = self._cell(lat + dlat, lng + dlng)
+        lat_rad, lng_rad, cos_lat = math.radians(lat), math.radians(lng), math.cos(math.radians(lat))
+
+        hits = []
+        for i in range(max(i_from, min_i), min(i_to, max_i) + 1):
+            for j in range(max(j_from, min_j), min(j_to, max_j) + 1):
+                points = grid.cells.get((i, j))
+                if points:
+                    hits.extend(hit for hit in self._distances(points, lat_rad, lng_rad, cos_lat) if hit[0] <= radius_km)
+        hits.sort()
+        return hits[:limit] if limit is not None else hits
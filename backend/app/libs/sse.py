@@ -0,0 +1,23 @@
+"""Helpers for Server-Sent-Events responses.
+
+Usage:
+
+    from fastapi.responses import StreamingResponse
+    from app.libs.sse import SSE_HEADERS, format_sse
+
+    async def events():
+        yield format_sse("token", {"text": "Hello"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+"""
+
+import json
+from typing import Any
+
+# Stop proxies from buffering or caching the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """One SSE message with a JSON payload; JSON never contains raw newlines."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,68 @@
+"""Client-disconnect handling for streaming responses.
+
+Usage:
+
+    from fastapi.responses import StreamingResponse
+    from app.libs.streaming import cancel_on_disconnect
+
+    @router.post("/stream")
+    async def stream(http_request: Request):
+        return StreamingResponse(cancel_on_disconnect(http_request, generate()))
+"""
+
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, TypeVar
+
+import anyio
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+
+async def cancel_on_disconnect(request: Request, iterator: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Yield from `iterator` until the client disconnects, then cancel it immediately.
+
+    Newer servers only report a disconnect when the next write fails, which could
+    be long after the client left if the upstream is slow. Watching the receive
+    channel instead cancels the pending read of `iterator` as soon as the
+    disconnect arrives. The next item is only requested after the previous one
+    was consumed, so backpressure is preserved.
+    """
+    async def wait_for_disconnect() -> None:
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(wait_for_disconnect())
+    next_item: asyncio.Future | None = None
+    try:
+        while True:
+            next_item = asyncio.ensure_future(anext(iterator))
+            await asyncio.wait([next_item, watcher], return_when=asyncio.FIRST_COMPLETED)
+            if not next_item.done():
+                return
+            try:
+                item = next_item.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        watcher.cancel()
+        # The client is gone, or the server is cancelling the response
+        await cancel_pending_read(iterator, next_item)
+
+
+async def cancel_pending_read(iterator: AsyncIterator[Any], pending: asyncio.Future | None) -> None:
+    """Cancel an in-flight `anext(iterator)` and close the iterator.
+
+    Cancelling the read propagates into the iterator, so an upstream request it is
+    awaiting is cancelled with it. Shielded, so the cleanup also completes while the
+    calling task is itself being cancelled.
+    """
+    with anyio.CancelScope(shield=True):
+        if pending is not None and not pending.done():
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                await pending
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
@@ -0,0 +1,115 @@
+"""Vectorized distance matrix vs the per-pair `math` haversine loop.
+
+For catalogs of several sizes (the built-in one, and synthetic ones from
+`bench_location_catalog.generate_locations`) this times:
+
+- one origin to every location, the shape of a "what is around X" batch
+- a many-to-many block of origins and destinations
+- a single pair, the lookup `generate_directions` does
+- building the `DistanceMatrix` (which precomputes all pairs for small catalogs)
+
+each with `DistanceMatrix` and with a Python loop of `haversine_km` calls, and
+reports the largest difference between the two results.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_distance_matrix --sizes 10,1000,100000
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from app.apis.dubai_locations import DUBAI_LOCATIONS
+from app.libs.distance_matrix import DistanceMatrix
+from app.libs.spatial_index import haversine_km
+from benchmarks.bench_location_catalog import generate_locations
+
+
+def best_ms(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return round(min(times) * 1000, 4)
+
+
+def loop_matrix(coordinates: dict[str, tuple[float, float]], origins: list[str], destinations: list[str]) -> list[list[float]]:
+    return [
+        [haversine_km(*coordinates[origin], *coordinates[destination]) for destination in destinations]
+        for origin in origins
+    ]
+
+
+def run_size(records: list[dict], block: int, repeat: int, rng: random.Random) -> dict:
+    points = [(r["id"], r["category"], r["location"]["lat"], r["location"]["lng"]) for r in records]
+    coordinates = {location_id: (lat, lng) for location_id, _, lat, lng in points}
+    ids = [location_id for location_id, _, _, _ in points]
+
+    started = time.perf_counter()
+    matrix = DistanceMatrix(points)
+    build_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    origin = rng.choice(ids)
+    origins = rng.sample(ids, min(block, len(ids)))
+    destinations = rng.sample(ids, min(block * 10, len(ids)))
+    pairs = [tuple(rng.sample(ids, 2)) for _ in range(1000)]
+
+    vectorized = matrix.matrix(origins, destinations)
+    looped = np.array(loop_matrix(coordinates, origins, destinations))
+    max_error_km = float(np.abs(vectorized - looped).max())
+
+    # Cold: a new origin each time, so large catalogs compute the row instead of reusing it
+    cold_origins = iter(rng.choices(ids, k=repeat))
+    results = {
+        "one_to_all_ms": {
+            "loop": best_ms(lambda: loop_matrix(coordinates, [origin], ids), max(1, repeat // 5)),
+            "vectorized_cold": best_ms(lambda: matrix.durations_minutes(matrix.matrix([next(cold_origins)])), repeat),
+            "vectorized_warm": best_ms(lambda: matrix.durations_minutes(matrix.matrix([origin])), repeat),
+        },
+        f"{len(origins)}x{len(destinations)}_ms": {
+            "loop": best_ms(lambda: loop_matrix(coordinates, origins, destinations), max(1, repeat // 5)),
+            "vectorized": best_ms(lambda: matrix.matrix(origins, destinations), repeat),
+        },
+        "single_pair_us": {
+            # Milliseconds per 1000 pairs, i.e. microseconds per pair
+            "loop": best_ms(lambda: [haversine_km(*coordinates[a], *coordinates[b]) for a, b in pairs], repeat),
+            "vectorized": best_ms(lambda: [matrix.distance_km(a, b) for a, b in pairs], repeat),
+        },
+    }
+    for name, timings in results.items():
+        if "loop" in timings:
+            fastest = min(value for key, value in timings.items() if key != "loop")
+            timings["speedup"] = round(timings["loop"] / fastest, 1) if fastest else None
+
+    return {
+        "locations": len(ids),
+        "precomputed": matrix.precomputed,
+        "build_ms": build_ms,
+        "max_error_km": max_error_km,
+        **results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,100000", help="Catalog sizes; 10 is the built-in catalog")
+    parser.add_argument("--block", type=int, default=100, help="Origins in the many-to-many block (destinations: 10x)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    report = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        records = DUBAI_LOCATIONS if size == len(DUBAI_LOCATIONS) else generate_locations(size, rng)
+        report.append(run_size(records, args.block, args.repeat, rng))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
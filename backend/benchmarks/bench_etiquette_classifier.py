@@ -0,0 +1,154 @@
+"""Single-pass etiquette classifier vs the original per-term substring scans.
+
+The legacy functions below are the implementations `classify_etiquette` replaced,
+kept verbatim so the comparison stays meaningful as the keyword lists evolve.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_etiquette_classifier --queries 100000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.apis.dubai_assistant import classify_etiquette
+
+
+def legacy_is_etiquette_query(query: str) -> bool:
+    etiquette_terms = [
+        "etiquette", "custom", "tradition", "dress code", "clothing",
+        "wear", "greet", "greeting", "handshake", "gesture",
+        "nod", "bow", "religious", "islam", "mosque", "ramadan",
+        "dining", "eat", "food", "restaurant", "table manner",
+        "public", "behavior", "conduct", "appropriate", "acceptable",
+        "photo", "picture", "business", "meeting", "professional",
+        "card", "gift", "home", "visit", "house", "gender", "male", "female",
+        "prayer", "modest", "modesty", "rude", "polite", "offensive"
+    ]
+
+    query_lower = query.lower()
+    return any(term in query_lower for term in etiquette_terms)
+
+
+def legacy_detect_etiquette_category(query: str) -> str:
+    query_lower = query.lower()
+
+    category_patterns = {
+        "dress-code": ["dress", "wear", "clothes", "attire", "outfit", "modest", "clothing"],
+        "greetings": ["greet", "handshake", "hello", "salaam", "gesture", "wave", "bow"],
+        "religious-customs": ["mosque", "islam", "prayer", "ramadan", "religious", "faith", "holy"],
+        "dining": ["eat", "food", "dining", "restaurant", "meal", "breakfast", "lunch", "dinner", "table"],
+        "public-behavior": ["public", "behavior", "acceptable", "allowed", "illegal", "law", "rule", "pda"],
+        "business": ["business", "meeting", "professional", "office", "work", "colleague", "card"],
+        "home-visits": ["home", "house", "visit", "invitation", "invit", "guest", "host"],
+        "gender-interactions": ["gender", "man", "woman", "male", "female", "interaction", "touch"]
+    }
+
+    for category, keywords in category_patterns.items():
+        if any(keyword in query_lower for keyword in keywords):
+            return category
+
+    return "public-behavior"
+
+
+OPENERS = [
+    "what should i know about", "is it ok to", "can you tell me about", "how do people handle",
+    "any tips on", "is there a rule about", "quick question about", "explain",
+    "¿qué debo saber sobre", "was muss ich wissen über", "que dois-je savoir sur",
+    "что нужно знать о", "ما الذي يجب أن أعرفه عن", "关于", "मुझे बताइए",
+]
+
+TOPICS = [
+    "the dress code at the mosque", "greeting people during ramadan", "eating in public",
+    "business card etiquette", "visiting a local home", "taking photos of women",
+    "tipping at a restaurant", "the metro opening hours", "the best beaches", "the great dubai frame",
+    "discarded tickets at the mall", "desert safari prices", "shopping at the gold souk",
+    "the weather in august", "holding hands in public", "what to wear at the beach",
+    "handshakes with the opposite gender", "alcohol laws", "office meetings with colleagues",
+    "hotel check-in times", "a many-course dinner with a host family", "swimwear in the mall",
+]
+
+CLOSERS = ["", "?", " please", " in dubai?", " this weekend", " for my family", " as a tourist?"]
+
+
+def generate_corpus(count: int, rng: random.Random) -> list[str]:
+    queries = []
+    for _ in range(count):
+        query = f"{rng.choice(OPENERS)} {rng.choice(TOPICS)}{rng.choice(CLOSERS)}"
+        # Some voice transcripts run on for several sentences
+        if rng.random() < 0.2:
+            query += " " + " and ".join(rng.choice(TOPICS) for _ in range(rng.randint(2, 6)))
+        queries.append(query)
+    return queries
+
+
+def time_per_query_us(function, corpus: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for query in corpus:
+            function(query)
+        best = min(best, time.perf_counter() - started)
+    return best / len(corpus) * 1e6
+
+
+def legacy_classify(query: str) -> str | None:
+    # The original handler ran both scans for etiquette queries
+    return legacy_detect_etiquette_category(query) if legacy_is_etiquette_query(query) else None
+
+
+def automaton_classify(query: str) -> str | None:
+    classification = classify_etiquette(query)
+    return classification.primary_category if classification.is_etiquette else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many timed runs")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.queries, random.Random(args.seed))
+
+    legacy_us = time_per_query_us(legacy_classify, corpus, args.repeat)
+    automaton_us = time_per_query_us(automaton_classify, corpus, args.repeat)
+
+    # Run-on transcripts: the legacy scans stop at the first matching term, while the
+    # automaton scans the whole text to score every category, so this is its worst case
+    long_corpus = [q for q in corpus if len(q) > 120]
+    legacy_long_us = time_per_query_us(legacy_classify, long_corpus, args.repeat)
+    automaton_long_us = time_per_query_us(automaton_classify, long_corpus, args.repeat)
+
+    # Disagreements are expected where substring matching was wrong ("eat" in "great")
+    legacy_results = [legacy_classify(q) for q in corpus]
+    automaton_results = [automaton_classify(q) for q in corpus]
+    agreement = sum(a == b for a, b in zip(legacy_results, automaton_results)) / len(corpus)
+
+    results = {
+        "queries": len(corpus),
+        "mean_query_chars": round(sum(map(len, corpus)) / len(corpus), 1),
+        "legacy_us_per_query": round(legacy_us, 2),
+        "automaton_us_per_query": round(automaton_us, 2),
+        "speedup": round(legacy_us / automaton_us, 2),
+        "long_queries": len(long_corpus),
+        "legacy_us_per_long_query": round(legacy_long_us, 2),
+        "automaton_us_per_long_query": round(automaton_long_us, 2),
+        "long_query_speedup": round(legacy_long_us / automaton_long_us, 2),
+        "agreement": round(agreement, 4),
+        "legacy_etiquette_rate": round(sum(r is not None for r in legacy_results) / len(corpus), 4),
+        "automaton_etiquette_rate": round(sum(r is not None for r in automaton_results) / len(corpus), 4),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, value in results.items():
+            print(f"{name:26} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Micro-benchmarks of the per-request CPU work, checked against stored baselines.
+
+Times the pure-Python functions every request goes through on generated,
+multilingual inputs:
+
+- `is_etiquette_query` and `detect_etiquette_category`
+- `parse_etiquette_block` (the [ETIQUETTE_INFO] regexes)
+- `parse_followups` (the follow-up extraction regexes of `process_dubai_query`)
+- `generate_directions` (location lookup, haversine and response model)
+- construction and JSON serialization of `Location` and `DubaiQueryResponse`
+- encoding a `LocationQueryResponse` from the catalog's pre-encoded fragments
+
+Each case reports the best per-call time of several runs. Times are compared with
+`benchmarks/baselines/hot_paths.json`, after scaling both by a fixed pure-Python
+calibration loop so a baseline recorded on one machine stays usable on another.
+The run fails (exit code 1) when any case is slower than its baseline by more than
+`--threshold`.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_hot_paths                    # compare with the baseline
+    python -m benchmarks.bench_hot_paths --threshold 0.1    # fail on a 10% slowdown
+    python -m benchmarks.bench_hot_paths --save-baseline    # record a new baseline
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+
+from app.apis.dubai_assistant import (
+    DubaiQueryResponse,
+    detect_etiquette_category,
+    is_etiquette_query,
+    parse_etiquette_block,
+    parse_followups,
+)
+from app.apis.dubai_locations import (
+    DUBAI_LOCATIONS,
+    Location,
+    LocationQueryResponse,
+    generate_directions,
+    location_catalog,
+)
+from benchmarks.bench_etiquette_classifier import generate_corpus
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "hot_paths.json"
+
+CATEGORIES = [
+    "dress-code", "greetings", "religious-customs", "dining",
+    "public-behavior", "business", "home-visits", "gender-interactions",
+]
+
+# Answer openings in the response languages; the block labels stay in English as instructed
+ANSWER_TEXTS = [
+    "Visitors are welcome, but modest clothing is expected. Cover your shoulders and knees.",
+    "Los visitantes son bienvenidos, pero se espera ropa modesta. Cubra hombros y rodillas.",
+    "Besucher sind willkommen, aber dezente Kleidung wird erwartet. Bedecken Sie Schultern und Knie.",
+    "Les visiteurs sont les bienvenus, mais une tenue modeste est attendue.",
+    "Посетители приветствуются, но ожидается скромная одежда. Прикройте плечи и колени.",
+    "الزوار مرحب بهم، ولكن يتوقع ارتداء ملابس محتشمة. غطِّ كتفيك وركبتيك.",
+    "欢迎游客参观，但需要穿着得体。请遮盖肩膀和膝盖。",
+    "आगंतुकों का स्वागत है, लेकिन शालीन कपड़े पहनने की अपेक्षा की जाती है।",
+]
+
+TIPS = [
+    "Cover shoulders and knees", "Remove your shoes", "Greet elders first", "Use your right hand",
+    "Ask before taking photos", "Wear a headscarf", "Accept coffee when offered", "Dress conservatively",
+    "Kiss in public", "Wear shorts", "Point your feet at people", "Eat in public during Ramadan",
+]
+
+FOLLOWUP_QUESTIONS = [
+    "How do I get there by metro?", "What are the opening hours?", "Is there a dress code?",
+    "¿Cuánto cuesta la entrada?", "Wann ist die beste Besuchszeit?", "Où manger à proximité ?",
+    "Можно ли там фотографировать?", "هل يوجد موقف سيارات؟", "附近有什么餐厅？", "क्या बच्चों के लिए अच्छा है?",
+]
+
+FOLLOWUP_FORMATS = [
+    lambda i, q: f"{i}. {q}",
+    lambda i, q: f"{i}) {q}",
+    lambda i, q: f"- {q}",
+    lambda i, q: f"* \"{q}\"",
+    lambda i, q: q,
+]
+
+
+class Case(NamedTuple):
+    name: str
+    function: Callable[[Any], Any]
+    inputs: list
+
+
+def generate_etiquette_answers(count: int, rng: random.Random) -> list[tuple[str, str]]:
+    answers = []
+    for _ in range(count):
+        category = rng.choice(CATEGORIES)
+        do_tips = "\n".join(f"- {tip}" for tip in rng.sample(TIPS[:8], rng.randint(2, 4)))
+        dont_tips = "\n".join(f"- {tip}" for tip in rng.sample(TIPS[8:], rng.randint(1, 3)))
+        answer = (
+            " ".join(rng.choice(ANSWER_TEXTS) for _ in range(rng.randint(2, 6)))
+            + f"\n\n[ETIQUETTE_INFO]\nCategory: {category}\nAdvice: {rng.choice(TIPS)}.\n"
+            + (f"Additional: {rng.choice(ANSWER_TEXTS)}\n" if rng.random() < 0.7 else "")
+            + f"Do:\n{do_tips}\nDont:\n{dont_tips}\n[/ETIQUETTE_INFO]"
+        )
+        answers.append((answer, category))
+    return answers
+
+
+def generate_followup_texts(count: int, rng: random.Random) -> list[str]:
+    texts = []
+    for _ in range(count):
+        style = rng.choice(FOLLOWUP_FORMATS)
+        questions = rng.sample(FOLLOWUP_QUESTIONS, rng.randint(2, 4))
+        preamble = "Here are some follow-up questions:\n" if rng.random() < 0.3 else ""
+        texts.append(preamble + "\n".join(style(i + 1, q) for i, q in enumerate(questions)))
+    return texts
+
+
+def generate_responses(count: int, rng: random.Random) -> list[dict]:
+    responses = []
+    for answer, category in generate_etiquette_answers(count, rng):
+        text, _, _ = answer.partition("[ETIQUETTE_INFO]")
+        etiquette = None
+        if rng.random() < 0.5:
+            etiquette = {
+                "category": category,
+                "advice": rng.choice(TIPS),
+                "additional_info": rng.choice(ANSWER_TEXTS),
+                "do_tips": rng.sample(TIPS[:8], 3),
+                "dont_tips": rng.sample(TIPS[8:], 2),
+            }
+        responses.append({
+            "answer": text.strip(),
+            "suggested_followups": rng.sample(FOLLOWUP_QUESTIONS, 3),
+            "etiquette_info": etiquette,
+        })
+    return responses
+
+
+def build_cases(size: int, seed: int) -> list[Case]:
+    rng = random.Random(seed)
+    queries = generate_corpus(size, rng)
+    location_ids = [location["id"] for location in DUBAI_LOCATIONS]
+    location_pairs = [tuple(rng.sample(location_ids, 2)) for _ in range(size)]
+    location_dicts = [rng.choice(DUBAI_LOCATIONS) for _ in range(size)]
+    locations = [Location(**location) for location in location_dicts]
+    response_dicts = generate_responses(size, rng)
+    responses = [DubaiQueryResponse(**response) for response in response_dicts]
+    location_responses = [
+        LocationQueryResponse(
+            locations=location_catalog.by_ids(rng.sample(location_ids, rng.randint(1, 4))),
+            primary_location=origin,
+            directions=generate_directions(origin, destination) if rng.random() < 0.3 else None,
+        )
+        for origin, destination in location_pairs
+    ]
+
+    return [
+        Case("is_etiquette_query", is_etiquette_query, queries),
+        Case("detect_etiquette_category", detect_etiquette_category, queries),
+        Case("parse_etiquette_block", lambda args: parse_etiquette_block(*args), generate_etiquette_answers(size, rng)),
+        Case("parse_followups", parse_followups, generate_followup_texts(size, rng)),
+        Case("generate_directions", lambda pair: generate_directions(*pair), location_pairs),
+        Case("location_construct", lambda location: Location(**location), location_dicts),
+        Case("location_serialize", Location.model_dump_json, locations),
+        Case("query_response_construct", lambda response: DubaiQueryResponse(**response), response_dicts),
+        Case("query_response_serialize", DubaiQueryResponse.model_dump_json, responses),
+        Case("location_response_encode", location_catalog.encode, location_responses),
+    ]
+
+
+def us_per_call(function: Callable[[Any], Any], inputs: list) -> float:
+    started = time.perf_counter()
+    for value in inputs:
+        function(value)
+    return (time.perf_counter() - started) / len(inputs) * 1e6
+
+
+def calibration_workload(_: Any) -> int:
+    """Fixed pure-Python workload whose time is the unit baselines are compared in."""
+    total = 0
+    for i in range(1000):
+        total += i * i % 7
+    return total
+
+
+def run_cases(cases: list[Case], repeat: int) -> tuple[float, dict[str, float]]:
+    """Best per-call time of each case, and of the calibration workload.
+
+    Rounds go through all cases in turn, so a burst of noise from other processes
+    slows one round of every case rather than every round of one case.
+    """
+    calibration = Case("calibration", calibration_workload, [None] * 200)
+    for case in [calibration, *cases]:
+        # Warm-up: caches, lazily built validators, regex compilation
+        us_per_call(case.function, case.inputs[:100])
+
+    best = {case.name: float("inf") for case in [calibration, *cases]}
+    for _ in range(repeat):
+        for case in [calibration, *cases]:
+            best[case.name] = min(best[case.name], us_per_call(case.function, case.inputs))
+    return best.pop("calibration"), {name: round(us, 3) for name, us in best.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5_000, help="Generated inputs per case")
+    parser.add_argument("--repeat", type=int, default=7, help="Best of this many timed runs")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown against the baseline, 0.25 = 25%%")
+    parser.add_argument("--filter", help="Only run cases whose name contains this")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--absolute", action="store_true", help="Compare raw times, without calibration scaling")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    cases = [case for case in build_cases(args.size, args.seed) if not args.filter or args.filter in case.name]
+    calibration, results = run_cases(cases, args.repeat)
+
+    if args.save_baseline:
+        if args.filter and args.baseline.exists():
+            # Merge into the existing baseline, in its calibration units
+            baseline = json.loads(args.baseline.read_text())
+            unit = baseline["calibration_us"] / calibration
+            baseline["cases"].update({name: round(us * unit, 3) for name, us in results.items()})
+        else:
+            baseline = {
+                "cases": results,
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "calibration_us": round(calibration, 3),
+            }
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"cases": {}}
+    scale = 1.0 if args.absolute else baseline.get("calibration_us", calibration) / calibration
+
+    report = {}
+    regressions = []
+    for name, us in results.items():
+        base = baseline["cases"].get(name)
+        # This machine's time in the baseline machine's units
+        comparable = us * scale
+        change = comparable / base - 1 if base else None
+        report[name] = {"us_per_call": us, "baseline_us": base, "change": None if change is None else round(change, 4)}
+        if change is not None and change > args.threshold:
+            regressions.append(name)
+
+    if args.json:
+        print(json.dumps({"calibration_us": round(calibration, 3), "threshold": args.threshold, "cases": report}, indent=2))
+    else:
+        print(f"{'case':28} {'us/call':>10} {'baseline':>10} {'change':>8}")
+        for name, row in report.items():
+            change = "new" if row["change"] is None else f"{row['change'] * 100:+.1f}%"
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"{name:28} {row['us_per_call']:10.3f} {row['baseline_us'] or '-':>10} {change:>8}{flag}")
+
+    if regressions:
+        print(
+            f"\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
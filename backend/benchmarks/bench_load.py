@@ -0,0 +1,325 @@
+"""End-to-end load test of the backend against a local fake OpenAI server.
+
+Starts `benchmarks.fake_openai` and the backend (with authentication disabled) as
+subprocesses, then drives `/dubai-assistant/query`, `/dubai-assistant/stream` and
+`/dubai-locations/query` at each requested concurrency. Each run reports throughput,
+p50/p95/p99 latency and, for streams, time to first token, and is saved as JSON so
+runs can be compared between commits.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_load --concurrency 1,8,32 --requests 200
+    python -m benchmarks.bench_load --compare benchmarks/results/load-abc1234.json
+
+Use `--target` to load an already running backend instead; it then talks to
+whatever LLM that backend is configured with, and `--token` is sent as the bearer
+token.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "query": ("/routes/dubai-assistant/query", False),
+    "stream": ("/routes/dubai-assistant/stream", True),
+    "locations": ("/routes/dubai-locations/query", False),
+}
+
+ASSISTANT_QUERIES = [
+    ("What should I wear to visit Jumeirah Mosque?", "en-US"),
+    ("How do I get from the airport to Dubai Marina?", "en-US"),
+    ("Is it rude to eat in public during Ramadan?", "en-GB"),
+    ("¿Cuál es la mejor hora para visitar el Burj Khalifa?", "es-ES"),
+    ("Wie begrüße ich einen Geschäftspartner in Dubai?", "de-DE"),
+    ("Que faut-il porter au souk de l'or ?", "fr-FR"),
+    ("Как добраться до Palm Jumeirah на метро?", "ru-RU"),
+    ("ما هي آداب زيارة منزل إماراتي؟", "ar-AE"),
+    ("迪拜购物中心几点开门？", "zh-CN"),
+    ("क्या दुबई में सार्वजनिक रूप से तस्वीरें लेना ठीक है?", "hi-IN"),
+]
+
+LOCATION_QUERIES = [
+    "Where is the Burj Khalifa?",
+    "How do I get from Dubai Mall to Palm Jumeirah?",
+    "Show me the beaches near Dubai Marina",
+    "Where can I see the Dubai Frame?",
+    "Directions from Al Fahidi to the Miracle Garden",
+    "Which mall has an aquarium?",
+    "¿Dónde está el zoco del oro?",
+    "Wie komme ich zum Museum of the Future?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def summarize(samples: list[float]) -> dict | None:
+    if not samples:
+        return None
+    return {
+        "mean": round(statistics.mean(samples), 1),
+        "p50": round(percentile(samples, 0.50), 1),
+        "p95": round(percentile(samples, 0.95), 1),
+        "p99": round(percentile(samples, 0.99), 1),
+        "max": round(max(samples), 1),
+    }
+
+
+def serve_app(port: int) -> None:
+    """Run the backend with authentication disabled; started by the harness in a subprocess."""
+    import uvicorn
+
+    import main
+    from databutton_app.mw.auth_mw import User, get_authorized_user
+
+    main.app.dependency_overrides[get_authorized_user] = lambda: User(sub="load-test")
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{process.args} exited with code {process.returncode}")
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def payload_for(scenario: str, i: int, args: argparse.Namespace) -> dict:
+    if scenario == "locations":
+        return {"query": LOCATION_QUERIES[i % len(LOCATION_QUERIES)]}
+    query, language = ASSISTANT_QUERIES[i % len(ASSISTANT_QUERIES)]
+    payload = {"query": query, "language": language}
+    if scenario == "query" and args.mode:
+        payload["mode"] = args.mode
+    return payload
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: str, concurrency: int, args: argparse.Namespace, headers: dict
+) -> dict:
+    path, streaming = SCENARIOS[scenario]
+    latencies: list[float] = []
+    first_tokens: list[float] = []
+    errors: dict[str, int] = {}
+
+    async def send(i: int, record: bool) -> None:
+        started = time.perf_counter()
+        first_token = None
+        try:
+            async with client.stream("POST", path, json=payload_for(scenario, i, args), headers=headers) as response:
+                async for chunk in response.aiter_raw():
+                    if first_token is None and chunk:
+                        first_token = time.perf_counter()
+                if response.status_code >= 400:
+                    raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+        except httpx.HTTPError as e:
+            if record:
+                key = f"HTTP {e.response.status_code}" if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+                errors[key] = errors.get(key, 0) + 1
+            return
+        if record:
+            latencies.append((time.perf_counter() - started) * 1000)
+            if streaming and first_token is not None:
+                first_tokens.append((first_token - started) * 1000)
+
+    await asyncio.gather(*(send(i, record=False) for i in range(min(args.warmup, concurrency))))
+
+    next_request = iter(range(args.requests))
+
+    async def worker() -> None:
+        for i in next_request:
+            await send(i, record=True)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": args.requests,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "latency_ms": summarize(latencies),
+        "ttft_ms": summarize(first_tokens) if streaming else None,
+    }
+
+
+async def run_load(args: argparse.Namespace, base_url: str) -> list[dict]:
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    if not args.cache:
+        # Every request reaches the (fake) LLM instead of replaying a cached answer
+        headers["Cache-Control"] = "no-cache"
+
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_scenario(client, scenario, concurrency, args, headers)
+                results.append(result)
+                print_result(result)
+    return results
+
+
+def print_result(result: dict) -> None:
+    latency, ttft = result["latency_ms"] or {}, result["ttft_ms"] or {}
+    errors = sum(result["errors"].values())
+    print(
+        f"{result['scenario']:10} c={result['concurrency']:<4} {result['throughput_rps']:8.1f} req/s"
+        f"  p50 {latency.get('p50', '-'):>8}  p95 {latency.get('p95', '-'):>8}  p99 {latency.get('p99', '-'):>8} ms"
+        + (f"  ttft p50 {ttft.get('p50')} ms" if ttft else "")
+        + (f"  errors {errors}" if errors else ""),
+        flush=True,
+    )
+
+
+def compare(baseline: dict, current: dict) -> None:
+    """Print the change of throughput and latency percentiles against an earlier run."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (negative latency change is faster)")
+    for result in current["results"]:
+        old = previous.get((result["scenario"], result["concurrency"]))
+        if old is None or not old["latency_ms"] or not result["latency_ms"]:
+            continue
+
+        def change(new_value: float, old_value: float) -> str:
+            return f"{(new_value - old_value) / old_value * 100:+6.1f}%" if old_value else "    n/a"
+
+        print(
+            f"{result['scenario']:10} c={result['concurrency']:<4}"
+            f"  throughput {change(result['throughput_rps'], old['throughput_rps'])}"
+            + "".join(f"  {p} {change(result['latency_ms'][p], old['latency_ms'][p])}" for p in ("p50", "p95", "p99"))
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS), help="Comma-separated: query,stream,locations")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--mode", choices=["structured", "two_call"], help="Completion mode for /query")
+    parser.add_argument("--cache", action="store_true", help="Allow cached answers instead of sending Cache-Control: no-cache")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--upstream-latency", type=float, default=0.3, help="Fake OpenAI latency in seconds")
+    parser.add_argument("--upstream-jitter", type=float, default=0.05)
+    parser.add_argument("--token-interval", type=float, default=0.02, help="Fake OpenAI seconds between streamed chunks")
+    parser.add_argument("--words-per-chunk", type=int, default=1)
+    parser.add_argument("--target", help="Base URL of a running backend; skips starting the fake server and backend")
+    parser.add_argument("--token", help="Bearer token for --target")
+    parser.add_argument("--output", type=Path, help="Results file (default benchmarks/results/load-<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare against")
+    parser.add_argument("--serve-app", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_app:
+        serve_app(args.serve_app)
+        return
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    processes: list[subprocess.Popen] = []
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            upstream_port, app_port = free_port(), free_port()
+            upstream = subprocess.Popen(
+                [
+                    sys.executable, "-m", "benchmarks.fake_openai", "--port", str(upstream_port),
+                    "--latency", str(args.upstream_latency), "--jitter", str(args.upstream_jitter),
+                    "--token-interval", str(args.token_interval), "--words-per-chunk", str(args.words_per_chunk),
+                ],
+                cwd=BACKEND_DIR,
+            )
+            processes.append(upstream)
+            app = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.bench_load", "--serve-app", str(app_port)],
+                cwd=BACKEND_DIR,
+                env={
+                    **os.environ,
+                    "OPENAI_API_KEY": "fake",
+                    "LLM_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+                    "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+                },
+            )
+            processes.append(app)
+            base_url = f"http://127.0.0.1:{app_port}"
+            asyncio.run(wait_until_ready(f"http://127.0.0.1:{upstream_port}/stats", upstream))
+            asyncio.run(wait_until_ready(f"{base_url}/metrics", app))
+
+        results = asyncio.run(run_load(args, base_url))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "config": {
+            "target": args.target,
+            "requests": args.requests,
+            "mode": args.mode,
+            "cache": args.cache,
+            "upstream_latency": None if args.target else args.upstream_latency,
+            "upstream_jitter": None if args.target else args.upstream_jitter,
+            "token_interval": None if args.target else args.token_interval,
+            "words_per_chunk": None if args.target else args.words_per_chunk,
+        },
+        "results": results,
+    }
+
+    output = args.output or BACKEND_DIR / "benchmarks" / "results" / f"load-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Load time and memory of the location catalog at scale: in-module list vs SQLite file.
+
+Generates a synthetic catalog of points of interest around Dubai and loads it
+each way in a fresh interpreter:
+
+- `module`: a Python module holding the records as a list literal, the way
+  `DUBAI_LOCATIONS` is shipped, imported and validated into a `LocationCatalog`.
+  The import is timed once from source and once from the cached bytecode.
+- `store`: a file written by `build_location_db()`, opened as a `LocationStore`
+
+For both, the benchmark reports the load time, and the RSS the catalog adds to the
+worker after imports. RSS is split into anonymous memory, private to each worker,
+and file-backed pages, which are shared by every worker mapping the same file. It
+also times `get()`, `by_ids()` and `in_category()`, rebuilding the local
+resolver (done at startup and after every reload), and a hot reload of the store.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_location_catalog --locations 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CATEGORIES = ["attraction", "shopping", "dining", "beach", "landmark", "culture", "park", "hotel", "museum", "market"]
+
+NAME_WORDS = [
+    "Al", "Burj", "Palm", "Marina", "Souk", "Creek", "Garden", "Tower", "Plaza", "Beach", "Gate", "Oasis",
+    "Pearl", "Desert", "Falcon", "Harbour", "Heritage", "Spice", "Gold", "Crescent", "Dune", "Lagoon",
+]
+
+# Bounding box of the Dubai urban area
+LAT_RANGE = (24.90, 25.35)
+LNG_RANGE = (54.95, 55.55)
+
+
+def generate_locations(count: int, rng: random.Random) -> list[dict]:
+    """Unique location records shaped like `DUBAI_LOCATIONS`, scattered over Dubai."""
+    return [
+        {
+            "id": f"poi-{i:06d}",
+            "name": f"{' '.join(rng.sample(NAME_WORDS, rng.randint(2, 3)))} {i}",
+            "category": rng.choice(CATEGORIES),
+            "location": {"lat": round(rng.uniform(*LAT_RANGE), 6), "lng": round(rng.uniform(*LNG_RANGE), 6)},
+            "description": " ".join(rng.choice(NAME_WORDS).lower() for _ in range(rng.randint(12, 30))),
+            "image_url": f"https://images.example.com/poi-{i:06d}.jpg" if rng.random() < 0.5 else None,
+        }
+        for i in range(count)
+    ]
+
+
+def memory() -> dict[str, float]:
+    """VmRSS, RssAnon and RssFile of this process in MiB (Linux)."""
+    fields = {}
+    with open("/proc/self/status") as status:
+        for line in status:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+
+def memory_delta(before: dict[str, float], after: dict[str, float]) -> dict[str, float]:
+    return {key: round(after[key] - before[key], 1) for key in after}
+
+
+def time_us(function, inputs: list) -> float:
+    started = time.perf_counter()
+    for value in inputs:
+        function(value)
+    return round((time.perf_counter() - started) / len(inputs) * 1e6, 2)
+
+
+def measure(mode: str, workdir: Path, lookups: int, seed: int) -> dict:
+    """Runs in the child interpreter: load the catalog one way and measure it."""
+    from app.apis.dubai_locations import Location, build_location_resolver
+    from app.libs.location_catalog import LocationCatalog
+    from app.libs.location_store import LocationStore
+
+    before = memory()
+    started = time.perf_counter()
+    if mode == "module":
+        sys.path.insert(0, str(workdir))
+        from generated_locations import LOCATIONS
+
+        imported = time.perf_counter()
+        catalog = LocationCatalog(LOCATIONS, Location)
+        result = {"import_s": round(imported - started, 3), "validate_s": round(time.perf_counter() - imported, 3)}
+    else:
+        catalog = LocationStore(workdir / "locations.db", Location, check_interval=0)
+        result = {}
+    result["load_s"] = round(time.perf_counter() - started, 3)
+    result["rss_mib"] = memory_delta(before, memory())
+
+    rng = random.Random(seed)
+    ids = [location_id for location_id, _, _ in catalog.summaries()]
+    result["get_cold_us"] = time_us(catalog.get, rng.sample(ids, lookups))
+    sample = rng.sample(ids, lookups)
+    time_us(catalog.get, sample)
+    result["get_warm_us"] = time_us(catalog.get, sample)
+    result["by_ids_4_us"] = time_us(catalog.by_ids, [rng.sample(ids, 4) for _ in range(lookups)])
+    result["in_category_ms"] = round(time_us(catalog.in_category, catalog.categories) / 1000, 2)
+
+    started = time.perf_counter()
+    build_location_resolver(catalog)
+    result["resolver_build_s"] = round(time.perf_counter() - started, 3)
+    result["rss_after_use_mib"] = memory_delta(before, memory())
+    return result
+
+
+def run_child(mode: str, workdir: Path, lookups: int, seed: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_location_catalog", "--child", mode,
+         "--workdir", str(workdir), "--lookups", str(lookups), "--seed", str(seed)],
+        check=True, capture_output=True, text=True,
+        # Bytecode must be written for the second module import to measure loading from it
+        env={**{k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}, "LOCATIONS_DB": ""},
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--child", choices=["module", "store"], help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.workdir, args.lookups, args.seed)))
+        return
+
+    from app.apis.dubai_locations import Location
+    from app.libs.location_store import LocationStore, build_location_db
+
+    records = generate_locations(args.locations, random.Random(args.seed))
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        module = workdir / "generated_locations.py"
+        module.write_text(f"LOCATIONS = {records!r}\n")
+
+        started = time.perf_counter()
+        build_location_db(records, workdir / "locations.db", Location)
+        build_s = time.perf_counter() - started
+
+        # Source import first (compiles and caches bytecode), then from the cached bytecode
+        results = {
+            "module (source)": run_child("module", workdir, args.lookups, args.seed),
+            "module (bytecode)": run_child("module", workdir, args.lookups, args.seed),
+            "store": run_child("store", workdir, args.lookups, args.seed),
+        }
+
+        store = LocationStore(workdir / "locations.db", Location, check_interval=0)
+        reloads = []
+        for _ in range(3):
+            build_location_db(records, workdir / "locations.db", Location)
+            started = time.perf_counter()
+            store.reload()
+            reloads.append(time.perf_counter() - started)
+        store.stop()
+
+        sizes = {
+            "module_mib": round(module.stat().st_size / 2**20, 1),
+            "store_mib": round((workdir / "locations.db").stat().st_size / 2**20, 1),
+        }
+
+    print(json.dumps({
+        "locations": args.locations,
+        "file_sizes": sizes,
+        "store_build_s": round(build_s, 3),
+        "store_reload_ms": round(statistics.median(reloads) * 1000, 1),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Road routing on a synthetic city: A* with landmarks (ALT) vs plain Dijkstra.
+
+No real OSM extract ships with the repo, so this generates a grid city over
+Dubai's bounding box (see `bench_location_catalog`):
+
+- residential streets one block apart, some of them one-way
+- faster arterial roads every 10th street
+- a motorway along one diagonal corridor of blocks
+- a fraction of the blocks removed at random, so routes have to detour
+
+It writes the city as an OSM XML extract and runs the same pipeline a real
+extract would go through: `read_osm`, `build_road_graph`, `RoadRouter.load`. It
+then times random routes with ALT, with plain Dijkstra (the same search without
+the landmark bound), and through the route cache. The travel times of the two
+searches are checked against each other.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_road_router --grid 200
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.libs.road_router import RoadRouter, build_road_graph, read_osm
+from benchmarks.bench_location_catalog import LAT_RANGE, LNG_RANGE
+from benchmarks.bench_semantic_cache import percentile
+
+
+def write_city(path: Path, grid: int, removed: float, rng: random.Random) -> None:
+    """OSM XML of a `grid` x `grid` street grid over Dubai, with a shape point in every block."""
+    lat_step = (LAT_RANGE[1] - LAT_RANGE[0]) / (grid - 1)
+    lng_step = (LNG_RANGE[1] - LNG_RANGE[0]) / (grid - 1)
+
+    def node_id(i: float, j: float) -> int:
+        # Junctions on whole (i, j), shape points halfway along a block
+        return int(i * 2) * (grid * 2) + int(j * 2) + 1
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<osm version="0.6">']
+    for i2 in range(grid * 2 - 1):
+        for j2 in range(grid * 2 - 1):
+            if i2 % 2 and j2 % 2:
+                continue
+            lat = LAT_RANGE[0] + i2 / 2 * lat_step
+            lng = LNG_RANGE[0] + j2 / 2 * lng_step
+            lines.append(f'<node id="{node_id(i2 / 2, j2 / 2)}" lat="{lat:.7f}" lon="{lng:.7f}"/>')
+
+    way_id = 0
+
+    def way(refs: list[int], tags: dict[str, str]) -> None:
+        nonlocal way_id
+        way_id += 1
+        lines.append(f'<way id="{way_id}">')
+        lines.extend(f'<nd ref="{ref}"/>' for ref in refs)
+        lines.extend(f'<tag k="{k}" v="{v}"/>' for k, v in tags.items())
+        lines.append("</way>")
+
+    for direction, label in (("row", "Street"), ("column", "Avenue")):
+        for a in range(grid):
+            arterial = a % 10 == 0
+            tags = {"highway": "primary" if arterial else "residential", "name": f"{label} {a}"}
+            if not arterial and a % 3 == 0:
+                tags["oneway"] = "yes" if a % 2 else "-1"
+            # One way per block, so removed blocks leave gaps without cutting the whole street
+            for b in range(grid - 1):
+                if not arterial and rng.random() < removed:
+                    continue
+                cells = [(a, b), (a, b + 0.5), (a, b + 1)] if direction == "row" else [(b, a), (b + 0.5, a), (b + 1, a)]
+                way([node_id(i, j) for i, j in cells], tags)
+
+    # A motorway along the diagonal, in both directions, joining the grid at every junction it passes
+    corridor = [node_id(k, k) for k in range(grid)]
+    way(corridor, {"highway": "motorway", "name": "Sheikh Zayed Road", "ref": "E11"})
+    way(corridor[::-1], {"highway": "motorway", "name": "Sheikh Zayed Road", "ref": "E11"})
+
+    lines.append("</osm>")
+    path.write_text("\n".join(lines))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", type=int, default=200, help="Streets in each direction")
+    parser.add_argument("--removed", type=float, default=0.1, help="Share of residential blocks removed")
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dijkstra-queries", type=int, default=20, help="Queries also run without landmarks")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        osm_path, graph_path = Path(tmp) / "city.osm", Path(tmp) / "city.npz"
+        write_city(osm_path, args.grid, args.removed, rng)
+
+        started = time.perf_counter()
+        nodes, ways = read_osm(osm_path)
+        read_s = time.perf_counter() - started
+        started = time.perf_counter()
+        size = build_road_graph(nodes, ways, graph_path, landmarks=args.landmarks)
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        router = RoadRouter.load(graph_path)
+        load_s = time.perf_counter() - started
+
+        trips = [
+            tuple(rng.uniform(*LAT_RANGE) if k % 2 == 0 else rng.uniform(*LNG_RANGE) for k in range(4))
+            for _ in range(args.queries)
+        ]
+        cold_ms, cached_ms = [], []
+        steps = 0
+        for trip in trips:
+            started = time.perf_counter()
+            route = router.route(*trip)
+            cold_ms.append((time.perf_counter() - started) * 1000)
+            steps += len(route.steps) if route else 0
+        for trip in trips:
+            started = time.perf_counter()
+            router.route(*trip)
+            cached_ms.append((time.perf_counter() - started) * 1000)
+
+        alt_ms, dijkstra_ms = [], []
+        mismatches = 0
+        for trip in trips[: args.dijkstra_queries]:
+            source, target = router.nearest_vertex(*trip[:2]), router.nearest_vertex(*trip[2:])
+            started = time.perf_counter()
+            alt = router.shortest_path(source, target)
+            alt_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            dijkstra = router.shortest_path(source, target, use_landmarks=False)
+            dijkstra_ms.append((time.perf_counter() - started) * 1000)
+            if (alt is None) != (dijkstra is None) or (alt and abs(alt[0] - dijkstra[0]) > 1e-6 * dijkstra[0]):
+                mismatches += 1
+
+        stats = router.stats()
+        print(json.dumps({
+            **size,
+            "osm_nodes": len(nodes),
+            "osm_ways": len(ways),
+            "file_kib": round(graph_path.stat().st_size / 1024),
+            "read_osm_s": round(read_s, 2),
+            "build_s": round(build_s, 2),
+            "load_s": round(load_s, 3),
+            "route_ms": {
+                "alt_p50": round(percentile(alt_ms, 0.50), 2),
+                "alt_p99": round(percentile(alt_ms, 0.99), 2),
+                "dijkstra_p50": round(percentile(dijkstra_ms, 0.50), 2),
+                "dijkstra_p99": round(percentile(dijkstra_ms, 0.99), 2),
+                "route_p50": round(percentile(cold_ms, 0.50), 2),
+                "route_p99": round(percentile(cold_ms, 0.99), 2),
+                "cached_p50": round(percentile(cached_ms, 0.50), 4),
+            },
+            "mean_steps": round(steps / len(trips), 1),
+            "unroutable": stats.unroutable,
+            "mismatches_vs_dijkstra": mismatches,
+        }, indent=2))
+        route = router.route(*trips[0])
+        print("Example route:", json.dumps(route._asdict() if route else None, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Hit rate and lookup latency of the semantic cache at scale.
+
+Fills the cache with synthetic English tourist questions (the only language the
+semantic cache serves so far), then looks up paraphrased variants of cached
+questions (which should hit) and questions that were never cached (which should
+miss).
+
+It also checks `REGRESSION_CASES`: questions that are near-duplicates of a cached
+one by wording but ask the opposite (a negation, a contraction, a reversed trip,
+or a language without guard words). They must never be served from the cache, at
+any similarity; the benchmark exits with status 1 when one is.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_semantic_cache --entries 100000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+from app.libs.semantic_cache import HashedNgramEmbedder, SemanticCache
+
+PLACES = [
+    "burj khalifa", "dubai mall", "palm jumeirah", "dubai marina", "dubai frame",
+    "al fahidi", "jbr beach", "dubai museum", "miracle garden", "mall of the emirates",
+    "jumeirah mosque", "gold souk", "spice souk", "kite beach", "la mer", "global village",
+    "dubai creek", "deira", "zabeel park", "museum of the future", "dubai opera",
+    "ski dubai", "city walk", "bluewaters", "ain dubai", "dubai aquarium",
+]
+
+TEMPLATES = [
+    "what time does {place} open",
+    "how much are tickets for {place}",
+    "what should i wear to {place}",
+    "how do i get to {place} by metro",
+    "is {place} good for kids",
+    "best time of day to visit {place}",
+    "where can i eat near {place}",
+    "can i take photos at {place}",
+    "how long should i spend at {place}",
+    "is there parking at {place}",
+]
+
+# Paraphrasing edits applied to cached questions before looking them up
+PARAPHRASES = [
+    lambda q: q.upper() + "?",
+    lambda q: "please tell me " + q,
+    lambda q: q.replace("what time", "when"),
+    lambda q: q + " today",
+    lambda q: "hey, " + q + "!",
+]
+
+
+# (cached question, lookup, language): the lookup must never get the cached answer
+REGRESSION_CASES = [
+    ("taxi from the airport", "taxi to the airport", "en"),
+    ("is alcohol allowed", "is alcohol not allowed", "en"),
+    ("Is alcohol allowed in public?", "Isn't alcohol allowed in public?", "en"),
+    ("Can I eat on the metro?", "Can’t I eat on the metro?", "en"),
+    ("how do i get from the airport to the hotel", "how do i get from the hotel to the airport", "en"),
+    ("Darf man in der Metro essen?", "Darf man in der Metro nicht essen?", "de"),
+    ("¿Se puede beber alcohol en la playa?", "¿No se puede beber alcohol en la playa?", "es"),
+]
+
+
+def generate_queries(count: int) -> list[tuple[str, str]]:
+    """Unique English (query, language) pairs.
+
+    A numeric suffix keeps the queries distinct at any count.
+    """
+    queries = []
+    for i in range(count):
+        template = TEMPLATES[i % len(TEMPLATES)]
+        place = PLACES[(i // len(TEMPLATES)) % len(PLACES)]
+        variant = i // (len(TEMPLATES) * len(PLACES))
+        query = template.format(place=place)
+        if variant:
+            query += f" area {variant}"
+        queries.append((query, "en"))
+    return queries
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cache = SemanticCache(
+        threshold=args.threshold,
+        capacity_per_language=args.entries,
+        embedder=HashedNgramEmbedder(dim=args.dim),
+    )
+
+    queries = generate_queries(args.entries)
+    started = time.perf_counter()
+    for i, (query, language) in enumerate(queries):
+        cache.set(query, language, i)
+    fill_seconds = time.perf_counter() - started
+
+    # Half paraphrases of cached queries, half queries about places never cached
+    lookups = []
+    for _ in range(args.lookups // 2):
+        index = rng.randrange(len(queries))
+        query, language = queries[index]
+        lookups.append((rng.choice(PARAPHRASES)(query), language, index))
+    for i in range(args.lookups - len(lookups)):
+        lookups.append((f"{rng.choice(TEMPLATES).format(place='unknown place')} number {i}", "en", None))
+
+    latencies = []
+    true_hits = wrong_hits = false_hits = 0
+    for query, language, expected in lookups:
+        started = time.perf_counter()
+        value = cache.get(query, language)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if value is None:
+            continue
+        if expected is None:
+            false_hits += 1
+        elif value == expected:
+            true_hits += 1
+        else:
+            wrong_hits += 1
+
+    paraphrases = args.lookups // 2
+    results = {
+        "entries": args.entries,
+        "dim": args.dim,
+        "threshold": args.threshold,
+        "fill_seconds": round(fill_seconds, 3),
+        "index_mb": round(args.entries * args.dim * 4 / 1e6, 1),
+        "paraphrase_hit_rate": round(true_hits / paraphrases, 4),
+        "paraphrase_wrong_hit_rate": round(wrong_hits / paraphrases, 4),
+        "unrelated_false_hit_rate": round(false_hits / (args.lookups - paraphrases), 4),
+        "lookup_ms_mean": round(statistics.mean(latencies), 3),
+        "lookup_ms_p50": round(percentile(latencies, 0.50), 3),
+        "lookup_ms_p95": round(percentile(latencies, 0.95), 3),
+        "lookup_ms_p99": round(percentile(latencies, 0.99), 3),
+    }
+
+    # Threshold 0: only the guard words and the language check can keep these out
+    served = []
+    for cached_query, lookup, language in REGRESSION_CASES:
+        regression_cache = SemanticCache(threshold=0.0, capacity_per_language=10)
+        regression_cache.set(cached_query, language, cached_query)
+        if regression_cache.get(lookup, language) is not None:
+            served.append(f"{lookup!r} got the answer to {cached_query!r}")
+    results["regression_cases_served"] = len(served)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, value in results.items():
+            print(f"{name:28} {value}")
+    if served:
+        print("\n".join(["Regressions:", *served]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
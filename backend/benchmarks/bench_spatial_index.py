@@ -0,0 +1,112 @@
+"""Latency of "near me" lookups in the spatial index at scale, against a linear scan.
+
+Indexes synthetic points of interest scattered over Dubai (see
+`bench_location_catalog.generate_locations`) and times k-nearest and radius
+queries, with and without a category filter, from random user positions in and
+around the city. Every result is checked against a brute-force haversine scan of
+all points, which is also timed as the baseline.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_spatial_index --locations 100000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.libs.spatial_index import SpatialIndex, haversine_km
+from benchmarks.bench_location_catalog import CATEGORIES, LAT_RANGE, LNG_RANGE, generate_locations
+from benchmarks.bench_semantic_cache import percentile
+
+
+def brute_force(points: list[tuple[str, str, float, float]], lat: float, lng: float, category: str | None) -> list[tuple[float, str]]:
+    return sorted(
+        (haversine_km(lat, lng, plat, plng), location_id)
+        for location_id, point_category, plat, plng in points
+        if category is None or point_category == category
+    )
+
+
+def ids(hits) -> list[str]:
+    return [location_id for _, location_id in hits]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--brute-force-queries", type=int, default=20, help="Queries checked against the linear scan")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = [
+        (record["id"], record["category"], record["location"]["lat"], record["location"]["lng"])
+        for record in generate_locations(args.locations, rng)
+    ]
+
+    started = time.perf_counter()
+    index = SpatialIndex(points)
+    build_s = time.perf_counter() - started
+
+    # Users mostly in the city, some on its outskirts
+    margin = 0.05
+    positions = [
+        (rng.uniform(LAT_RANGE[0] - margin, LAT_RANGE[1] + margin), rng.uniform(LNG_RANGE[0] - margin, LNG_RANGE[1] + margin))
+        for _ in range(args.queries)
+    ]
+
+    scenarios = {
+        "nearest k=1": lambda lat, lng, category: index.nearest(lat, lng, 1),
+        "nearest k=5": lambda lat, lng, category: index.nearest(lat, lng, 5),
+        "nearest k=20": lambda lat, lng, category: index.nearest(lat, lng, 20),
+        "nearest k=5 in category": lambda lat, lng, category: index.nearest(lat, lng, 5, category=category),
+        "within 1 km": lambda lat, lng, category: index.within(lat, lng, 1.0),
+        "within 1 km in category": lambda lat, lng, category: index.within(lat, lng, 1.0, category=category),
+        "within 3 km, first 10": lambda lat, lng, category: index.within(lat, lng, 3.0, limit=10),
+    }
+    categories = [rng.choice(CATEGORIES) for _ in positions]
+
+    results = {}
+    for name, query in scenarios.items():
+        samples = []
+        hits = 0
+        for (lat, lng), category in zip(positions, categories):
+            started = time.perf_counter()
+            found = query(lat, lng, category)
+            samples.append((time.perf_counter() - started) * 1000)
+            hits += len(found)
+        results[name] = {
+            "p50_ms": round(percentile(samples, 0.50), 4),
+            "p99_ms": round(percentile(samples, 0.99), 4),
+            "mean_results": round(hits / len(positions), 1),
+        }
+
+    # The linear scan every query would need without the index; also the reference answer
+    scan_ms = []
+    mismatches = 0
+    for (lat, lng), category in list(zip(positions, categories))[: args.brute_force_queries]:
+        for scenario_category in (None, category):
+            started = time.perf_counter()
+            expected = brute_force(points, lat, lng, scenario_category)
+            scan_ms.append((time.perf_counter() - started) * 1000)
+            # Compared by id: the index computes the same distances from precomputed radians
+            if ids(index.nearest(lat, lng, 5, category=scenario_category)) != ids(expected[:5]):
+                mismatches += 1
+            if ids(index.within(lat, lng, 1.0, category=scenario_category)) != ids(hit for hit in expected if hit[0] <= 1.0):
+                mismatches += 1
+
+    print(json.dumps({
+        "locations": args.locations,
+        "cell_degrees": round(index.cell_degrees, 5),
+        "build_s": round(build_s, 3),
+        "queries": results,
+        "linear_scan_p50_ms": round(percentile(scan_ms, 0.50), 2),
+        "mismatches_vs_linear_scan": mismatches,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
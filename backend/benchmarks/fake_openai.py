@@ -0,0 +1,189 @@
+"""Local stand-in for the OpenAI chat-completions API, for load tests.
+
+Answers `POST /v1/chat/completions` the way the backend's call sites expect,
+without network access or API credits:
+
+- `response_format` json_schema: a structured answer (`/query` structured mode)
+- `response_format` json_object: a location parse (`/dubai-locations/query`)
+- follow-up prompts: a numbered list of questions
+- everything else: a spoken answer, with an [ETIQUETTE_INFO] block for etiquette prompts
+
+Latency and streaming cadence are configurable, so the backend's own overhead can
+be measured against a known upstream. Streams honour `stream_options.include_usage`,
+and the server counts streams closed early by the client.
+
+Run from the backend directory:
+
+    python -m benchmarks.fake_openai --port 9911 --latency 0.3 --token-interval 0.02
+
+and point the backend at it with `LLM_BASE_URL=http://127.0.0.1:9911/v1`.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+ANSWER = (
+    "Dubai is easy to explore on the metro, which runs from early morning until around midnight. "
+    "Buy a Nol card at any station and top it up as you go. The Red Line connects the airport, "
+    "Downtown and the Marina, so most sights are a short walk from a station. Taxis are metered "
+    "and plentiful, and ride-hailing apps work well too."
+)
+
+ETIQUETTE_ANSWER = (
+    "Visitors are welcome at Jumeirah Mosque, but modest clothing is expected. Cover your shoulders "
+    "and knees, and women should bring a scarf for their hair. Remove your shoes before entering "
+    "the prayer hall.\n"
+    "[ETIQUETTE_INFO]\n"
+    "Category: dress-code\n"
+    "Advice: Dress modestly, covering shoulders and knees.\n"
+    "Additional: Traditional clothing can be borrowed at the entrance.\n"
+    "Do:\n- Cover shoulders and knees\n- Remove shoes\n"
+    "Dont:\n- Wear shorts\n- Wear sleeveless tops\n"
+    "[/ETIQUETTE_INFO]"
+)
+
+FOLLOWUPS = "1. How do I get there by metro?\n2. What are the opening hours?\n3. Is there a dress code?"
+
+STRUCTURED = {
+    "answer": ANSWER,
+    "etiquette": {
+        "advice": "Dress modestly, covering shoulders and knees.",
+        "additional_info": "Traditional clothing can be borrowed at the entrance.",
+        "do_tips": ["Cover shoulders and knees", "Remove shoes"],
+        "dont_tips": ["Wear shorts", "Wear sleeveless tops"],
+    },
+    "suggested_followups": ["How do I get there by metro?", "What are the opening hours?", "Is there a dress code?"],
+}
+
+LOCATION_PARSE = {
+    "location_ids": ["burj-khalifa", "dubai-mall"],
+    "primary_location_id": "dubai-mall",
+    "is_directions_request": True,
+    "origin_id": "burj-khalifa",
+    "destination_id": "dubai-mall",
+}
+
+
+class FakeOpenAIConfig(BaseModel):
+    # Seconds before the response (or the first chunk) is sent, plus up to `jitter` more
+    latency: float = 0.3
+    jitter: float = 0.05
+    # Seconds between streamed chunks, and words per chunk
+    token_interval: float = 0.02
+    words_per_chunk: int = 1
+    prompt_tokens: int = 450
+
+
+class FakeOpenAIStats(BaseModel):
+    requests: int = 0
+    streams: int = 0
+    streams_closed_early: int = 0
+
+
+def completion_content(body: dict) -> str:
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return json.dumps(STRUCTURED)
+    if response_format.get("type") == "json_object":
+        return json.dumps(LOCATION_PARSE)
+
+    system_prompt = next((m["content"] for m in body.get("messages", []) if m.get("role") == "system"), "")
+    if "follow-up questions" in system_prompt:
+        return FOLLOWUPS
+    if "[ETIQUETTE_INFO]" in system_prompt:
+        return ETIQUETTE_ANSWER
+    return ANSWER
+
+
+def split_chunks(content: str, words_per_chunk: int) -> list[str]:
+    words = content.split(" ")
+    return [
+        " ".join(words[i : i + words_per_chunk]) + (" " if i + words_per_chunk < len(words) else "")
+        for i in range(0, len(words), words_per_chunk)
+    ]
+
+
+def create_app(config: FakeOpenAIConfig) -> FastAPI:
+    app = FastAPI()
+    stats = FakeOpenAIStats()
+
+    def envelope(**fields) -> dict:
+        return {"id": "chatcmpl-fake", "created": int(time.time()), "model": "gpt-4o-mini", **fields}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats.requests += 1
+        content = completion_content(body)
+        chunks = split_chunks(content, max(1, config.words_per_chunk))
+        usage = {
+            "prompt_tokens": config.prompt_tokens,
+            "completion_tokens": len(chunks),
+            "total_tokens": config.prompt_tokens + len(chunks),
+        }
+        await asyncio.sleep(config.latency + random.uniform(0, config.jitter))
+
+        if not body.get("stream"):
+            return JSONResponse(envelope(
+                object="chat.completion",
+                choices=[{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                usage=usage,
+            ))
+
+        stats.streams += 1
+
+        async def stream():
+            try:
+                for i, chunk in enumerate(chunks):
+                    if i:
+                        await asyncio.sleep(config.token_interval)
+                    delta = envelope(
+                        object="chat.completion.chunk",
+                        choices=[{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+                    )
+                    yield f"data: {json.dumps(delta)}\n\n"
+            except (asyncio.CancelledError, GeneratorExit):
+                stats.streams_closed_early += 1
+                raise
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps(envelope(object='chat.completion.chunk', choices=[], usage=usage))}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/stats", response_model=FakeOpenAIStats)
+    def get_stats() -> FakeOpenAIStats:
+        return stats
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9911)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before the response or first chunk")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Up to this many extra seconds of latency")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="Seconds between streamed chunks")
+    parser.add_argument("--words-per-chunk", type=int, default=1)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        token_interval=args.token_interval,
+        words_per_chunk=args.words_per_chunk,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Prometheus-style metrics with per-thread aggregation.
+
+Every metric keeps one shard per recording thread, and a thread only ever writes
+to its own shard, so recording takes no lock and never contends: a dict lookup
+and an in-place add. `render()` merges the shards when /metrics is scraped and
+writes the Prometheus text exposition format.
+
+Usage:
+
+    from databutton_app.metrics import REGISTRY
+
+    LLM_LATENCY = REGISTRY.histogram("llm_request_duration_seconds", "LLM call latency", ["call"])
+    LLM_LATENCY.observe(0.42, ("answer",))
+
+Values computed elsewhere (cache sizes, hit ratios) are exported through
+`REGISTRY.register_collector()`, which is only called at scrape time.
+"""
+
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable
+
+# Seconds; covers fast cache hits up to slow LLM completions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# A gauge sample produced by a collector: (name, help, labels, value)
+CollectedSample = tuple[str, str, dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._shards: dict[int, dict[tuple, object]] = {}
+
+    def _shard(self) -> dict[tuple, object]:
+        shard = self._shards.get(threading.get_ident())
+        if shard is None:
+            # setdefault is atomic, and only this thread ever uses this key
+            shard = self._shards.setdefault(threading.get_ident(), {})
+        return shard
+
+    def _snapshot(self) -> list[dict[tuple, object]]:
+        return [dict(shard) for shard in list(self._shards.values())]
+
+    def _labels(self, values: tuple) -> dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    @abstractmethod
+    def render(self) -> list[str]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, labels: tuple = ()) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> dict[tuple, float]:
+        totals: dict[tuple, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self._labels(labels))} {_format_value(value)}" for labels, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    """Up/down gauge, e.g. requests in flight; shards hold deltas that sum to the value."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, labels: tuple = ()) -> None:
+        self.inc(-amount, labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        shard = self._shard()
+        # One slot per bucket, one for +Inf, and the running sum last
+        slots = shard.get(labels)
+        if slots is None:
+            slots = shard[labels] = [0] * (len(self.buckets) + 2)
+        slots[bisect.bisect_left(self.buckets, value)] += 1
+        slots[-1] += value
+
+    def time(self, labels: tuple = ()) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        merged: dict[tuple, list[float]] = {}
+        for shard in self._snapshot():
+            for labels, slots in shard.items():
+                totals = merged.setdefault(labels, [0] * len(slots))
+                for i, value in enumerate(list(slots)):
+                    totals[i] += value
+
+        lines = []
+        for labels, slots in sorted(merged.items()):
+            label_dict = self._labels(labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), slots):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**label_dict, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(label_dict)} {_format_value(slots[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(label_dict)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: dict[str, Callable[[], Iterable[CollectedSample]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Modules can be imported twice (e.g. by a reloader); keep the first instance
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[CollectedSample]]) -> None:
+        """Add a callable returning gauge samples, evaluated on every scrape.
+
+        A collector registered again under the same name replaces the earlier one, so an app
+        created twice (e.g. in tests) or a reloaded resource does not export duplicate samples.
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        collected: dict[str, tuple[str, list[str]]] = {}
+        for collector in list(self._collectors.values()):
+            for name, help, labels, value in collector():
+                collected.setdefault(name, (help, []))[1].append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, (help, samples) in collected.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to complete a request, streamed bodies included", ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests and WebSocket sessions being served", ["type"])
+JWT_VERIFICATION_DURATION = REGISTRY.histogram(
+    "jwt_verification_duration_seconds", "Signing-key lookup and RS256 verification of a token",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+ERRORS = REGISTRY.counter("errors_total", "Handled and unhandled errors by where they happened and exception type", ["where", "type"])
+
+
+def record_error(where: str, exc: BaseException) -> None:
+    ERRORS.inc(labels=(where, type(exc).__name__))
+
+
+def stats_samples(prefix: str, stats, labels: dict[str, str] | None = None) -> Iterable[CollectedSample]:
+    """Gauge samples for the numeric fields of a stats model, e.g. `CacheStats` as `response_cache_hits`."""
+    for field, value in stats:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}_{field}", f"{prefix.replace('_', ' ')}: {field.replace('_', ' ')}", labels or {}, value
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, in-flight requests and unhandled errors."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(labels=(scope["type"],))
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            record_error("http", e)
+            raise
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(labels=(scope["type"],))
+            if scope["type"] == "http":
+                HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, (scope["method"], route_label(scope), status))
+
+
+def route_label(scope) -> str:
+    """The matched route template ("/followups/{handle}"), which keeps label cardinality bounded.
+
+    The router adds the matched route (or at least its endpoint) to the scope.
+    """
+    route = scope.get("route")
+    if getattr(route, "path", None):
+        return route.path
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", None) or "unmatched"
@@ -1,6 +1,10 @@
-import functools
+import collections
+import hashlib
+import os
+import threading
+import time
 from http import HTTPStatus
-from typing import Annotated, Callable
+from typing import Annotated, Any, Callable
 import jwt
 from fastapi import Depends, HTTPException, WebSocket, WebSocketException, status
 from fastapi.requests import HTTPConnection
@@ -8,6 +12,11 @@ from jwt import PyJWKClient
 from pydantic import BaseModel
 from starlette.requests import Request
 
+from databutton_app.metrics import JWT_VERIFICATION_DURATION, record_error
+from databutton_app.structured_log import get_logger
+
+log = get_logger(__name__)
+
 
 class AuthConfig(BaseModel):
     jwks_url: str
@@ -61,9 +70,9 @@ def get_authorized_user(
 
         if user is not None:
             return user
-        print("Request authentication returned no user")
+        log.info("request_authentication_no_user", sample_rate=0.1)
     except Exception as e:
-        print(f"Request authentication failed: {e}")
+        log.warning("request_authentication_failed", error=str(e))
 
     if isinstance(request, WebSocket):
         raise WebSocketException(
@@ -75,15 +84,174 @@ def get_authorized_user(
         )
 
 
-@functools.cache
-def get_jwks_client(url: str):
-    """Reuse client cached by its url, client caches keys by default."""
-    return PyJWKClient(url, cache_keys=True)
+class AuthStats(BaseModel):
+    token_cache_size: int
+    token_cache_hits: int
+    token_cache_misses: int
+    token_cache_hit_ratio: float
+    verifications: int
+    verification_ms_avg: float
+    verification_ms_max: float
+    jwks_keys: int
+    jwks_refreshes: int
+    jwks_refresh_failures: int
+    jwks_unknown_key_ids: int
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token payloads, keyed by token hash and expiring at `exp`.
+
+    Only a SHA-256 of the token is kept, so the cache never holds usable credentials.
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._entries: collections.OrderedDict[tuple[str, str], dict[str, Any]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str, audience: str) -> tuple[str, str]:
+        return (hashlib.sha256(token.encode()).hexdigest(), audience)
+
+    def get(self, token: str, audience: str) -> dict[str, Any] | None:
+        key = self._key(token, audience)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None and payload["exp"] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            if payload is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, token: str, audience: str, payload: dict[str, Any]) -> None:
+        # Tokens without a numeric expiry are verified every time
+        if self.max_size <= 0 or not isinstance(payload.get("exp"), (int, float)):
+            return
+        key = self._key(token, audience)
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class JWKSKeyStore:
+    """Signing keys of a JWKS url, refreshed by a background thread.
+
+    Key lookups are dictionary reads; only the very first lookup of a process waits
+    for the initial fetch. An unknown key id (keys rotated since the last refresh)
+    wakes the refresher instead of fetching inline, and the token is rejected until
+    the new key set has been loaded.
+    """
+
+    def __init__(self, url: str, refresh_interval: float = 3600.0, min_refresh_interval: float = 30.0):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._client = PyJWKClient(url, cache_jwk_set=False)
+        self._keys: dict[str, Any] = {}
+        self._loaded = threading.Event()
+        self._wake = threading.Event()
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.unknown_key_ids = 0
+        self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+        self._thread.start()
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            try:
+                jwk_set = self._client.get_jwk_set(refresh=True)
+            except Exception as e:
+                self.refresh_failures += 1
+                log.warning("jwks_refresh_failed", url=self.url, error=str(e))
+                return
+            self._keys = {jwk.key_id: jwk for jwk in jwk_set.keys if jwk.key_id}
+            self.refreshes += 1
+            self._loaded.set()
+
+    def _run(self) -> None:
+        while True:
+            self.refresh()
+            # Retry failed initial loads quickly, otherwise wait for the interval or a wake-up
+            self._wake.wait(self.refresh_interval if self._loaded.is_set() else self.min_refresh_interval)
+            self._wake.clear()
+            time.sleep(max(0.0, self._last_refresh + self.min_refresh_interval - time.monotonic()))
+
+    def get_signing_key(self, kid: str):
+        if not self._loaded.is_set():
+            self._loaded.wait(timeout=10)
+        signing_key = self._keys.get(kid)
+        if signing_key is None:
+            self.unknown_key_ids += 1
+            self._wake.set()
+            raise ValueError(f"Unknown signing key id: {kid}")
+        return signing_key
+
+
+_key_stores: dict[str, JWKSKeyStore] = {}
+_key_stores_lock = threading.Lock()
+
+
+def get_jwks_key_store(url: str) -> JWKSKeyStore:
+    """One key store per url, refreshing in the background from first use."""
+    with _key_stores_lock:
+        if url not in _key_stores:
+            _key_stores[url] = JWKSKeyStore(
+                url, refresh_interval=float(os.environ.get("JWKS_REFRESH_INTERVAL", "3600"))
+            )
+        return _key_stores[url]
+
+
+verified_tokens = VerifiedTokenCache(max_size=int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "10000")))
+
+_verification_lock = threading.Lock()
+_verifications = 0
+_verification_seconds_total = 0.0
+_verification_seconds_max = 0.0
+
+
+def _record_verification(seconds: float) -> None:
+    global _verifications, _verification_seconds_total, _verification_seconds_max
+    JWT_VERIFICATION_DURATION.observe(seconds)
+    with _verification_lock:
+        _verifications += 1
+        _verification_seconds_total += seconds
+        _verification_seconds_max = max(_verification_seconds_max, seconds)
+
+
+def get_auth_stats() -> AuthStats:
+    key_stores = list(_key_stores.values())
+    lookups = verified_tokens.hits + verified_tokens.misses
+    return AuthStats(
+        token_cache_size=len(verified_tokens),
+        token_cache_hits=verified_tokens.hits,
+        token_cache_misses=verified_tokens.misses,
+        token_cache_hit_ratio=round(verified_tokens.hits / lookups, 4) if lookups else 0.0,
+        verifications=_verifications,
+        verification_ms_avg=round(_verification_seconds_total / _verifications * 1000, 3) if _verifications else 0.0,
+        verification_ms_max=round(_verification_seconds_max * 1000, 3),
+        jwks_keys=sum(len(store._keys) for store in key_stores),
+        jwks_refreshes=sum(store.refreshes for store in key_stores),
+        jwks_refresh_failures=sum(store.refresh_failures for store in key_stores),
+        jwks_unknown_key_ids=sum(store.unknown_key_ids for store in key_stores),
+    )
 
 
 def get_signing_key(url: str, token: str) -> tuple[str, str]:
-    client = get_jwks_client(url)
-    signing_key = client.get_signing_key_from_jwt(token)
+    kid = jwt.get_unverified_header(token).get("kid")
+    signing_key = get_jwks_key_store(url).get_signing_key(kid)
     key = signing_key.key
     alg = signing_key.algorithm_name
     if alg != "RS256":
@@ -111,7 +279,7 @@ def authorize_websocket(
             break
 
     if not token:
-        print(f"Missing bearer {prefix}.<token> in protocols")
+        log.info("missing_websocket_bearer_protocol", sample_rate=0.1, prefix=prefix)
         return None
 
     return authorize_token(token, auth_config)
@@ -123,12 +291,12 @@ def authorize_request(
 ) -> User | None:
     auth_header = request.headers.get(auth_config.header)
     if not auth_header:
-        print(f"Missing header '{auth_config.header}'")
+        log.info("missing_auth_header", sample_rate=0.1, header=auth_config.header)
         return None
 
     token = auth_header.startswith("Bearer ") and auth_header[7:]
     if not token:
-        print(f"Missing bearer token in '{auth_config.header}'")
+        log.info("missing_bearer_token", sample_rate=0.1, header=auth_config.header)
         return None
 
     return authorize_token(token, auth_config)
@@ -143,10 +311,17 @@ def authorize_token(
 
     payload = None
     for audience, jwks_url in jwks_urls:
+        # Already verified and not yet expired
+        payload = verified_tokens.get(token, audience)
+        if payload is not None:
+            break
+
+        started = time.perf_counter()
         try:
             key, alg = get_signing_key(jwks_url, token)
         except Exception as e:
-            print(f"Failed to get signing key {e}")
+            record_error("auth.signing_key", e)
+            log.warning("signing_key_lookup_failed", error=str(e))
             continue
 
         try:
@@ -157,13 +332,18 @@ def authorize_token(
                 audience=audience,
             )
         except jwt.PyJWTError as e:
-            print(f"Failed to decode and validate token {e}")
+            record_error("auth.token", e)
+            log.info("token_validation_failed", error=str(e))
             continue
+        finally:
+            _record_verification(time.perf_counter() - started)
+
+        verified_tokens.set(token, audience, payload)
 
     try:
         user = User.model_validate(payload)
-        print(f"User {user.sub} authenticated")
+        log.info("user_authenticated", sample_rate=0.01, sub=user.sub)
         return user
     except Exception as e:
-        print(f"Failed to parse token payload {e}")
+        log.info("token_payload_invalid", error=str(e))
         return None
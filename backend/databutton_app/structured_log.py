@@ -0,0 +1,161 @@
+"""Structured logging that keeps formatting and I/O off the request path.
+
+Call sites log an event name plus fields. Disabled levels and sampled-out events
+return before a record is created. Enabled records are put on a bounded queue, and
+a single listener thread formats them as JSON lines and writes them to stdout. A full
+queue drops records (counted in `dropped_records()`) rather than blocking a request.
+
+Configuration, from the environment or `configure_logging()` arguments:
+
+    LOG_LEVEL=INFO                                   # level of app loggers
+    LOG_LEVELS=databutton_app.mw.auth_mw=WARNING     # per-logger overrides
+    LOG_SAMPLE_RATES=databutton_app.mw.auth_mw.user_authenticated=0.01
+                                                     # per-event sample rates
+
+Usage:
+
+    from databutton_app.structured_log import get_logger
+
+    log = get_logger(__name__)
+    log.info("user_authenticated", sample_rate=0.01, sub=user.sub)
+    log.warning("location_query_failed", error=str(e))
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from typing import Any
+
+# Loggers of this app; third-party loggers stay at WARNING
+APP_LOGGER_NAMES = ("app", "databutton_app", "main", "__main__")
+
+_sample_rates: dict[str, float] = {}
+_listener: logging.handlers.QueueListener | None = None
+_handler: "_DroppingQueueHandler | None" = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event and the event's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        sample_rate = getattr(record, "sample_rate", 1.0)
+        if sample_rate < 1.0:
+            entry["sample_rate"] = sample_rate
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in the same process, so the record is passed as-is and
+        # formatted there instead of on the calling thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_mapping(value: str) -> dict[str, str]:
+    pairs = (item.split("=", 1) for item in value.split(",") if "=" in item)
+    return {key.strip(): val.strip() for key, val in pairs}
+
+
+def configure_logging(
+    level: str | None = None,
+    levels: dict[str, str] | None = None,
+    sample_rates: dict[str, float] | None = None,
+    queue_size: int = 10_000,
+) -> None:
+    """Install the queue-backed JSON handler; safe to call more than once."""
+    global _listener, _handler
+
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    levels = {**_parse_mapping(os.environ.get("LOG_LEVELS", "")), **(levels or {})}
+    _sample_rates.clear()
+    _sample_rates.update({key: float(val) for key, val in _parse_mapping(os.environ.get("LOG_SAMPLE_RATES", "")).items()})
+    _sample_rates.update(sample_rates or {})
+
+    root = logging.getLogger()
+    if _handler is None:
+        _handler = _DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        _listener = logging.handlers.QueueListener(_handler.queue, stream_handler, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        root.addHandler(_handler)
+    root.setLevel(logging.WARNING)
+
+    for name in APP_LOGGER_NAMES:
+        logging.getLogger(name).setLevel(level)
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level.upper())
+
+
+def shutdown_logging() -> None:
+    """Flush queued records; registered to run at exit."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+class StructuredLogger:
+    """Event-style wrapper around a stdlib logger with level checks and sampling up front."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._logger = logging.getLogger(name)
+
+    def log(self, level: int, event: str, sample_rate: float = 1.0, exc_info: Any = None, **fields: Any) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        # Configured rates override the call site's default
+        sample_rate = _sample_rates.get(f"{self.name}.{event}", sample_rate)
+        if sample_rate < 1.0 and random.random() >= sample_rate:
+            return
+        self._logger.log(
+            level, event, exc_info=exc_info, stacklevel=3,
+            extra={"fields": fields, "sample_rate": sample_rate},
+        )
+
+    def debug(self, event: str, **kwargs: Any) -> None:
+        self.log(logging.DEBUG, event, **kwargs)
+
+    def info(self, event: str, **kwargs: Any) -> None:
+        self.log(logging.INFO, event, **kwargs)
+
+    def warning(self, event: str, **kwargs: Any) -> None:
+        self.log(logging.WARNING, event, **kwargs)
+
+    def error(self, event: str, **kwargs: Any) -> None:
+        self.log(logging.ERROR, event, **kwargs)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
@@ -1,12 +1,24 @@
 import os
 import pathlib
 import json
+import contextlib
+import secrets
 import dotenv
-from fastapi import FastAPI, APIRouter, Depends
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 
 dotenv.load_dotenv()
 
-from databutton_app.mw.auth_mw import AuthConfig, get_authorized_user
+from databutton_app.structured_log import configure_logging, dropped_records, get_logger
+
+configure_logging()
+log = get_logger(__name__)
+
+from databutton_app.mw.auth_mw import AuthConfig, AuthStats, get_auth_stats, get_authorized_user, get_jwks_key_store
+from app.libs.llm_gateway import LLMGateway, LLMGatewayConfig
+from app.libs.loop_monitor import InFlightRequestsMiddleware, LoopLagMonitor
+from app.libs.secrets_provider import SecretsProvider, SecretsStats
+from databutton_app.metrics import REGISTRY, MetricsMiddleware, stats_samples
 
 
 def get_router_config() -> dict:
@@ -41,7 +53,7 @@ def import_api_routers() -> APIRouter:
     api_module_prefix = "app.apis."
 
     for name in api_names:
-        print(f"Importing API: {name}")
+        log.info("importing_api", name=name)
         try:
             api_module = __import__(api_module_prefix + name, fromlist=[name])
             api_router = getattr(api_module, "router", None)
@@ -55,10 +67,10 @@ def import_api_routers() -> APIRouter:
                     ),
                 )
         except Exception as e:
-            print(e)
+            log.error("api_import_failed", name=name, error=str(e))
             continue
 
-    print(routes.routes)
+    log.debug("api_routes", routes=[str(route) for route in routes.routes])
 
     return routes
 
@@ -74,23 +86,48 @@ def get_firebase_config() -> dict | None:
     return None
 
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Loads the secrets before the first request, so no request waits for the secret store
+    app.state.secrets.start()
+    app.state.loop_monitor.start()
+    yield
+    app.state.loop_monitor.stop()
+    app.state.secrets.stop()
+    await app.state.llm_gateway.aclose()
+
+
 def create_app() -> FastAPI:
     """Create the app. This is called by uvicorn with the factory option to construct the app object."""
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
+    app.state.secrets = secrets_provider = SecretsProvider(ttl=float(os.environ.get("SECRETS_TTL", "300")))
+    app.state.llm_gateway = LLMGateway(
+        LLMGatewayConfig.from_env(),
+        api_key_provider=lambda: secrets_provider.get("OPENAI_API_KEY"),
+        on_authentication_error=lambda: secrets_provider.invalidate("OPENAI_API_KEY"),
+    )
+
+    # Logs any handler that blocks the event loop for longer than the threshold (0 disables)
+    app.state.loop_monitor = LoopLagMonitor(
+        threshold=float(os.environ.get("LOOP_LAG_THRESHOLD", "0.1")),
+        interval=float(os.environ.get("LOOP_LAG_INTERVAL", "0.5")),
+    )
+    app.add_middleware(InFlightRequestsMiddleware, monitor=app.state.loop_monitor)
+    app.add_middleware(MetricsMiddleware)
     app.include_router(import_api_routers())
 
     for route in app.routes:
         if hasattr(route, "methods"):
             for method in route.methods:
-                print(f"{method} {route.path}")
+                log.debug("route", method=method, path=route.path)
 
     firebase_config = get_firebase_config()
 
     if firebase_config is None:
-        print("No firebase config found")
+        log.info("firebase_config", found=False)
         app.state.auth_config = None
     else:
-        print("Firebase config found")
+        log.info("firebase_config", found=True)
         auth_config = {
             "jwks_url": "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com",
             "audience": firebase_config["projectId"],
@@ -99,6 +136,47 @@ def create_app() -> FastAPI:
 
         app.state.auth_config = AuthConfig(**auth_config)
 
+        # Load signing keys now, so the first request does not wait for the JWKS fetch
+        get_jwks_key_store(app.state.auth_config.jwks_url)
+
+    # Operator endpoints: scraped by Prometheus or called by deploy tooling, neither of which has a
+    # Firebase token, and not for app users. They take "Authorization: Bearer <METRICS_TOKEN>"; they
+    # name request paths, errors and cache internals, so without a token configured they do not exist
+    metrics_token = os.environ.get("METRICS_TOKEN")
+
+    def require_ops_token(authorization: str | None = Header(None)) -> None:
+        if not metrics_token:
+            raise HTTPException(status_code=404, detail="Not Found")
+        if not secrets.compare_digest(authorization or "", f"Bearer {metrics_token}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+    @app.get("/routes/auth/stats", response_model=AuthStats, dependencies=[Depends(require_ops_token)])
+    def auth_stats() -> AuthStats:
+        """Verified-token cache hit ratio, token verification time and JWKS refreshes."""
+        return get_auth_stats()
+
+    @app.get("/routes/secrets/stats", response_model=SecretsStats, dependencies=[Depends(require_ops_token)])
+    def secrets_stats() -> SecretsStats:
+        """Number and age of the cached secrets, and background refreshes."""
+        return secrets_provider.stats()
+
+    @app.post("/routes/secrets/invalidate", status_code=202, dependencies=[Depends(require_ops_token)])
+    def invalidate_secrets() -> None:
+        """Reload the secrets in the background, e.g. right after rotating an API key."""
+        secrets_provider.invalidate()
+
+    REGISTRY.register_collector("app", lambda: [
+        *stats_samples("event_loop", app.state.loop_monitor.stats()),
+        *stats_samples("auth", get_auth_stats()),
+        *stats_samples("secrets", secrets_provider.stats()),
+        *stats_samples("llm_streams", app.state.llm_gateway.stream_stats),
+        ("log_records_dropped", "Log records dropped because the log queue was full", {}, dropped_records()),
+    ])
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(require_ops_token)])
+    def metrics() -> PlainTextResponse:
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
     return app
 
 